@@ -0,0 +1,348 @@
+import argparse
+import json
+import multiprocessing
+import time
+import tracemalloc
+from urllib.request import Request, urlopen
+
+from pynotiondb import NOTION_API, RetryPolicy
+from pynotiondb.concurrency import map_concurrently
+from pynotiondb.mysql_query_parser import MySQLQueryParser, clear_parse_cache
+
+from .mock_server import DATABASE_ID, serve
+
+SCENARIOS = (
+    "parse",
+    "select_page",
+    "full_scan",
+    "bulk_insert",
+    "update_fanout",
+    "delete_fanout",
+)
+
+
+class TimedNotionAPI(NOTION_API):
+    # Records the latency of every request, retries included
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.request_latencies = []
+
+    def request_helper(self, *args, **kwargs):
+        start = time.perf_counter()
+
+        try:
+            return super().request_helper(*args, **kwargs)
+        finally:
+            self.request_latencies.append(time.perf_counter() - start)
+
+
+class MockServer:
+    # Runs the mock Notion API in its own process, so it does not show up in our timings or memory
+
+    def __init__(self, rows, latency=0.0, throttle_every=0):
+        self.rows = rows
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.process = None
+        self.url = None
+
+    def __enter__(self):
+        ready = multiprocessing.Queue()
+
+        self.process = multiprocessing.Process(
+            target=serve,
+            kwargs={
+                "rows": self.rows,
+                "latency": self.latency,
+                "throttle_every": self.throttle_every,
+                "ready": ready,
+            },
+            daemon=True,
+        )
+        self.process.start()
+
+        self.url = "http://127.0.0.1:{}".format(ready.get(timeout=30))
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.join()
+
+    def _call(self, path, payload=None):
+        request = Request(
+            self.url + path,
+            data=json.dumps(payload).encode("utf-8") if payload is not None else None,
+            headers={"Content-Type": "application/json"},
+            method="POST" if payload is not None else "GET",
+        )
+
+        with urlopen(request) as response:
+            return json.loads(response.read())
+
+    def reset(self, rows=None):
+        return self._call("/_reset", {"rows": self.rows if rows is None else rows})
+
+    def stats(self):
+        return self._call("/_stats")
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100.0 * (len(values) - 1))))
+
+    return values[index]
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+# Every scenario returns (latencies of each operation, number of rows handled)
+
+
+def scenario_parse(client, options):
+    clear_parse_cache()
+
+    statements = [
+        (
+            "SELECT Name, Salary FROM employees WHERE Salary > {} AND Department = 'Sales' "
+            "ORDER BY Salary DESC LIMIT 10".format(index)
+            if index % 3 == 0
+            else (
+                "INSERT INTO employees (Name, Salary) VALUES ('Employee {}', {})".format(
+                    index, index
+                )
+                if index % 3 == 1
+                else "UPDATE employees SET Salary = {} WHERE Name = 'Employee {}'".format(
+                    index, index
+                )
+            )
+        )
+        for index in range(options.iterations * 20)
+    ]
+
+    latencies = [
+        _timed(MySQLQueryParser(statement).parse)[0] for statement in statements
+    ]
+
+    return latencies, 0
+
+
+def scenario_select_page(client, options):
+    query = "SELECT * FROM employees WHERE Salary > 2000 AND page_size = 100"
+
+    latencies = []
+    rows = 0
+
+    for _ in range(options.iterations):
+        seconds, result = _timed(client.execute, query)
+        latencies.append(seconds)
+        rows += len(result["data"])
+
+    return latencies, rows
+
+
+def scenario_full_scan(client, options):
+    seconds, rows = _timed(
+        lambda: sum(1 for _ in client.select_iter("SELECT * FROM employees"))
+    )
+
+    return [seconds], rows
+
+
+def scenario_bulk_insert(client, options):
+    rows = [
+        ("Benchmark {}".format(index), index, "Inserted by the benchmark")
+        for index in range(options.insert_rows)
+    ]
+
+    statement = client.prepare(
+        "INSERT INTO employees (Name, Salary, Notes) VALUES (%s, %s, %s)"
+    )
+
+    # Rows are sent concurrently like insert_many() does, each one timed on its own.
+    # The first row also waits for the schema request
+    results = map_concurrently(
+        lambda row: _timed(statement.execute, row)[0],
+        rows,
+        max_workers=client.max_workers,
+    )
+
+    return [result["result"] for result in results if result["success"]], sum(
+        1 for result in results if result["success"]
+    )
+
+
+def scenario_update_fanout(client, options):
+    # One statement: its query and every PATCH are a single operation
+    seconds, summary = _timed(
+        client.execute,
+        "UPDATE employees SET Notes = 'Updated by the benchmark' WHERE Department = 'Sales'",
+    )
+
+    return [seconds], summary["affected"]
+
+
+def scenario_delete_fanout(client, options):
+    seconds, summary = _timed(
+        client.execute, "DELETE FROM employees WHERE Department = 'Support'"
+    )
+
+    return [seconds], summary["affected"]
+
+
+def _client(server, options):
+    return TimedNotionAPI(
+        "benchmark-token",
+        DATABASE_ID,
+        base_url=server.url + "/v1",
+        max_workers=options.max_workers,
+        rate_limit=options.rate_limit,
+        retry_policy=RetryPolicy(backoff_factor=0.01, max_backoff=0.1, jitter=False),
+        codec=options.codec,
+    )
+
+
+def run_scenario(name, server, options):
+    scenario = globals()["scenario_" + name]
+
+    def run():
+        server.reset()
+        client = _client(server, options)
+
+        start = time.perf_counter()
+        latencies, rows = scenario(client, options)
+        seconds = time.perf_counter() - start
+
+        return client, latencies, rows, seconds
+
+    client, latencies, rows, seconds = run()
+    stats = server.stats()
+
+    peak_memory = None
+
+    # tracemalloc slows Python down, so memory is measured in a second run of its own
+    if options.memory:
+        tracemalloc.start()
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "operations": len(latencies),
+        "rows": rows,
+        "seconds": seconds,
+        "operations_per_second": len(latencies) / seconds if seconds else None,
+        "rows_per_second": rows / seconds if seconds and rows else None,
+        "p50_ms": _ms(_percentile(latencies, 50)),
+        "p99_ms": _ms(_percentile(latencies, 99)),
+        "request_p50_ms": _ms(_percentile(client.request_latencies, 50)),
+        "request_p99_ms": _ms(_percentile(client.request_latencies, 99)),
+        "requests": stats["total_requests"],
+        "throttled": stats["throttled"],
+        "requests_by_endpoint": stats["requests"],
+        "peak_memory_kb": peak_memory // 1024 if peak_memory is not None else None,
+    }
+
+
+def _ms(seconds):
+    return seconds * 1000 if seconds is not None else None
+
+
+def _format(value, digits=1):
+    if value is None:
+        return "-"
+
+    if isinstance(value, float):
+        return "{:.{}f}".format(value, digits)
+
+    return str(value)
+
+
+def print_report(results):
+    columns = (
+        ("scenario", "scenario"),
+        ("ops", "operations"),
+        ("rows", "rows"),
+        ("ops/s", "operations_per_second"),
+        ("rows/s", "rows_per_second"),
+        ("p50 ms", "p50_ms"),
+        ("p99 ms", "p99_ms"),
+        ("req p50", "request_p50_ms"),
+        ("req p99", "request_p99_ms"),
+        ("requests", "requests"),
+        ("429s", "throttled"),
+        ("peak KiB", "peak_memory_kb"),
+    )
+
+    table = [[title for title, _ in columns]]
+    table.extend([_format(result[key]) for _, key in columns] for result in results)
+
+    widths = [max(len(row[index]) for row in table) for index in range(len(columns))]
+
+    for row in table:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark pynotiondb against a local mock Notion API",
+    )
+    parser.add_argument(
+        "--scenario",
+        dest="scenarios",
+        action="append",
+        choices=SCENARIOS,
+        help="run only this scenario, can be given more than once",
+    )
+    parser.add_argument(
+        "--rows", type=int, default=2000, help="pages in the mock database"
+    )
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--insert-rows", type=int, default=300)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every response"
+    )
+    parser.add_argument(
+        "--throttle-every",
+        type=int,
+        default=0,
+        help="answer every Nth request with a 429",
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=NOTION_API.DEFAULT_MAX_WORKERS
+    )
+    parser.add_argument(
+        "--rate-limit", type=float, default=None, help="client side requests per second"
+    )
+    parser.add_argument("--codec", default=None, help="json, orjson or msgspec")
+    parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="skip the tracemalloc run",
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    options = parser.parse_args(argv)
+
+    scenarios = options.scenarios or SCENARIOS
+
+    with MockServer(options.rows, options.latency, options.throttle_every) as server:
+        results = [run_scenario(name, server, options) for name in scenarios]
+
+    print_report(results)
+
+    if options.json:
+        with open(options.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+    return results
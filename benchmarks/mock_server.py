@@ -0,0 +1,469 @@
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, unquote, urlparse
+
+# A local stand-in for the Notion endpoints used by pynotiondb, good enough to benchmark
+# the client: it keeps pages in memory and understands the filters and sorts it sends.
+
+DATABASE_ID = "00000000000000000000000000000001"
+
+SCHEMA = {
+    "Name": {"id": "title", "name": "Name", "type": "title", "title": {}},
+    "Salary": {"id": "%3ASal", "name": "Salary", "type": "number", "number": {}},
+    "Department": {
+        "id": "%3ADep",
+        "name": "Department",
+        "type": "select",
+        "select": {"options": []},
+    },
+    "Notes": {"id": "%3ANot", "name": "Notes", "type": "rich_text", "rich_text": {}},
+    "Active": {"id": "%3AAct", "name": "Active", "type": "checkbox", "checkbox": {}},
+}
+
+DEPARTMENTS = ("Sales", "Engineering", "Support", "Finance")
+
+
+def _text(content):
+    return [
+        {
+            "type": "text",
+            "text": {"content": content, "link": None},
+            "plain_text": content,
+            "href": None,
+        }
+    ]
+
+
+def _property_value(name, value):
+    info = SCHEMA[name]
+    property_type = info["type"]
+
+    if property_type in ("title", "rich_text"):
+        value = _text(value) if isinstance(value, str) else value
+    elif property_type == "select":
+        value = {"name": value} if isinstance(value, str) else value
+
+    return {"id": info["id"], "type": property_type, property_type: value}
+
+
+def _plain(prop):
+    property_type = prop["type"]
+    value = prop[property_type]
+
+    if property_type in ("title", "rich_text"):
+        return "".join(
+            part.get("plain_text", part.get("text", {}).get("content", ""))
+            for part in value
+        )
+
+    if property_type == "select":
+        return value["name"] if value else None
+
+    return value
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:00.000Z", time.gmtime(seconds))
+
+
+class MockNotion:
+    def __init__(self, rows=1000, latency=0.0, throttle_every=0):
+        # latency is added to every response, every throttle_every-th request gets a 429
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.lock = threading.Lock()
+        self.reset(rows)
+
+    def reset(self, rows):
+        with self.lock:
+            self.pages = {}
+            self.order = []
+            self.requests = {}
+            self.total_requests = 0
+            self.throttled = 0
+
+            for index in range(rows):
+                self._create(
+                    {
+                        "Name": "Employee {}".format(index),
+                        "Salary": 1000 + (index * 37) % 9000,
+                        "Department": DEPARTMENTS[index % len(DEPARTMENTS)],
+                        "Notes": "Row {} of the benchmark dataset".format(index),
+                        "Active": index % 3 != 0,
+                    },
+                    created=1700000000 + index * 60,
+                )
+
+    def _create(self, values, created=None):
+        created = created if created is not None else time.time()
+
+        page = {
+            "object": "page",
+            "id": str(uuid.uuid4()),
+            "created_time": _timestamp(created),
+            "last_edited_time": _timestamp(created),
+            "in_trash": False,
+            "archived": False,
+            "parent": {"type": "database_id", "database_id": DATABASE_ID},
+            "properties": {},
+        }
+
+        for name in SCHEMA:
+            empty = (
+                ""
+                if SCHEMA[name]["type"] in ("title", "rich_text")
+                else (False if SCHEMA[name]["type"] == "checkbox" else None)
+            )
+            page["properties"][name] = _property_value(name, values.get(name, empty))
+
+        self.pages[page["id"]] = page
+        self.order.append(page["id"])
+
+        return page
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "total_requests": self.total_requests,
+                "throttled": self.throttled,
+                "rows": sum(1 for page in self.pages.values() if not page["in_trash"]),
+            }
+
+    def handle(self, method, path, query, body):
+        # Returns (status, headers, body)
+        route = re.sub(r"/[0-9a-f-]{32,36}", "/{id}", path)
+
+        with self.lock:
+            key = "{} {}".format(method, route)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.total_requests += 1
+
+            if self.throttle_every and self.total_requests % self.throttle_every == 0:
+                self.throttled += 1
+                return (
+                    429,
+                    {"Retry-After": "0"},
+                    _error(429, "rate_limited", "Rate limited"),
+                )
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            return self._route(method, path, query, body)
+
+    def _route(self, method, path, query, body):
+        match = re.match(r"^/v1/databases/([^/]+)(/query)?$", path)
+
+        if match and match.group(2) and method == "POST":
+            return self._query(body or {}, query.get("filter_properties"))
+
+        if match and method == "GET":
+            return (
+                200,
+                {},
+                {
+                    "object": "database",
+                    "id": DATABASE_ID,
+                    "title": _text("Employees"),
+                    "properties": SCHEMA,
+                },
+            )
+
+        if path == "/v1/pages" and method == "POST":
+            return self._create_page(body)
+
+        match = re.match(r"^/v1/pages/([^/]+)$", path)
+
+        if match and method == "PATCH":
+            return self._update_page(match.group(1), body)
+
+        if path == "/v1/search" and method == "POST":
+            return (
+                200,
+                {},
+                {
+                    "object": "list",
+                    "results": [
+                        {
+                            "object": "database",
+                            "id": DATABASE_ID,
+                            "title": _text("Employees"),
+                            "description": [],
+                            "properties": SCHEMA,
+                            "created_by": None,
+                            "last_edited_by": None,
+                            "last_edited_time": None,
+                        }
+                    ],
+                    "has_more": False,
+                    "next_cursor": None,
+                },
+            )
+
+        return (
+            404,
+            {},
+            _error(404, "object_not_found", "Not found: {} {}".format(method, path)),
+        )
+
+    def _query(self, body, filter_properties):
+        pages = [
+            self.pages[page_id]
+            for page_id in self.order
+            if not self.pages[page_id]["in_trash"]
+            and _matches(self.pages[page_id], body.get("filter"))
+        ]
+
+        # Like Notion, newest pages come first unless sorts are given
+        pages.reverse()
+
+        for sort in reversed(body.get("sorts") or []):
+            pages.sort(
+                key=lambda page: _sort_key(page, sort),
+                reverse=sort["direction"] == "descending",
+            )
+
+        page_size = body.get("page_size", 100)
+
+        # Notion rejects page sizes outside 1..100 instead of clamping them
+        if not isinstance(page_size, int) or not 1 <= page_size <= 100:
+            return (
+                400,
+                {},
+                _error(
+                    400,
+                    "validation_error",
+                    "body.page_size should be a number between 1 and 100.",
+                ),
+            )
+
+        start = int(body.get("start_cursor") or 0)
+        results = pages[start : start + page_size]
+        has_more = start + page_size < len(pages)
+
+        if filter_properties:
+            wanted = {unquote(property_id) for property_id in filter_properties}
+            results = [
+                dict(
+                    page,
+                    properties={
+                        name: prop
+                        for name, prop in page["properties"].items()
+                        if unquote(prop["id"]) in wanted
+                    },
+                )
+                for page in results
+            ]
+
+        return (
+            200,
+            {},
+            {
+                "object": "list",
+                "results": results,
+                "has_more": has_more,
+                "next_cursor": str(start + page_size) if has_more else None,
+            },
+        )
+
+    def _create_page(self, body):
+        values = {}
+
+        for name, prop in body.get("properties", {}).items():
+            if name not in SCHEMA:
+                return (
+                    400,
+                    {},
+                    _error(
+                        400,
+                        "validation_error",
+                        "{} is not a property that exists.".format(name),
+                    ),
+                )
+            values[name] = prop[SCHEMA[name]["type"]]
+
+        return 200, {}, self._create(values)
+
+    def _update_page(self, page_id, body):
+        page = self.pages.get(page_id)
+
+        if page is None:
+            return 404, {}, _error(404, "object_not_found", "Could not find page")
+
+        if body.get("in_trash") or body.get("archived"):
+            page["in_trash"] = True
+
+        for name, prop in body.get("properties", {}).items():
+            if name not in SCHEMA:
+                return (
+                    400,
+                    {},
+                    _error(
+                        400,
+                        "validation_error",
+                        "{} is not a property that exists.".format(name),
+                    ),
+                )
+            page["properties"][name] = _property_value(name, prop[SCHEMA[name]["type"]])
+
+        page["last_edited_time"] = _timestamp(time.time())
+
+        return 200, {}, page
+
+
+def _error(status, code, message):
+    return {"object": "error", "status": status, "code": code, "message": message}
+
+
+def _sort_key(page, sort):
+    if "timestamp" in sort:
+        value = page[sort["timestamp"]]
+    else:
+        value = _plain(page["properties"][sort["property"]])
+
+    # Empty values go last in both directions
+    return (value is None) != (sort["direction"] == "descending"), (
+        value if value is not None else 0
+    )
+
+
+def _matches(page, condition):
+    if not condition:
+        return True
+
+    if "and" in condition:
+        return all(_matches(page, item) for item in condition["and"])
+
+    if "or" in condition:
+        return any(_matches(page, item) for item in condition["or"])
+
+    if "timestamp" in condition:
+        value = page[condition["timestamp"]]
+        operator, expected = next(iter(condition[condition["timestamp"]].items()))
+    else:
+        prop = page["properties"][condition["property"]]
+        value = _plain(prop)
+        operator, expected = next(iter(condition[prop["type"]].items()))
+
+    return _compare(value, operator, expected)
+
+
+def _compare(value, operator, expected):
+    if operator == "is_empty":
+        return value in (None, "", [])
+    if operator == "is_not_empty":
+        return value not in (None, "", [])
+    if operator == "equals":
+        return value == expected
+    if operator == "does_not_equal":
+        return value != expected
+
+    if value is None:
+        return False
+
+    if operator == "contains":
+        return str(expected).lower() in str(value).lower()
+    if operator == "does_not_contain":
+        return str(expected).lower() not in str(value).lower()
+    if operator == "starts_with":
+        return str(value).lower().startswith(str(expected).lower())
+    if operator == "ends_with":
+        return str(value).lower().endswith(str(expected).lower())
+    if operator in ("greater_than", "after"):
+        return value > expected
+    if operator in ("less_than", "before"):
+        return value < expected
+    if operator in ("greater_than_or_equal_to", "on_or_after"):
+        return value >= expected
+    if operator in ("less_than_or_equal_to", "on_or_before"):
+        return value <= expected
+
+    raise ValueError("Unsupported filter operator: {}".format(operator))
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _handler_for(notion):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately, Nagle would hold the body back
+        disable_nagle_algorithm = True
+
+        def _respond(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+
+            if url.path == "/_stats":
+                status, headers, payload = 200, {}, notion.stats()
+            elif url.path == "/_reset":
+                notion.reset(int((body or {}).get("rows", 0)))
+                status, headers, payload = 200, {}, notion.stats()
+            else:
+                status, headers, payload = notion.handle(
+                    self.command, url.path, parse_qs(url.query), body
+                )
+
+            data = json.dumps(payload).encode("utf-8")
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PATCH = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(
+    host="127.0.0.1", port=0, rows=1000, latency=0.0, throttle_every=0, ready=None
+):
+    notion = MockNotion(rows=rows, latency=latency, throttle_every=throttle_every)
+    server = _ThreadingHTTPServer((host, port), _handler_for(notion))
+
+    # The chosen port is reported back when the server runs in another process
+    if ready is not None:
+        ready.put(server.server_address[1])
+
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock Notion API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every response"
+    )
+    parser.add_argument(
+        "--throttle-every",
+        type=int,
+        default=0,
+        help="answer every Nth request with a 429",
+    )
+    args = parser.parse_args()
+
+    print("Mock Notion API on http://{}:{}/v1".format(args.host, args.port))
+    serve(args.host, args.port, args.rows, args.latency, args.throttle_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,4 @@
-from .notion_api import NOTION_API
\ No newline at end of file
+from .async_notion_api import AsyncNotionAPI
+from .client import NotionClient
+from .notion_api import NOTION_API
+from .retry import RetryPolicy
@@ -0,0 +1,469 @@
+import asyncio
+
+from .base import BaseNotionAPI
+from .columnar import ColumnarResult
+from .concurrency import gather_concurrently
+from .exceptions import NotionAPIError
+from .instrumentation import one_row, traced_statement
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncNotionAPI(BaseNotionAPI):
+
+    DEFAULT_MAX_CONNECTIONS = 100
+    DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+
+    def __init__(
+        self,
+        token,
+        databaseId,
+        schema_ttl=BaseNotionAPI.DEFAULT_SCHEMA_TTL,
+        max_workers=BaseNotionAPI.DEFAULT_MAX_WORKERS,
+        rate_limit=BaseNotionAPI.DEFAULT_RATE_LIMIT,
+        retry_policy=None,
+        max_connections=DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections=DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        timeout=BaseNotionAPI.DEFAULT_TIMEOUT,
+        codec=None,
+        base_url=None,
+        hooks=None,
+    ):
+        if httpx is None:
+            raise ImportError(
+                "AsyncNotionAPI requires httpx. Install it with: pip install pynotiondb[async]"
+            )
+
+        super().__init__(
+            token,
+            databaseId,
+            schema_ttl=schema_ttl,
+            max_workers=max_workers,
+            rate_limit=rate_limit,
+            retry_policy=retry_policy,
+            codec=codec,
+            base_url=base_url,
+            hooks=hooks,
+        )
+
+        # One pooled client keeps connections alive across every statement sent by this instance
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=timeout,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def request_helper(
+        self, url, method="GET", payload=None, idempotent=None, params=None
+    ):
+
+        if idempotent is None:
+            idempotent = self.is_idempotent(url, method)
+
+        # Encoded once, retries send the same bytes
+        body = self._encode(payload)
+
+        event = self._start_request(url, method, body) if self.hooks else None
+
+        attempt = 0
+
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            try:
+                response = await self.client.request(
+                    method, url, content=body, params=params
+                )
+
+            except httpx.TransportError as error:
+                if not self.retry_policy.should_retry(attempt, idempotent):
+                    if event is not None:
+                        self._finish_request(event, attempt, error=error)
+                    raise
+
+                delay = self.retry_policy.get_delay(attempt)
+
+            else:
+                if response.status_code < 400 or not self.retry_policy.should_retry(
+                    attempt, idempotent, response.status_code
+                ):
+                    if event is not None:
+                        self._finish_request(event, attempt, response=response)
+                    return self.get_json(response)
+
+                delay = self.retry_policy.get_delay(
+                    attempt,
+                    retry_after=self.retry_policy.parse_retry_after(
+                        response.headers.get("Retry-After")
+                    ),
+                )
+
+            self.retry_policy.record(delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_table_header_info(self, refresh=False):
+
+        data = None if refresh else self._get_cached_schema()
+
+        if data is not None:
+            return data
+
+        response = await self.request_helper(
+            url=self.DATABASES.format(self.databaseId), method="GET"
+        )
+
+        return self._cache_schema(self._json(response))
+
+    async def get_table_header(self):
+        table_data = await self.get_table_header_info()
+        return tuple(table_data.keys())
+
+    async def _get_table_header_for(self, properties):
+        table_header = await self.get_table_header_info()
+
+        if self._is_schema_stale(table_header, properties):
+            table_header = await self.get_table_header_info(refresh=True)
+
+        return table_header
+
+    async def _request_with_schema_refresh(
+        self, url, method, build_payload, properties=(), build_params=None
+    ):
+        table_header = await self._get_table_header_for(properties)
+
+        try:
+            return await self.request_helper(
+                url,
+                method=method,
+                payload=build_payload(table_header),
+                params=build_params(table_header) if build_params else None,
+            )
+
+        except NotionAPIError as error:
+            if not self._is_unknown_property_error(error):
+                raise
+
+            self.invalidate_schema(self.databaseId)
+            table_header = await self.get_table_header_info()
+
+            return await self.request_helper(
+                url,
+                method=method,
+                payload=build_payload(table_header),
+                params=build_params(table_header) if build_params else None,
+            )
+
+    async def __create_page(self, parsed_data):
+        return await self._request_with_schema_refresh(
+            self.PAGES,
+            method="POST",
+            build_payload=lambda table_header: self.construct_payload_for_insert(
+                parsed_data, table_header
+            ),
+            properties=[item.get("property") for item in parsed_data["data"]],
+        )
+
+    @traced_statement("insert")
+    async def insert(self, query):
+        return await self._insert(self._parse_query(query))
+
+    async def _insert(self, parsed_data):
+
+        if len(parsed_data["rows"]) > 1:
+
+            async def insert_row(row):
+                response = await self.__create_page(row)
+                return self._json(response).get("id")
+
+            return await gather_concurrently(
+                insert_row, self._rows_of(parsed_data), max_workers=self.max_workers
+            )
+
+        await self.__create_page(parsed_data)
+
+    @traced_statement("insert")
+    async def insert_many(self, sql, val):
+
+        async def insert_row(row):
+            parsed_data = self._bind_query(sql, row)
+
+            response = await self.__create_page(parsed_data)
+            return self._json(response).get("id")
+
+        return await gather_concurrently(insert_row, val, max_workers=self.max_workers)
+
+    async def __query_pages(self, parsed_data, page_size=None):
+
+        query = self._paged_query(parsed_data, page_size)
+
+        if query.empty:
+            return
+
+        response = await self._request_with_schema_refresh(
+            query.url,
+            method="POST",
+            build_payload=query.build_payload,
+            properties=query.properties,
+            build_params=query.build_params,
+        )
+        response = self._json(response)
+
+        while True:
+            payload = query.next_payload(response)
+
+            yield response
+
+            if payload is None:
+                return
+
+            response = await self.request_helper(
+                query.url, method="POST", payload=payload, params=query.params
+            )
+            response = self._json(response)
+
+    async def __local_query(self, parsed_data):
+        table_header = await self._get_table_header_for(
+            self._referenced_properties(parsed_data)
+        )
+
+        return self._local_query(parsed_data, table_header)
+
+    async def __run_local_query(self, local_query, page_size=None):
+
+        pages = self.__query_pages(
+            local_query.remote,
+            page_size=page_size or self.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS,
+        )
+
+        async for response in pages:
+            for row in local_query.feed(response["results"]):
+                yield row
+
+            if local_query.done:
+                await pages.aclose()
+                break
+
+        for row in local_query.finish():
+            yield row
+
+    @traced_statement("select")
+    async def select(self, query):
+        return await self._select(self._parse_query(query))
+
+    async def _select(self, parsed_data):
+
+        local_query = await self.__local_query(parsed_data)
+
+        if local_query is not None:
+            rows = [row async for row in self.__run_local_query(local_query)]
+            return self._select_results(self.EMPTY_QUERY_RESPONSE, rows)
+
+        rows = []
+        response = self.EMPTY_QUERY_RESPONSE
+
+        pages = self.__query_pages(parsed_data)
+
+        async for response in pages:
+            rows.extend(
+                self._decode_rows(
+                    response["results"], parsed_data, await self.get_table_header_info()
+                )
+            )
+
+            # Without a LIMIT one page is returned, with one we keep paging until it is reached
+            if parsed_data.get("limit") is None:
+                await pages.aclose()
+                break
+
+        return self._select_results(response, rows)
+
+    @traced_statement("select", count=one_row)
+    async def select_iter(
+        self, query, page_size=BaseNotionAPI.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS
+    ):
+
+        parsed_data = self._parse_query(query)
+
+        local_query = await self.__local_query(parsed_data)
+
+        if local_query is not None:
+            async for row in self.__run_local_query(local_query, page_size):
+                yield row
+
+            return
+
+        async for response in self.__query_pages(parsed_data, page_size=page_size):
+            table_header = await self.get_table_header_info()
+
+            for row in self._decode_rows(response["results"], parsed_data, table_header):
+                yield row
+
+    @traced_statement("select", count=len)
+    async def select_batches(
+        self, query, page_size=BaseNotionAPI.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS
+    ):
+
+        parsed_data = self._parse_query(query)
+
+        local_query = await self.__local_query(parsed_data)
+
+        if local_query is not None:
+            rows = [row async for row in self.__run_local_query(local_query, page_size)]
+            yield ColumnarResult.from_rows(rows)
+            return
+
+        async for response in self.__query_pages(parsed_data, page_size=page_size):
+            table_header = await self.get_table_header_info()
+
+            yield self._decode_columns(response["results"], parsed_data, table_header)
+
+    @traced_statement("select")
+    async def select_columns(
+        self, query, page_size=BaseNotionAPI.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS
+    ):
+
+        result = None
+
+        async for batch in self.select_batches(query, page_size=page_size):
+            if result is None:
+                result = batch
+            else:
+                result.append(batch)
+
+        if result is None:
+            parsed_data = self._parse_query(query)
+            table_header = await self.get_table_header_info()
+            result = ColumnarResult.for_schema(
+                self._property_names(parsed_data, table_header), table_header
+            )
+
+        return result
+
+    async def __matching_pages(self, where, properties=()):
+
+        entries = []
+
+        async for response in self.__query_pages(
+            self._matching_query(where, properties),
+            page_size=self.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS,
+        ):
+            entries.extend(response["results"])
+
+        return entries
+
+    async def __matching_page_ids(self, where):
+        return [entry["id"] for entry in await self.__matching_pages(where)]
+
+    @traced_statement("update")
+    async def update(self, query):
+        return await self._update(self._parse_query(query))
+
+    async def _update(self, parsed_data):
+        return await self._update_pages(
+            parsed_data["where"],
+            self._update_payload_builder(parsed_data),
+            [set_value.get("key") for set_value in parsed_data["set_values"]],
+        )
+
+    async def _update_pages(self, where, build_payload, properties):
+
+        # Pages are read with the SET columns, so only what actually changes is written
+        entries = await self.__matching_pages(where, properties)
+
+        changes = self._page_changes(
+            entries, build_payload(await self._get_table_header_for(properties))
+        )
+
+        async def update_page(change):
+            entry, changed = change
+
+            if changed:
+                await self._request_with_schema_refresh(
+                    self.UPDATE_PAGE.format(entry["id"]),
+                    method="PATCH",
+                    build_payload=self._changed_payload_builder(build_payload, entry),
+                    properties=list(changed),
+                )
+
+            return entry["id"]
+
+        return self._update_summary(
+            await gather_concurrently(update_page, changes, max_workers=self.max_workers),
+            changes,
+        )
+
+    @traced_statement("delete")
+    async def delete(self, query):
+        return await self._delete(self._parse_query(query))
+
+    async def _delete(self, parsed_data):
+        return await self._delete_pages(parsed_data["where"])
+
+    async def _delete_pages(self, where):
+
+        page_ids = await self.__matching_page_ids(where)
+
+        async def delete_page(page_id):
+            await self.request_helper(
+                url=self.DELETE_PAGE.format(page_id),
+                method="PATCH",
+                payload=self.TRASH_PAGE_PAYLOAD,
+            )
+            return page_id
+
+        return self._write_summary(
+            await gather_concurrently(delete_page, page_ids, max_workers=self.max_workers)
+        )
+
+    @traced_statement()
+    async def execute(self, sql, val=None):
+
+        # Values are bound to the parsed statement as typed values, they never become SQL text
+        bind = val is not None
+
+        can_continue, to_do = self._check_statement(sql)
+
+        if not can_continue:
+            raise ValueError(
+                "Invalid SQL statement or type of statement not implemented"
+            )
+
+        if to_do == "insert" and type(val) == list:
+            return await self.insert_many(sql, val)
+
+        run = {
+            "insert": self._insert,
+            "select": self._select,
+            "update": self._update,
+            "delete": self._delete,
+        }.get(to_do)
+
+        if run is None:
+            raise ValueError("Unsupported operation: {}".format(to_do))
+
+        if type(val) == list:
+            return [await run(self._bind_query(sql, row)) for row in val]
+
+        if bind:
+            return await run(self._bind_query(sql, val))
+
+        return await run(self._parse_query(sql))
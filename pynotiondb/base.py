@@ -0,0 +1,703 @@
+import copy
+import threading
+import time
+from urllib.parse import unquote
+
+from .columnar import ColumnarResult
+from .concurrency import TokenBucket
+from .codec import get_codec
+from .decoders import compile_decoder, decode_column, decode_rows, decode_value
+from .encoders import encode_value, same_value
+from .exceptions import NotionAPIError
+from .filters import (
+    PAGE_COLUMNS,
+    PAGE_SIZE_COLUMN,
+    TIMESTAMP_COLUMNS,
+    compile_filter,
+    compile_sorts,
+    split_page_size,
+)
+from .instrumentation import current_statement, endpoint_template, log
+from .mysql_query_parser import (
+    MySQLQueryParser,
+    bind_placeholders,
+    count_placeholders,
+    placeholder_names,
+    statement_info,
+)
+from .prepared import bind_parameters
+from .retry import RetryPolicy
+from .query_engine import LocalQuery, needs_local_stage
+from .sql_ast import iter_columns
+
+
+class PagedQuery:
+    # The requests of one database query, shared by the sync and async clients: the first payload
+    # is built against the schema, the following pages reuse it with the next cursor
+
+    def __init__(self, api, parsed_data, page_size=None):
+        self.api = api
+        self.parsed_data = parsed_data
+        self.page_size = page_size
+        self.url = api.QUERY_DATABASE.format(api.databaseId)
+        self.properties = api._referenced_properties(parsed_data)
+        self.payload = None
+        self.params = None
+        self.first_page_size = None
+        self.fetched = 0
+
+    @property
+    def empty(self):
+        # LIMIT 0 is answered without a request, Notion rejects a page_size of 0
+        return self.parsed_data.get("limit") == 0
+
+    def build_payload(self, table_header):
+        payload = self.api.construct_payload_for_select(self.parsed_data, table_header)
+
+        if self.page_size is not None:
+            payload["page_size"] = self.api._limited_page_size(
+                self.parsed_data, self.page_size, 0
+            )
+
+        self.payload = payload
+        self.first_page_size = payload["page_size"]
+
+        return payload
+
+    def build_params(self, table_header):
+        self.params = self.api._query_params(self.parsed_data, table_header)
+        return self.params
+
+    def next_payload(self, response):
+        # The payload of the next page, or None once the results or the LIMIT are exhausted
+        self.fetched += len(response["results"])
+
+        if not (response.get("has_more") and response.get("next_cursor")):
+            return None
+
+        next_page_size = self.api._limited_page_size(
+            self.parsed_data, self.first_page_size, self.fetched
+        )
+
+        if next_page_size == 0:
+            return None
+
+        self.payload["page_size"] = next_page_size
+        self.payload["start_cursor"] = response["next_cursor"]
+
+        return self.payload
+
+
+class BaseNotionAPI:
+
+    DEFAULT_BASE_URL = "https://api.notion.com/v1"
+
+    SEARCH = "https://api.notion.com/v1/search"
+    PAGES = "https://api.notion.com/v1/pages"
+    UPDATE_PAGE = "https://api.notion.com/v1/pages/{}"
+    DELETE_PAGE = "https://api.notion.com/v1/pages/{}"
+    DATABASES = "https://api.notion.com/v1/databases/{}"
+    QUERY_DATABASE = "https://api.notion.com/v1/databases/{}/query"
+    DEFAULT_PAGE_SIZE_FOR_SELECT_STATEMENTS = 20
+    MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS = 100
+    # Keys looked up by one query of upsert_many(), Notion accepts up to 100 conditions per filter
+    MAX_KEYS_PER_LOOKUP = 100
+
+    ENDPOINTS = (
+        "SEARCH",
+        "PAGES",
+        "UPDATE_PAGE",
+        "DELETE_PAGE",
+        "DATABASES",
+        "QUERY_DATABASE",
+    )
+
+    EMPTY_QUERY_RESPONSE = {"results": [], "next_cursor": None, "has_more": False}
+    TRASH_PAGE_PAYLOAD = {"in_trash": True}
+
+    DEFAULT_SCHEMA_TTL = 300
+
+    # Seconds to wait for Notion to connect or answer, a request that times out is retried
+    DEFAULT_TIMEOUT = 30
+
+    # Notion allows an average of three requests per second per integration
+    DEFAULT_RATE_LIMIT = 3
+    DEFAULT_MAX_WORKERS = 3
+
+    UNKNOWN_PROPERTY_ERRORS = (
+        "is not a property that exists",
+        "Could not find property",
+    )
+
+    def __init__(
+        self,
+        token,
+        databaseId,
+        schema_ttl=DEFAULT_SCHEMA_TTL,
+        max_workers=DEFAULT_MAX_WORKERS,
+        rate_limit=DEFAULT_RATE_LIMIT,
+        retry_policy=None,
+        codec=None,
+        base_url=None,
+        hooks=None,
+    ):
+        self.token = token
+        self.databaseId = databaseId
+        # Seconds a fetched database schema stays valid; None keeps it until invalidate_schema()
+        self.schema_ttl = schema_ttl
+        self._schema_cache = {}
+        self._decoders = {}
+        self.DEFAULT_NOTION_VERSION = "2022-06-28"
+        self.AUTHORIZATION = "Bearer " + self.token
+        self.headers = {
+            "Authorization": self.AUTHORIZATION,
+            "Content-Type": "application/json",
+            "Notion-Version": self.DEFAULT_NOTION_VERSION,
+        }
+
+        # Number of concurrent requests used by insert_many, update and delete
+        self.max_workers = max_workers
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.codec = get_codec(codec)
+
+        # Instrumentation, see instrumentation.py; with no hooks nothing is measured
+        self.hooks = list(hooks or ())
+        self._hooks_lock = threading.Lock()
+
+        # Sends every request to another server, e.g. the mock Notion API of the benchmarks
+        self.base_url = (base_url or self.DEFAULT_BASE_URL).rstrip("/")
+
+        if base_url is not None:
+            for endpoint in self.ENDPOINTS:
+                setattr(
+                    self,
+                    endpoint,
+                    getattr(self, endpoint).replace(
+                        self.DEFAULT_BASE_URL, self.base_url, 1
+                    ),
+                )
+
+    def add_hook(self, hook):
+        # Replaced rather than appended to, so requests running on other threads see either list
+        self.hooks = self.hooks + [hook]
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks = [item for item in self.hooks if item is not hook]
+
+    def _emit(self, name, event):
+        for hook in self.hooks:
+            callback = getattr(hook, name, None)
+
+            if callback is None:
+                continue
+
+            # A broken hook must not break the request it reports on
+            try:
+                callback(event)
+            except Exception:
+                log.exception("Instrumentation hook %r failed in %s", hook, name)
+
+    def _start_request(self, url, method, body):
+        return {
+            "method": method,
+            "endpoint": endpoint_template(url, self.base_url),
+            "url": url,
+            "status": None,
+            "request_bytes": len(body) if body else 0,
+            "response_bytes": 0,
+            "started_at": None,
+            "latency": None,
+            "retries": 0,
+            "error": None,
+            "statement": current_statement.get(),
+            "start": time.perf_counter(),
+        }
+
+    def _finish_request(self, event, retries, response=None, error=None):
+        latency = time.perf_counter() - event.pop("start")
+
+        event["latency"] = latency
+        event["started_at"] = time.time() - latency
+        event["retries"] = retries
+        event["error"] = error
+
+        if response is not None:
+            event["status"] = response.status_code
+            event["response_bytes"] = len(response.content)
+
+        statement = event["statement"]
+
+        if statement is not None:
+            with self._hooks_lock:
+                statement["requests"] += 1
+                statement["retries"] += retries
+                statement["request_time"] += latency
+
+        self._emit("on_request", event)
+
+    def _start_statement(self, kind, sql):
+        event = {
+            "statement": kind,
+            "sql": sql,
+            "parse_time": 0.0,
+            "requests": 0,
+            "retries": 0,
+            "request_time": 0.0,
+            "rows": None,
+            "started_at": time.time(),
+            "duration": None,
+            "error": None,
+            "start": time.perf_counter(),
+        }
+
+        self._emit("on_statement_start", event)
+
+        return event
+
+    def _finish_statement(self, event, rows, error):
+        event["duration"] = time.perf_counter() - event.pop("start")
+        event["rows"] = rows
+        event["error"] = error
+
+        self._emit("on_statement", event)
+
+    def _timed_parse(self, parse):
+        statement = current_statement.get() if self.hooks else None
+
+        if statement is None:
+            return parse()
+
+        start = time.perf_counter()
+
+        try:
+            return parse()
+        finally:
+            statement["parse_time"] += time.perf_counter() - start
+
+    def _parse_query(self, query):
+        return self._timed_parse(MySQLQueryParser(query).parse_cached)
+
+    def _bind_query(self, sql, params):
+        # parse() result of sql with its placeholders replaced by params, as values
+        statement = self._timed_parse(MySQLQueryParser(sql).parse_ast)
+        params = bind_parameters(
+            params, count_placeholders(statement), placeholder_names(statement)
+        )
+
+        return statement_info(bind_placeholders(statement, params))
+
+    def _check_statement(self, query):
+        can_continue, to_do = self._timed_parse(MySQLQueryParser(query).check_statement)
+
+        # execute() only learns here which kind of statement it runs
+        statement = current_statement.get() if self.hooks else None
+
+        if statement is not None and statement["statement"] is None:
+            statement["statement"] = to_do
+
+        return can_continue, to_do
+
+    def is_idempotent(self, url, method):
+        # Reads (including database queries and search, which are POSTs) are always safe to repeat
+        return method == "GET" or url == self.SEARCH or url.endswith("/query")
+
+    def _encode(self, payload):
+        return self.codec.dumps(payload) if payload is not None else None
+
+    def _json(self, response):
+        return self.codec.loads(response.content)
+
+    def get_json(self, response):
+        if response.status_code >= 400:
+            try:
+                error_info = self._json(response)
+                error_message = error_info.get("message", "Unknown Notion API Error")
+                error_code = error_info.get("code", "Unknown Code")
+
+            except Exception:
+                error_message = "Unable to parse"
+                error_code = "Unknown Code"
+
+            raise NotionAPIError(
+                f"Notion API Error ({response.status_code}): {error_message} ({error_code})",
+                status_code=response.status_code,
+                code=error_code,
+            )
+
+        else:
+            return response
+
+    def construct_payload_for_pages_creation(self, properties_data):
+
+        json_data = {"parent": {"database_id": self.databaseId}, "properties": {}}
+
+        for data in properties_data["data"]:
+
+            # Properties of a type that cannot be written, or missing from the schema, are left out
+            value = encode_value(data.get("name"), data.get("value"), data.get("property"))
+
+            if value is not None:
+                json_data["properties"][data.get("property")] = value
+
+        return json_data
+
+    def _get_cached_schema(self, databaseId=None):
+        cached = self._schema_cache.get(databaseId or self.databaseId)
+
+        if cached is not None:
+            expires_at, data = cached
+            if expires_at is None or expires_at > time.monotonic():
+                return data
+
+        return None
+
+    def _cache_schema(self, database_info, databaseId=None):
+        properties = database_info.get("properties", {})
+
+        data = {}
+
+        for property_name, property_info in properties.items():
+
+            data[property_name] = {
+                "id": property_info.get("id", ""),
+                "name": property_info.get("type", ""),
+                "type": property_info.get("name", ""),
+            }
+
+        expires_at = (
+            time.monotonic() + self.schema_ttl if self.schema_ttl is not None else None
+        )
+        self._schema_cache[databaseId or self.databaseId] = (expires_at, data)
+
+        return data
+
+    @staticmethod
+    def _database_summary(result):
+        return {
+            "id": result.get("id"),
+            "created_by": result.get("created_by"),
+            "last_edited_by": result.get("last_edited_by"),
+            "last_edited_time": result.get("last_edited_time"),
+            "title": result.get("title")[0].get("plain_text")
+            if len(result.get("title") or ()) >= 1
+            else None,
+            "description": result.get("description")[0].get("plain_text")
+            if len(result.get("description") or ()) >= 1
+            else None,
+            "properties": list((result.get("properties") or {}).keys()),
+        }
+
+    def invalidate_schema(self, databaseId=None):
+        if databaseId is None:
+            self._schema_cache.clear()
+        else:
+            self._schema_cache.pop(databaseId, None)
+
+    @staticmethod
+    def _is_schema_stale(table_header, properties):
+        # A column we have never seen usually means the cached schema is stale
+        return any(
+            prop not in table_header
+            and prop != PAGE_SIZE_COLUMN
+            and prop not in TIMESTAMP_COLUMNS
+            for prop in properties
+        )
+
+    def _is_unknown_property_error(self, error):
+        return error.status_code == 400 and any(
+            message in str(error) for message in self.UNKNOWN_PROPERTY_ERRORS
+        )
+
+    @staticmethod
+    def _add_name_and_id_to_parsed_data_for_insert_statements(
+        parsed_data, table_header
+    ):
+
+        for item in parsed_data["data"]:
+
+            if item.get("property") in table_header:
+                item["name"] = table_header[item.get("property")]["name"]
+                item["id"] = table_header[item.get("property")]["id"]
+
+            else:
+                item.pop("name", None)
+                item.pop("id", None)
+
+        return parsed_data
+
+    @staticmethod
+    def _add_name_and_id_to_parsed_data_for_update_statements(
+        parsed_data, table_header
+    ):
+        set_values = parsed_data.get("set_values", [])
+        updated_set_values = []
+
+        for set_value in set_values:
+            key = set_value.pop("key", None)
+
+            if key and key in table_header:
+                set_value.update(
+                    {
+                        "property": key,  # Changing 'key' to 'property'
+                        "name": table_header[key]["name"],
+                        "id": table_header[key]["id"],
+                    }
+                )
+
+            updated_set_values.append(set_value)
+
+        # Doing this so that using this we can later call construct payload function
+        return {
+            "table_name": parsed_data.get("table_name"),
+            "data": updated_set_values,
+            "where_clause": parsed_data.get("where_clause"),
+        }
+
+    def construct_payload_for_insert(self, parsed_data, table_header):
+        return self.construct_payload_for_pages_creation(
+            self._add_name_and_id_to_parsed_data_for_insert_statements(
+                copy.deepcopy(parsed_data), table_header
+            )
+        )
+
+    def construct_payload_for_update(self, parsed_data, table_header):
+        payload = self.construct_payload_for_pages_creation(
+            self._add_name_and_id_to_parsed_data_for_update_statements(
+                copy.deepcopy(parsed_data), table_header
+            )
+        )
+
+        # We don't want "parent" key in the payload
+        payload.pop("parent")
+
+        return payload
+
+    def _update_payload_builder(self, parsed_data):
+        built = []
+
+        def build_payload(table_header):
+            # Built once and shared by every PATCH, rebuilt only when the schema is refreshed
+            if not built or built[0][0] is not table_header:
+                built[:] = [
+                    (table_header, self.construct_payload_for_update(parsed_data, table_header))
+                ]
+            return built[0][1]
+
+        return build_payload
+
+    @staticmethod
+    def _changed_properties(properties, entry):
+        # Only the properties whose value differs from what the page already holds
+        current = entry["properties"]
+
+        return {
+            name: value
+            for name, value in properties.items()
+            if not same_value(value, current.get(name))
+        }
+
+    @staticmethod
+    def _matching_query(where, properties=()):
+        # Pages matched by UPDATE and DELETE are not decoded, only the given properties are read
+        return {"where": where, "properties": list(properties)}
+
+    def _page_changes(self, entries, payload):
+        # (page, properties to write) for every matched page, empty when it already holds the values
+        return [
+            (entry, self._changed_properties(payload["properties"], entry))
+            for entry in entries
+        ]
+
+    def _changed_payload_builder(self, build_payload, entry):
+        # The PATCH payload of one page, with only the properties it does not hold yet
+        def build_changed_payload(table_header):
+            return {
+                "properties": self._changed_properties(
+                    build_payload(table_header)["properties"], entry
+                )
+            }
+
+        return build_changed_payload
+
+    @staticmethod
+    def _update_summary(results, changes):
+        # Pages that already held the SET values are skipped, affected only counts pages written
+        changed = [bool(properties) for entry, properties in changes]
+
+        return {
+            "matched": len(results),
+            "changed": sum(changed),
+            "skipped": len(results) - sum(changed),
+            "affected": sum(
+                1
+                for result, written in zip(results, changed)
+                if written and result["success"]
+            ),
+            "results": results,
+        }
+
+    @staticmethod
+    def _write_summary(results):
+        return {
+            "matched": len(results),
+            "affected": sum(1 for result in results if result["success"]),
+            "results": results,
+        }
+
+    def construct_payload_for_select(self, parsed_data, table_header):
+
+        # page_size is written as a condition but only controls how many rows Notion returns
+        page_size, where = split_page_size(parsed_data.get("where"))
+
+        if page_size is None:
+            page_size = self.DEFAULT_PAGE_SIZE_FOR_SELECT_STATEMENTS
+
+            # With a LIMIT there is no point asking for fewer rows than it allows
+            if parsed_data.get("limit") is not None:
+                page_size = self.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS
+
+        payload = {
+            "page_size": self._limited_page_size(parsed_data, page_size, 0),
+        }
+
+        # The whole WHERE clause, including OR and NOT, is evaluated by Notion
+        if where is not None:
+            payload["filter"] = compile_filter(where, table_header)
+
+        if parsed_data.get("order_by"):
+            payload["sorts"] = compile_sorts(parsed_data["order_by"], table_header)
+
+        return payload
+
+    @staticmethod
+    def _limited_page_size(parsed_data, page_size, fetched):
+        # LIMIT ends the pagination as soon as enough rows have been fetched
+        limit = parsed_data.get("limit")
+
+        if limit is None:
+            return page_size
+
+        return max(0, min(page_size, limit - fetched))
+
+    def _paged_query(self, parsed_data, page_size=None):
+        return PagedQuery(self, parsed_data, page_size)
+
+    @staticmethod
+    def _referenced_properties(parsed_data):
+        exprs = [parsed_data.get("where")]
+        exprs.extend(item.expr for item in parsed_data.get("items") or ())
+        exprs.extend(parsed_data.get("group_by") or ())
+
+        return list(parsed_data.get("columns") or []) + [
+            column.name for expr in exprs for column in iter_columns(expr)
+        ]
+
+    def _local_query(self, parsed_data, table_header):
+        # Statements Notion can answer on its own skip the local stage entirely
+        if not needs_local_stage(parsed_data, table_header):
+            return None
+
+        return LocalQuery(parsed_data, table_header, self._page_values)
+
+    @staticmethod
+    def _rows_of(parsed_data):
+        # A multi-row VALUES list becomes one parsed INSERT per row
+        return [dict(parsed_data, data=data) for data in parsed_data["rows"]]
+
+    @staticmethod
+    def _property_names(parsed_data, table_header):
+        # If * is in the query that means it needs to have all the table headers
+        return (
+            parsed_data.get("columns", None)
+            if parsed_data.get("columns")
+            else tuple(table_header.keys())
+        )
+
+    @staticmethod
+    def _query_params(parsed_data, table_header):
+        # Projection pushdown: Notion only sends back the properties we are going to read.
+        # "properties" lists what a statement needs besides its columns, None means everything
+        names = parsed_data.get("properties", parsed_data.get("columns"))
+
+        if names is None:
+            return None
+
+        ids = []
+
+        for name in names:
+            if name in table_header:
+                # Property ids come percent-encoded, they are encoded again as a query parameter
+                property_id = unquote(table_header[name]["id"])
+
+                if property_id not in ids:
+                    ids.append(property_id)
+
+        if not ids:
+            # Nothing but the page itself is needed, the title is the one property every database has
+            ids = [
+                unquote(info["id"])
+                for info in table_header.values()
+                if info["name"] == "title"
+            ][:1]
+
+        return {"filter_properties": ids} if ids else None
+
+    @staticmethod
+    def _page_values(entry, names=None):
+        # Values keyed by the exact property names, which is what WHERE and ORDER BY refer to
+        properties = entry["properties"]
+
+        if names is not None:
+            properties = {name: properties[name] for name in names if name in properties}
+
+        values = {
+            prop_name: decode_value(prop_data)
+            for prop_name, prop_data in properties.items()
+        }
+
+        for column in PAGE_COLUMNS:
+            values.setdefault(column, entry[column])
+
+        return values
+
+    def _row_decoder(self, parsed_data, table_header):
+        property_names = tuple(self._property_names(parsed_data, table_header))
+
+        # Compiled once per column list and schema, a refreshed schema gets a new decoder
+        cached = self._decoders.get(property_names)
+
+        if cached is None or cached[0] is not table_header:
+            cached = self._decoders[property_names] = (
+                table_header,
+                compile_decoder(property_names, table_header),
+            )
+
+        return cached[1]
+
+    def _decode_rows(self, results, parsed_data, table_header):
+        return decode_rows(results, self._row_decoder(parsed_data, table_header))
+
+    def _decode_columns(self, results, parsed_data, table_header):
+        columns = ColumnarResult.for_schema(
+            self._property_names(parsed_data, table_header), table_header
+        )
+
+        # Column by column, so the page columns are stored once per row instead of once per property
+        for key, name, extract in self._row_decoder(parsed_data, table_header):
+            columns.extend(key, decode_column(results, name, extract))
+
+        for column in PAGE_COLUMNS:
+            columns.extend(column, [entry[column] for entry in results])
+
+        return columns
+
+    @staticmethod
+    def _select_results(response, rows):
+        return {
+            "data": rows,
+            "next_cursor": response.get("next_cursor", None),
+            "previous_cursor": None,
+            "has_more": response.get("has_more", False),
+        }
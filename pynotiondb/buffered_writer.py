@@ -0,0 +1,182 @@
+import queue
+import threading
+import time
+
+from .instrumentation import log
+from .mysql_query_parser import MySQLQueryParser
+
+_STOP = object()
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class BufferedWriter:
+    # Collects rows for one INSERT template from any number of threads and writes them with
+    # insert_many() once max_batch_size rows are waiting or the oldest has waited flush_interval
+
+    DEFAULT_MAX_BATCH_SIZE = 100
+    DEFAULT_FLUSH_INTERVAL = 1.0
+    DEFAULT_MAX_QUEUE_SIZE = 1000
+
+    def __init__(
+        self,
+        client,
+        sql,
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+        on_result=None,
+    ):
+        parsed_data = MySQLQueryParser(sql).parse_cached()
+
+        if (
+            parsed_data is None
+            or "rows" not in parsed_data
+            or len(parsed_data["rows"]) != 1
+        ):
+            raise ValueError("BufferedWriter needs a single-row INSERT statement")
+
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.client = client
+        self.sql = sql
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        # Called on the writer thread as on_result(row, result) with the result dict of insert_many()
+        self.on_result = on_result
+
+        self.rows_written = 0
+        self.rows_failed = 0
+
+        # write() blocks once max_queue_size rows are waiting, so producers cannot outrun Notion
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def write(self, row, timeout=None):
+        # Raises queue.Full when the row could not be queued within timeout seconds
+        if self._closed:
+            raise ValueError("Cannot write to a closed BufferedWriter")
+
+        self._queue.put(row, timeout=timeout)
+
+    def write_many(self, rows, timeout=None):
+        for row in rows:
+            self.write(row, timeout=timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        # Waits until every row written before the call was sent, returns False on timeout
+        if self._closed:
+            return True
+
+        marker = _Flush()
+        self._queue.put(marker, timeout=timeout)
+
+        return marker.done.wait(timeout)
+
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+
+            self._closed = True
+
+        self._queue.put(_STOP)
+        self._thread.join()
+
+        # A producer may have got a row in after the stop marker
+        leftover = []
+
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if isinstance(item, _Flush):
+                item.done.set()
+            elif item is not _STOP:
+                leftover.append(item)
+
+        for start in range(0, len(leftover), self.max_batch_size):
+            self._send(leftover[start : start + self.max_batch_size])
+
+    def _run(self):
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # The oldest row has waited long enough
+                self._send(batch)
+                batch, deadline = [], None
+                continue
+
+            if item is _STOP:
+                self._send(batch)
+                return
+
+            if isinstance(item, _Flush):
+                self._send(batch)
+                batch, deadline = [], None
+                item.done.set()
+                continue
+
+            batch.append(item)
+
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+
+            if len(batch) >= self.max_batch_size:
+                self._send(batch)
+                batch, deadline = [], None
+
+    def _send(self, rows):
+        if not rows:
+            return
+
+        try:
+            results = self.client.insert_many(self.sql, rows)
+        except Exception as error:
+            results = [
+                {"index": index, "success": False, "result": None, "error": error}
+                for index in range(len(rows))
+            ]
+
+        for row, result in zip(rows, results):
+            if result["success"]:
+                self.rows_written += 1
+            else:
+                self.rows_failed += 1
+
+            if self.on_result is None:
+                continue
+
+            # A failing callback must not stop the writer
+            try:
+                self.on_result(row, result)
+            except Exception:
+                log.exception("BufferedWriter on_result callback failed")
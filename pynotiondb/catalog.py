@@ -0,0 +1,190 @@
+import re
+import threading
+import time
+
+from .concurrency import map_concurrently
+
+_DATABASE_ID = re.compile(r"^[0-9a-fA-F]{8}-?(?:[0-9a-fA-F]{4}-?){3}[0-9a-fA-F]{12}$")
+
+
+def normalize_name(name):
+    # Table names in SQL cannot hold spaces unless quoted, so "Employee Records" matches employee_records
+    return re.sub(r"[\s_-]+", "_", name.strip()).lower()
+
+
+def is_database_id(value):
+    return bool(_DATABASE_ID.match(value))
+
+
+def _id_key(database_id):
+    return database_id.replace("-", "").lower()
+
+
+class DatabaseCatalog:
+    # Every database the integration can see, by id and by title, read from all pages of
+    # /v1/search. Search results carry the schema too, which is kept here and only handed to
+    # the schema cache for the databases that are queried.
+
+    DEFAULT_TTL = 300
+    # A name that is not in the catalog triggers a new search at most this often
+    DEFAULT_MISS_REFRESH_INTERVAL = 10
+    SEARCH_PAGE_SIZE = 100
+
+    def __init__(
+        self,
+        api,
+        ttl=DEFAULT_TTL,
+        miss_refresh_interval=DEFAULT_MISS_REFRESH_INTERVAL,
+    ):
+        # api is the NOTION_API searches and schema requests are sent with, its schema cache is filled
+        self.api = api
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+
+        self._databases = None
+        self._titles = {}
+        self._schemas = {}
+        self._refreshed_at = None
+        self._lock = threading.RLock()
+
+    def _expired(self):
+        return self._databases is None or (
+            self.ttl is not None and time.monotonic() - self._refreshed_at > self.ttl
+        )
+
+    def refresh(self):
+        # One search at a time, readers keep using the previous catalog meanwhile
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        databases = {}
+        titles = {}
+        schemas = {}
+        cursor = None
+
+        while True:
+            response = self.api.search_databases(
+                cursor=cursor, page_size=self.SEARCH_PAGE_SIZE
+            )
+
+            for result in response.get("results", []):
+                summary = self.api._database_summary(result)
+                databases[summary["id"]] = summary
+
+                if summary["title"]:
+                    titles.setdefault(normalize_name(summary["title"]), []).append(
+                        summary["id"]
+                    )
+
+                if result.get("properties"):
+                    schemas[_id_key(summary["id"])] = result["properties"]
+
+            cursor = response.get("next_cursor")
+
+            if not response.get("has_more") or not cursor:
+                break
+
+        self._titles = titles
+        self._schemas = schemas
+        self._databases = databases
+        self._refreshed_at = time.monotonic()
+
+        return databases
+
+    def _fresh(self):
+        if not self._expired():
+            return
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if self._expired():
+                self._refresh()
+
+    def databases(self):
+        # id -> summary, in the shape of get_all_database_info() results
+        self._fresh()
+        return dict(self._databases)
+
+    def titles(self):
+        self._fresh()
+        return {name: list(ids) for name, ids in self._titles.items()}
+
+    def resolve(self, name_or_id):
+        if name_or_id is None:
+            raise ValueError("A table name or database id is required")
+
+        if is_database_id(name_or_id):
+            return name_or_id
+
+        self._fresh()
+
+        name = normalize_name(name_or_id)
+        database_ids = self._titles.get(name)
+
+        # A database shared since the last search is found by searching again
+        if (
+            not database_ids
+            and time.monotonic() - self._refreshed_at > self.miss_refresh_interval
+        ):
+            self.refresh()
+            database_ids = self._titles.get(name)
+
+        if not database_ids:
+            raise ValueError(
+                "Unknown table: no shared database is called {!r}".format(name_or_id)
+            )
+
+        if len(database_ids) > 1:
+            raise ValueError(
+                "Ambiguous table: {} databases are called {!r}".format(
+                    len(database_ids), name_or_id
+                )
+            )
+
+        return database_ids[0]
+
+    def schema(self, name_or_id, refresh=False):
+        database_id = self.resolve(name_or_id)
+
+        data = None if refresh else self.api._get_cached_schema(database_id)
+
+        if data is None and not refresh:
+            data = self.seed(database_id)
+
+        if data is not None:
+            return data
+
+        response = self.api.request_helper(
+            url=self.api.DATABASES.format(database_id), method="GET"
+        )
+
+        return self.api._cache_schema(self.api._json(response), database_id)
+
+    def seed(self, database_id):
+        # Puts the schema from the last search into the schema cache without a request,
+        # returns None when the catalog does not have it
+        properties = self._schemas.get(_id_key(database_id))
+
+        if properties is None:
+            return None
+
+        return self.api._cache_schema({"properties": properties}, database_id)
+
+    def warm(self, names_or_ids=None, max_workers=None, refresh=False):
+        # Caches the schemas of the given (or all) databases, e.g. at startup. Schemas that came
+        # with the search results are used as they are, the others are requested concurrently.
+        if names_or_ids is None:
+            names_or_ids = list(self.databases())
+
+        return map_concurrently(
+            lambda name_or_id: self.schema(name_or_id, refresh=refresh),
+            names_or_ids,
+            max_workers=(
+                max_workers if max_workers is not None else self.api.max_workers
+            ),
+        )
+
+    def invalidate(self):
+        with self._lock:
+            self._databases = None
@@ -0,0 +1,154 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .base import BaseNotionAPI
+from .catalog import DatabaseCatalog, normalize_name
+from .concurrency import TokenBucket
+from .mysql_query_parser import MySQLQueryParser
+from .notion_api import NOTION_API
+
+
+class NotionClient:
+    # One session, rate limiter and schema cache for every database reachable with a token.
+    # database() hands out NOTION_API handles that share them, execute() routes by table name.
+
+    DEFAULT_POOL_MAXSIZE = 32
+
+    def __init__(
+        self,
+        token,
+        databases=None,
+        schema_ttl=BaseNotionAPI.DEFAULT_SCHEMA_TTL,
+        max_workers=BaseNotionAPI.DEFAULT_MAX_WORKERS,
+        rate_limit=BaseNotionAPI.DEFAULT_RATE_LIMIT,
+        retry_policy=None,
+        codec=None,
+        base_url=None,
+        hooks=None,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        catalog_ttl=DatabaseCatalog.DEFAULT_TTL,
+        timeout=BaseNotionAPI.DEFAULT_TIMEOUT,
+    ):
+        self.token = token
+        self.schema_ttl = schema_ttl
+        self.max_workers = max_workers
+        self.retry_policy = retry_policy
+        self.codec = codec
+        self.base_url = base_url
+        self.timeout = timeout
+        self.hooks = list(hooks or ())
+
+        # Table name -> database id, checked before searching
+        self.databases = {
+            normalize_name(name): value for name, value in (databases or {}).items()
+        }
+
+        # Notion's rate limit applies to the integration token, not to a database
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self._schema_cache = {}
+
+        self.session = requests.Session()
+        # Connections are kept alive and reused by every handle
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._handles = {}
+        self._lock = threading.Lock()
+
+        # Database search is not tied to a database
+        self._search = self._handle(None)
+        self.session.headers.update(self._search.headers)
+
+        # Resolves table names without a request, and has the schemas of the databases it found
+        self.catalog = DatabaseCatalog(self._search, ttl=catalog_ttl)
+        self._search.catalog = self.catalog
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _handle(self, database_id):
+        handle = NOTION_API(
+            self.token,
+            database_id,
+            schema_ttl=self.schema_ttl,
+            max_workers=self.max_workers,
+            rate_limit=None,
+            retry_policy=self.retry_policy,
+            codec=self.codec,
+            base_url=self.base_url,
+            hooks=self.hooks,
+            session=self.session,
+            timeout=self.timeout,
+        )
+
+        handle.rate_limiter = self.rate_limiter
+        handle._schema_cache = self._schema_cache
+
+        return handle
+
+    def database(self, name_or_id):
+        # A handle for a database id, or for a table name as it would appear in SQL
+        database_id = self.resolve(name_or_id)
+        # The same database with and without dashes in its id gets one handle
+        key = database_id.replace("-", "").lower()
+
+        with self._lock:
+            handle = self._handles.get(key)
+
+            if handle is None:
+                handle = self._handles[key] = self._handle(database_id)
+                handle.catalog = self.catalog
+
+                # The schema came with the search results, so the handle needs no request for it
+                if handle._get_cached_schema() is None:
+                    self.catalog.seed(database_id)
+
+        return handle
+
+    def add_hook(self, hook):
+        self.hooks = self.hooks + [hook]
+
+        for handle in [self._search] + list(self._handles.values()):
+            handle.hooks = self.hooks
+
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks = [item for item in self.hooks if item is not hook]
+
+        for handle in [self._search] + list(self._handles.values()):
+            handle.hooks = self.hooks
+
+    def resolve(self, name_or_id):
+        if name_or_id is None:
+            raise ValueError("A table name or database id is required")
+
+        name = normalize_name(name_or_id)
+
+        if name in self.databases:
+            return self.databases[name]
+
+        return self.catalog.resolve(name_or_id)
+
+    def warm(self, names_or_ids=None, max_workers=None):
+        # Loads the catalog and the schema of every database up front, e.g. at startup
+        return self.catalog.warm(names_or_ids, max_workers=max_workers)
+
+    def execute(self, sql, val=None):
+        try:
+            table = MySQLQueryParser(sql).parse_ast().table
+        except ValueError:
+            raise ValueError(
+                "Invalid SQL statement or type of statement not implemented"
+            )
+
+        return self.database(table).execute(sql, val)
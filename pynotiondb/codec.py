@@ -0,0 +1,80 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Request bodies and responses go through a codec, the fastest installed one is picked by default
+
+
+class JSONCodec:
+
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("The orjson codec requires orjson. Install it with: pip install orjson")
+
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
+
+
+class MsgspecCodec:
+
+    name = "msgspec"
+
+    def __init__(self):
+        if msgspec is None:
+            raise ImportError(
+                "The msgspec codec requires msgspec. Install it with: pip install msgspec"
+            )
+
+        # Reusing one encoder and decoder avoids setting them up again for every request
+        self.dumps = msgspec.json.Encoder().encode
+        self.loads = msgspec.json.Decoder().decode
+
+
+CODECS = {
+    "json": JSONCodec,
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+}
+
+
+def get_codec(codec=None):
+    # codec is None to pick automatically, a name from CODECS, or an object with dumps() and loads()
+    if codec is None:
+        if orjson is not None:
+            return OrjsonCodec()
+
+        if msgspec is not None:
+            return MsgspecCodec()
+
+        return JSONCodec()
+
+    if isinstance(codec, str):
+        if codec not in CODECS:
+            raise ValueError(
+                "Unknown codec {!r}, expected one of: {}".format(codec, ", ".join(CODECS))
+            )
+
+        return CODECS[codec]()
+
+    return codec
@@ -0,0 +1,122 @@
+import math
+from array import array
+
+from .filters import PAGE_COLUMNS
+
+# Property types stored as typed float64 columns, an empty value is stored as NaN
+NUMBER_COLUMN_TYPES = ("number", "unique_id")
+
+
+def _require(module, extra):
+    try:
+        return __import__(module)
+    except ImportError:
+        raise ImportError(
+            "This export requires {}. Install it with: pip install pynotiondb[{}]".format(
+                module, extra
+            )
+        )
+
+
+class ColumnarResult:
+    # One list (or array('d') for numbers) per column instead of one dict per row
+
+    def __init__(self, names, number_columns=()):
+        self.names = list(names)
+        self.number_columns = frozenset(number_columns)
+        self.columns = {
+            name: array("d") if name in self.number_columns else []
+            for name in self.names
+        }
+
+    @classmethod
+    def for_schema(cls, property_names, table_header):
+        names = [name.lower() for name in property_names] + list(PAGE_COLUMNS)
+        number_columns = [
+            name.lower()
+            for name in property_names
+            if table_header.get(name, {}).get("name") in NUMBER_COLUMN_TYPES
+        ]
+
+        return cls(names, number_columns)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # For results computed locally, e.g. aggregates, which are already dicts
+        result = cls(rows[0].keys() if rows else ())
+
+        for name in result.names:
+            result.extend(name, [row.get(name) for row in rows])
+
+        return result
+
+    def extend(self, name, values):
+        column = self.columns[name]
+
+        if name in self.number_columns:
+            column.extend(math.nan if value is None else value for value in values)
+        else:
+            column.extend(values)
+
+    def append(self, other):
+        for name in self.names:
+            self.columns[name].extend(other.columns[name])
+
+    def __len__(self):
+        if not self.names:
+            return 0
+
+        return len(self.columns[self.names[0]])
+
+    def column(self, name):
+        return self.columns[name]
+
+    def rows(self):
+        # Back to the dicts select() returns, NaN becomes None again
+        columns = [
+            (
+                [None if math.isnan(value) else value for value in self.columns[name]]
+                if name in self.number_columns
+                else self.columns[name]
+            )
+            for name in self.names
+        ]
+
+        for values in zip(*columns):
+            yield dict(zip(self.names, values))
+
+    def _arrow_arrays(self, pa):
+        return [
+            (
+                pa.array(self.columns[name], type=pa.float64(), from_pandas=True)
+                if name in self.number_columns
+                else pa.array(self.columns[name])
+            )
+            for name in self.names
+        ]
+
+    def to_arrow(self):
+        pa = _require("pyarrow", "arrow")
+
+        return pa.Table.from_arrays(self._arrow_arrays(pa), names=self.names)
+
+    def to_record_batch(self):
+        pa = _require("pyarrow", "arrow")
+
+        return pa.RecordBatch.from_arrays(self._arrow_arrays(pa), names=self.names)
+
+    def to_pandas(self):
+        pd = _require("pandas", "pandas")
+
+        # Number columns are handed over as float64 buffers without building Python floats
+        return pd.DataFrame(
+            {
+                name: (
+                    pd.Series(self.columns[name], dtype="float64")
+                    if name in self.number_columns
+                    else pd.Series(self.columns[name], dtype="object")
+                )
+                for name in self.names
+            },
+            columns=self.names,
+        )
@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+_DONE = object()
+
+
+def in_context(func):
+    # Threads start with an empty context, this runs func in a copy of the caller's, so work
+    # done on a worker thread is still counted against the statement that started it
+    if contextvars is None:
+        return func
+
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+def prefetch(iterable, depth=1):
+    # Consume iterable on a background thread, keeping at most depth items ready ahead of the caller
+    buffer = queue.Queue(maxsize=max(1, int(depth)))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as error:
+            put((_DONE, error))
+        else:
+            put((_DONE, None))
+
+    thread = threading.Thread(target=in_context(produce), daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item, error = buffer.get()
+
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+
+            yield item
+
+    finally:
+        # Lets the producer exit if the caller stops iterating early
+        stop.set()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token now and returns how many seconds the caller must wait before using it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return delay
+
+
+def map_concurrently(func, items, max_workers=1):
+    # Runs func over items and reports every item instead of stopping at the first failure
+
+    def call(index, item):
+        try:
+            return {"index": index, "success": True, "result": func(item), "error": None}
+        except Exception as error:
+            return {"index": index, "success": False, "result": None, "error": error}
+
+    if max_workers is None or max_workers <= 1:
+        return [call(index, item) for index, item in enumerate(items)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(in_context(call), index, item)
+            for index, item in enumerate(items)
+        ]
+        return [future.result() for future in futures]
+
+
+async def gather_concurrently(func, items, max_workers=1):
+    # Same contract as map_concurrently for coroutine functions, at most max_workers run at once
+    semaphore = asyncio.Semaphore(max(1, max_workers or 1))
+
+    async def call(index, item):
+        async with semaphore:
+            try:
+                result = await func(item)
+            except Exception as error:
+                return {"index": index, "success": False, "result": None, "error": error}
+
+            return {"index": index, "success": True, "result": result, "error": None}
+
+    return list(
+        await asyncio.gather(*[call(index, item) for index, item in enumerate(items)])
+    )
@@ -0,0 +1,169 @@
+from operator import itemgetter
+
+from .filters import PAGE_COLUMNS
+
+# Turns Notion property values into plain Python values. compile_decoder() picks the
+# extractor of every column once per schema, so decoding a row is one call per column.
+
+
+def _text(parts):
+    # An empty cell has no fragments and reads as NULL
+    if not parts:
+        return None
+
+    # Most values are a single fragment
+    if len(parts) == 1:
+        return parts[0]["plain_text"]
+
+    return "".join([part.get("plain_text", "") for part in parts])
+
+
+def _date(value):
+    # A date range is written as an ISO 8601 interval
+    if not value:
+        return None
+
+    if value.get("end"):
+        return "{}/{}".format(value["start"], value["end"])
+
+    return value["start"]
+
+
+def _name(option):
+    return option["name"] if option else None
+
+
+def _user(user):
+    return user.get("name") or user["id"]
+
+
+def _file(file):
+    return file.get("name") or file.get(file.get("type"), {}).get("url")
+
+
+def _unique_id(value):
+    return value["number"] if value else None
+
+
+def _formula(value):
+    if value is None:
+        return None
+
+    if value["type"] == "date":
+        return _date(value["date"])
+
+    return value.get(value["type"])
+
+
+def _rollup(value):
+    if value is None:
+        return None
+
+    if value["type"] == "date":
+        return _date(value["date"])
+
+    if value["type"] == "array":
+        return [decode_value(item) for item in value["array"]]
+
+    return value.get(value["type"])
+
+
+def _title(prop):
+    return _text(prop["title"])
+
+
+def _rich_text(prop):
+    return _text(prop["rich_text"])
+
+
+EXTRACTORS = {
+    "title": _title,
+    "rich_text": _rich_text,
+    "number": itemgetter("number"),
+    "checkbox": itemgetter("checkbox"),
+    "url": itemgetter("url"),
+    "email": itemgetter("email"),
+    "phone_number": itemgetter("phone_number"),
+    "select": lambda prop: _name(prop["select"]),
+    "status": lambda prop: _name(prop["status"]),
+    "multi_select": lambda prop: [option["name"] for option in prop["multi_select"]],
+    "date": lambda prop: _date(prop["date"]),
+    "people": lambda prop: [_user(user) for user in prop["people"]],
+    "relation": lambda prop: [relation["id"] for relation in prop["relation"]],
+    "files": lambda prop: [_file(file) for file in prop["files"]],
+    "created_time": itemgetter("created_time"),
+    "last_edited_time": itemgetter("last_edited_time"),
+    "created_by": lambda prop: _user(prop["created_by"]),
+    "last_edited_by": lambda prop: _user(prop["last_edited_by"]),
+    "formula": lambda prop: _formula(prop["formula"]),
+    "rollup": lambda prop: _rollup(prop["rollup"]),
+    "unique_id": lambda prop: _unique_id(prop["unique_id"]),
+}
+
+
+def _unsupported(prop):
+    return None
+
+
+def decode_value(prop):
+    # Decodes a single value by its own type, for when the schema is unknown or out of date
+    if not prop:
+        return None
+
+    try:
+        return EXTRACTORS.get(prop.get("type"), _unsupported)(prop)
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+
+def compile_decoder(property_names, table_header):
+    # (result key, property name, extractor) for every selected column
+    return tuple(
+        (
+            name.lower(),
+            name,
+            EXTRACTORS.get(table_header.get(name, {}).get("name"), decode_value),
+        )
+        for name in property_names
+    )
+
+
+def _extract(extract, prop):
+    if prop is None:
+        return None
+
+    try:
+        return extract(prop)
+    except (KeyError, TypeError, AttributeError):
+        return decode_value(prop)
+
+
+def decode_rows(results, decoder):
+    rows = []
+
+    for entry in results:
+        properties = entry["properties"]
+
+        try:
+            row = {key: extract(properties[name]) for key, name, extract in decoder}
+        except (KeyError, TypeError, AttributeError):
+            # A property is missing or changed type since the schema was cached
+            row = {
+                key: _extract(extract, properties.get(name))
+                for key, name, extract in decoder
+            }
+
+        # With no properties selected there is nothing to return for the page
+        if not row:
+            continue
+
+        for column in PAGE_COLUMNS:
+            row[column] = entry[column]
+
+        rows.append(row)
+
+    return rows
+
+
+def decode_column(results, name, extract):
+    return [_extract(extract, entry["properties"].get(name)) for entry in results]
@@ -0,0 +1,146 @@
+import datetime
+
+from .decoders import decode_value
+
+# Turns Python values into Notion property values, the counterpart of decoders.py.
+# Keyed by property type; types that cannot be written (formula, rollup, ...) are missing.
+
+
+def _number(value):
+    if value is None or value == "":
+        return None
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        try:
+            return float(value) if "." in str(value) else int(value)
+        except (TypeError, ValueError):
+            raise ValueError("{!r} is not a number".format(value))
+
+    return value
+
+
+def _text(value):
+    # An empty string clears the cell, which reads back as None
+    if value is None or value == "":
+        return []
+
+    value = str(value)
+
+    return [{"type": "text", "text": {"content": value}, "plain_text": value}]
+
+
+def _checkbox(value):
+    if isinstance(value, str):
+        if value.strip().lower() in ("true", "1", "yes"):
+            return True
+        if value.strip().lower() in ("false", "0", "no", ""):
+            return False
+
+        raise ValueError("{!r} is not a checkbox value".format(value))
+
+    return bool(value)
+
+
+def _option(value):
+    return {"name": str(value)} if value not in (None, "") else None
+
+
+def _items(value):
+    # Lists are written as lists, strings as comma separated items
+    if value is None or value == "":
+        return []
+
+    if isinstance(value, (list, tuple, set)):
+        return [str(item) for item in value]
+
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def iso_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+
+    return value
+
+
+def _date(value):
+    if value is None or value == "":
+        return None
+
+    if isinstance(value, (list, tuple)):
+        start, end = value
+        return {"start": iso_value(start), "end": iso_value(end)}
+
+    value = str(iso_value(value))
+
+    # start/end is how decoders.py reads a range back
+    if "/" in value:
+        start, end = value.split("/", 1)
+        return {"start": start, "end": end}
+
+    return {"start": value}
+
+
+def _string(value):
+    return str(value) if value not in (None, "") else None
+
+
+ENCODERS = {
+    "title": lambda value: {"title": _text(value)},
+    "rich_text": lambda value: {"rich_text": _text(value)},
+    "number": lambda value: {"number": _number(value)},
+    "checkbox": lambda value: {"checkbox": _checkbox(value)},
+    "select": lambda value: {"select": _option(value)},
+    "status": lambda value: {"status": _option(value)},
+    "multi_select": lambda value: {
+        "multi_select": [{"name": name} for name in _items(value)]
+    },
+    "date": lambda value: {"date": _date(value)},
+    "url": lambda value: {"url": _string(value)},
+    "email": lambda value: {"email": _string(value)},
+    "phone_number": lambda value: {"phone_number": _string(value)},
+    "relation": lambda value: {"relation": [{"id": id} for id in _items(value)]},
+    "people": lambda value: {
+        "people": [{"object": "user", "id": id} for id in _items(value)]
+    },
+}
+
+
+def encode_value(property_type, value, column=None):
+    # None when the property type cannot be written
+    encode = ENCODERS.get(property_type)
+
+    if encode is None:
+        return None
+
+    try:
+        return encode(value)
+    except ValueError as error:
+        if column is None:
+            raise
+
+        raise ValueError("{} for the column {}".format(error, column))
+
+
+def comparable_value(prop):
+    # A property value as written or as read back from Notion, in a form that compares equal
+    # when both hold the same thing. People and relations are compared by id.
+    if not prop:
+        return None
+
+    # Written values are {type: value}, values read back also carry "id" and "type"
+    property_type = prop.get("type") or next(iter(prop))
+
+    if property_type in ("people", "relation"):
+        return tuple(
+            item["id"].replace("-", "").lower() for item in prop[property_type] or ()
+        )
+
+    value = decode_value(dict(prop, type=property_type))
+
+    return tuple(value) if isinstance(value, list) else value
+
+
+def same_value(value, current):
+    # True when writing value would leave the current property as it is
+    return current is not None and comparable_value(value) == comparable_value(current)
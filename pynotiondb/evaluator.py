@@ -0,0 +1,238 @@
+from .sql_ast import (
+    AGGREGATE_FUNCTIONS,
+    And,
+    Arithmetic,
+    Column,
+    Comparison,
+    Function,
+    Literal,
+    Not,
+    Or,
+    Placeholder,
+)
+
+# Evaluates parsed WHERE/ORDER BY clauses against decoded rows the same way Notion filters and sorts them
+
+# resolved maps expressions that were already computed, like aggregates of a group, to their value
+
+
+def evaluate(expr, row, resolved=None):
+    if isinstance(expr, And):
+        return all(evaluate(operand, row, resolved) for operand in expr.operands)
+
+    if isinstance(expr, Or):
+        return any(evaluate(operand, row, resolved) for operand in expr.operands)
+
+    if isinstance(expr, Not):
+        return not evaluate(expr.operand, row, resolved)
+
+    if isinstance(expr, Comparison):
+        return _compare(expr, row, resolved)
+
+    raise ValueError("Cannot evaluate {!r}".format(expr))
+
+
+def value_of(expr, row, resolved=None):
+    if resolved and expr in resolved:
+        return resolved[expr]
+
+    if isinstance(expr, Column):
+        return row.get(expr.name)
+
+    if isinstance(expr, (Literal, Placeholder)):
+        return _literal(expr)
+
+    if isinstance(expr, Arithmetic):
+        return _arithmetic(
+            expr.operator,
+            value_of(expr.left, row, resolved),
+            value_of(expr.right, row, resolved),
+        )
+
+    if isinstance(expr, Function):
+        if expr.name in AGGREGATE_FUNCTIONS:
+            raise ValueError(
+                "{} can only be used in the selected columns, HAVING and ORDER BY".format(
+                    expr.name
+                )
+            )
+
+        return _scalar(expr.name, value_of(expr.args[0], row, resolved))
+
+    raise ValueError("Cannot evaluate {!r}".format(expr))
+
+
+def _arithmetic(operator, left, right):
+    # Like SQL, arithmetic on an empty value is empty
+    if _is_empty(left) or _is_empty(right):
+        return None
+
+    if operator == "+" and isinstance(left, str) and isinstance(right, str):
+        return left + right
+
+    try:
+        left = _to_number(left)
+        right = _to_number(right)
+    except (TypeError, ValueError):
+        raise ValueError("Cannot compute {!r} {} {!r}".format(left, operator, right))
+
+    if operator == "+":
+        return left + right
+    if operator == "-":
+        return left - right
+    if operator == "*":
+        return left * right
+
+    return left / right if right else None
+
+
+def _to_number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+
+    value = str(value)
+
+    return float(value) if "." in value else int(value)
+
+
+def _scalar(name, value):
+    if _is_empty(value):
+        return None
+
+    if name == "LOWER":
+        return str(value).lower()
+    if name == "UPPER":
+        return str(value).upper()
+    if name == "LENGTH":
+        return len(value) if isinstance(value, list) else len(str(value))
+
+    return abs(_to_number(value))
+
+
+def _is_empty(value):
+    return value is None or value == "" or value == []
+
+
+def _literal(value):
+    if isinstance(value, Placeholder):
+        raise ValueError(
+            "The WHERE clause has a %s placeholder with no value bound to it"
+        )
+
+    if isinstance(value, Literal):
+        return value.value
+
+    return value
+
+
+def _coerce(actual, expected):
+    # Literals are compared using the type of the stored value, e.g. '10' against a number
+    if isinstance(actual, bool) and not isinstance(expected, bool):
+        return str(expected).lower() in ("1", "true", "yes")
+
+    if isinstance(actual, (int, float)) and not isinstance(actual, bool):
+        try:
+            return float(expected)
+        except (TypeError, ValueError):
+            return expected
+
+    if isinstance(actual, str) and not isinstance(expected, str):
+        return str(expected)
+
+    return expected
+
+
+def _equals(actual, expected):
+    expected = _coerce(actual, expected)
+
+    # List values (multi_select, relation, people) match when they contain the value
+    if isinstance(actual, list):
+        return expected in actual
+
+    return actual == expected
+
+
+def _like(actual, pattern):
+    actual = str(actual).lower()
+    pattern = str(pattern).lower()
+
+    starts = pattern.startswith("%")
+    ends = pattern.endswith("%") and len(pattern) > 1
+    text = pattern.strip("%")
+
+    if starts == ends:
+        return text in actual
+
+    return actual.startswith(text) if ends else actual.endswith(text)
+
+
+def _compare(comparison, row, resolved):
+    actual = value_of(comparison.left, row, resolved)
+    operator = comparison.operator
+
+    if operator == "IS NULL":
+        return _is_empty(actual)
+
+    if operator == "IS NOT NULL":
+        return not _is_empty(actual)
+
+    if operator in ("IN", "NOT IN"):
+        found = not _is_empty(actual) and any(
+            _equals(actual, _literal(value)) for value in comparison.right
+        )
+        if operator == "IN":
+            return found
+
+        return not _is_empty(actual) and not found
+
+    # Like Notion filters, empty values never match a comparison
+    if _is_empty(actual):
+        return False
+
+    expected = _literal(comparison.right)
+
+    if operator == "=":
+        return _equals(actual, expected)
+
+    if operator == "!=":
+        return not _equals(actual, expected)
+
+    if operator == "LIKE":
+        return _like(actual, expected)
+
+    if operator == "NOT LIKE":
+        return not _like(actual, expected)
+
+    expected = _coerce(actual, expected)
+
+    try:
+        if operator == ">":
+            return actual > expected
+        if operator == "<":
+            return actual < expected
+        if operator == ">=":
+            return actual >= expected
+        if operator == "<=":
+            return actual <= expected
+    except TypeError:
+        return False
+
+    raise ValueError("The operator {} is not supported".format(operator))
+
+
+def sort_rows(rows, order_by, key=lambda row: row):
+    # Sorted once per column from the last to the first, relying on sort stability; empty values go last
+    rows = list(rows)
+
+    for order in reversed(order_by):
+        column = order["column"]
+        descending = order["direction"] == "descending"
+
+        filled = [row for row in rows if not _is_empty(key(row).get(column))]
+        empty = [row for row in rows if _is_empty(key(row).get(column))]
+
+        filled.sort(key=lambda row: key(row).get(column), reverse=descending)
+
+        rows = filled + empty
+
+    return rows
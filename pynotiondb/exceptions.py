@@ -1,2 +1,5 @@
 class NotionAPIError(Exception):
-    pass
\ No newline at end of file
+    def __init__(self, message, status_code=None, code=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
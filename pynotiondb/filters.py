@@ -0,0 +1,421 @@
+from .sql_ast import (
+    And,
+    Column,
+    Comparison,
+    Function,
+    Literal,
+    Not,
+    Or,
+    Placeholder,
+    iter_comparisons,
+    to_sql,
+)
+
+# Notion only accepts compound filters nested two levels deep
+MAX_FILTER_DEPTH = 2
+
+# Upper bound on the number of AND groups produced when flattening a deeper WHERE clause
+MAX_FLATTENED_TERMS = 100
+
+# Columns every page has even though they are not part of the database schema
+TIMESTAMP_COLUMNS = ("created_time", "last_edited_time")
+PAGE_COLUMNS = ("id",) + TIMESTAMP_COLUMNS
+PAGE_SIZE_COLUMN = "page_size"
+
+TEXT_TYPES = ("title", "rich_text", "url", "email", "phone_number")
+NUMBER_TYPES = ("number", "unique_id")
+SELECT_TYPES = ("select", "status")
+LIST_TYPES = ("multi_select", "relation", "people")
+DATE_TYPES = ("date", "created_time", "last_edited_time")
+
+NUMBER_OPERATORS = {
+    "=": "equals",
+    "!=": "does_not_equal",
+    ">": "greater_than",
+    "<": "less_than",
+    ">=": "greater_than_or_equal_to",
+    "<=": "less_than_or_equal_to",
+}
+
+DATE_OPERATORS = {
+    "=": "equals",
+    ">": "after",
+    "<": "before",
+    ">=": "on_or_after",
+    "<=": "on_or_before",
+}
+
+EQUALITY_OPERATORS = {"=": "equals", "!=": "does_not_equal"}
+
+LIST_OPERATORS = {"=": "contains", "!=": "does_not_contain"}
+
+NEGATED_OPERATORS = {
+    "=": "!=",
+    "!=": "=",
+    ">": "<=",
+    "<=": ">",
+    "<": ">=",
+    ">=": "<",
+    "LIKE": "NOT LIKE",
+    "NOT LIKE": "LIKE",
+    "IN": "NOT IN",
+    "NOT IN": "IN",
+    "IS NULL": "IS NOT NULL",
+    "IS NOT NULL": "IS NULL",
+}
+
+
+def split_page_size(where):
+    # page_size is not a column, it may only be given as one of the top-level AND conditions
+    def is_page_size(expr):
+        return (
+            isinstance(expr, Comparison)
+            and isinstance(expr.left, Column)
+            and expr.left.name == PAGE_SIZE_COLUMN
+        )
+
+    if where is None:
+        return None, None
+
+    if is_page_size(where):
+        return _value(where.right), None
+
+    if isinstance(where, And):
+        page_sizes = [operand for operand in where.operands if is_page_size(operand)]
+        remaining = [operand for operand in where.operands if not is_page_size(operand)]
+
+        if page_sizes:
+            where = remaining[0] if len(remaining) == 1 else And(tuple(remaining))
+            return _value(page_sizes[-1].right), where
+
+    return None, where
+
+
+def compile_filter(where, table_header):
+    # IN lists are expanded before the depth check, as they add a level of nesting
+    expr = _expand_lists(_push_down_not(where, negate=False))
+
+    if _depth(expr) > MAX_FILTER_DEPTH:
+        expr = _flatten(expr)
+
+    return _compile(expr, table_header)
+
+
+def split_pushdown(where, table_header):
+    # Returns the AND terms Notion can filter on and the remaining terms, which are evaluated locally
+    if where is None:
+        return None, None
+
+    operands = where.operands if isinstance(where, And) else (where,)
+
+    pushed = []
+    residual = []
+
+    for operand in operands:
+        if _on_columns(operand) and _compiles(pushed + [operand], table_header):
+            pushed.append(operand)
+            continue
+
+        residual.append(operand)
+
+        # LOWER(Name) = 'x' still lets Notion narrow the rows down, its text filters ignore case
+        hint = _case_insensitive_hint(operand, table_header)
+
+        if hint is not None and _compiles(pushed + [hint], table_header):
+            pushed.append(hint)
+
+    return _conjunction(pushed), _conjunction(residual)
+
+
+def _on_columns(expr):
+    return all(
+        isinstance(comparison.left, Column) for comparison in iter_comparisons(expr)
+    )
+
+
+def _compiles(operands, table_header):
+    try:
+        compile_filter(_conjunction(operands), table_header)
+    except ValueError:
+        return False
+
+    return True
+
+
+def _conjunction(operands):
+    if not operands:
+        return None
+
+    return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+
+def _case_insensitive_hint(expr, table_header):
+    if not (
+        isinstance(expr, Comparison)
+        and expr.operator in ("=", "LIKE")
+        and isinstance(expr.left, Function)
+        and expr.left.name in ("LOWER", "UPPER")
+        and isinstance(expr.left.args[0], Column)
+        and isinstance(expr.right, Literal)
+        and isinstance(expr.right.value, str)
+    ):
+        return None
+
+    column = expr.left.args[0]
+
+    if table_header.get(column.name, {}).get("name") not in TEXT_TYPES:
+        return None
+
+    return Comparison(column, "LIKE", expr.right)
+
+
+def _push_down_not(expr, negate):
+    # NOT has no Notion equivalent, so negations are moved onto the comparisons (De Morgan)
+    if isinstance(expr, Not):
+        return _push_down_not(expr.operand, not negate)
+
+    if isinstance(expr, (And, Or)):
+        operands = tuple(_push_down_not(operand, negate) for operand in expr.operands)
+
+        if negate:
+            return (Or if isinstance(expr, And) else And)(operands)
+
+        return type(expr)(operands)
+
+    if negate:
+        return Comparison(expr.left, NEGATED_OPERATORS[expr.operator], expr.right)
+
+    return expr
+
+
+def _expand_lists(expr):
+    # c IN (1, 2) becomes c = 1 OR c = 2, c NOT IN (1, 2) becomes c != 1 AND c != 2
+    if isinstance(expr, (And, Or)):
+        return type(expr)(tuple(_expand_lists(operand) for operand in expr.operands))
+
+    if not (isinstance(expr, Comparison) and expr.operator in ("IN", "NOT IN")):
+        return expr
+
+    # The parser never produces one, but a tree built in code could; Notion has no filter
+    # that matches nothing or everything
+    if not expr.right:
+        raise ValueError(
+            "{} needs at least one value in a Notion filter".format(expr.operator)
+        )
+
+    single = "=" if expr.operator == "IN" else "!="
+    comparisons = tuple(Comparison(expr.left, single, value) for value in expr.right)
+
+    if len(comparisons) == 1:
+        return comparisons[0]
+
+    return (Or if expr.operator == "IN" else And)(comparisons)
+
+
+def _depth(expr):
+    if isinstance(expr, (And, Or)):
+        return 1 + max(_depth(operand) for operand in expr.operands)
+
+    return 0
+
+
+def _flatten(expr):
+    # Rewrites the tree as an OR of ANDs, which always fits in two levels
+    terms = _disjunctive_terms(expr)
+
+    groups = [term[0] if len(term) == 1 else And(tuple(term)) for term in terms]
+
+    return groups[0] if len(groups) == 1 else Or(tuple(groups))
+
+
+def _disjunctive_terms(expr):
+    if isinstance(expr, Or):
+        terms = []
+        for operand in expr.operands:
+            terms.extend(_disjunctive_terms(operand))
+
+    elif isinstance(expr, And):
+        terms = [[]]
+        for operand in expr.operands:
+            terms = [
+                term + other for term in terms for other in _disjunctive_terms(operand)
+            ]
+            _check_size(terms)
+
+    else:
+        terms = [[expr]]
+
+    _check_size(terms)
+
+    return terms
+
+
+def _check_size(terms):
+    if len(terms) > MAX_FLATTENED_TERMS:
+        raise ValueError(
+            "The WHERE clause is nested too deeply to be expressed as a Notion filter"
+        )
+
+
+def _compile(expr, table_header):
+    if isinstance(expr, And):
+        return {"and": [_compile(operand, table_header) for operand in expr.operands]}
+
+    if isinstance(expr, Or):
+        return {"or": [_compile(operand, table_header) for operand in expr.operands]}
+
+    return _compile_comparison(expr, table_header)
+
+
+def _compile_comparison(comparison, table_header):
+    if not isinstance(comparison.left, Column):
+        raise ValueError(
+            "{} cannot be used in a Notion filter".format(to_sql(comparison.left))
+        )
+
+    column = comparison.left.name
+    operator = comparison.operator
+
+    if column in table_header:
+        property_type = table_header[column]["name"]
+        target = {"property": column}
+
+    elif column in TIMESTAMP_COLUMNS:
+        property_type = column
+        target = {"timestamp": column}
+
+    elif column == PAGE_SIZE_COLUMN:
+        raise ValueError(
+            "page_size can only be combined with other conditions using AND"
+        )
+
+    else:
+        raise ValueError("Unknown column in WHERE clause: {}".format(column))
+
+    condition = _condition(property_type, operator, comparison.right, column)
+
+    target[property_type] = condition
+
+    return target
+
+
+def _condition(property_type, operator, right, column):
+    if operator == "IS NULL":
+        return {"is_empty": True}
+
+    if operator == "IS NOT NULL":
+        return {"is_not_empty": True}
+
+    value = _value(right)
+
+    if property_type in TEXT_TYPES:
+        if operator in ("LIKE", "NOT LIKE"):
+            return _like(str(value), operator == "NOT LIKE", column)
+
+        if operator in EQUALITY_OPERATORS:
+            return {EQUALITY_OPERATORS[operator]: str(value)}
+
+    elif property_type in NUMBER_TYPES:
+        if operator in NUMBER_OPERATORS:
+            return {NUMBER_OPERATORS[operator]: _number(value, column)}
+
+    elif property_type == "checkbox":
+        if operator in EQUALITY_OPERATORS:
+            return {EQUALITY_OPERATORS[operator]: _boolean(value, column)}
+
+    elif property_type in SELECT_TYPES:
+        if operator in EQUALITY_OPERATORS:
+            return {EQUALITY_OPERATORS[operator]: str(value)}
+
+    elif property_type in LIST_TYPES:
+        if operator in LIST_OPERATORS:
+            return {LIST_OPERATORS[operator]: str(value)}
+
+    elif property_type in DATE_TYPES:
+        if operator in DATE_OPERATORS:
+            return {DATE_OPERATORS[operator]: str(value)}
+
+    raise ValueError(
+        "The operator {} is not supported for the {} column {}".format(
+            operator, property_type, column
+        )
+    )
+
+
+def _like(pattern, negated, column):
+    # Only leading and trailing % wildcards can be expressed, a pattern without any matches as "contains"
+    starts = pattern.startswith("%")
+    ends = pattern.endswith("%") and len(pattern) > 1
+    text = pattern.strip("%")
+
+    if "%" in text:
+        raise ValueError(
+            "Only leading and trailing % wildcards are supported in LIKE for {}".format(
+                column
+            )
+        )
+
+    if starts == ends:
+        return {"does_not_contain" if negated else "contains": text}
+
+    if negated:
+        raise ValueError(
+            "NOT LIKE only supports '%text%' patterns for {}".format(column)
+        )
+
+    return {"starts_with": text} if ends else {"ends_with": text}
+
+
+def _value(right):
+    if isinstance(right, Placeholder):
+        raise ValueError(
+            "The WHERE clause has a %s placeholder with no value bound to it"
+        )
+
+    if isinstance(right, Literal):
+        return right.value
+
+    return right
+
+
+def _number(value, column):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        try:
+            value = float(value) if "." in str(value) else int(value)
+        except (TypeError, ValueError):
+            raise ValueError(
+                "{!r} is not a number for the column {}".format(value, column)
+            )
+
+    return value
+
+
+def _boolean(value, column):
+    if isinstance(value, bool):
+        return value
+
+    if str(value).lower() in ("1", "true", "yes"):
+        return True
+
+    if str(value).lower() in ("0", "false", "no"):
+        return False
+
+    raise ValueError("{!r} is not a boolean for the column {}".format(value, column))
+
+
+def compile_sorts(order_by, table_header):
+    sorts = []
+
+    for order in order_by:
+        column = order["column"]
+
+        if column in table_header:
+            sorts.append({"property": column, "direction": order["direction"]})
+
+        elif column in TIMESTAMP_COLUMNS:
+            sorts.append({"timestamp": column, "direction": order["direction"]})
+
+        else:
+            raise ValueError("Unknown column in ORDER BY clause: {}".format(column))
+
+    return sorts
@@ -0,0 +1,528 @@
+import functools
+import inspect
+import logging
+import re
+import threading
+from bisect import bisect_left
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+log = logging.getLogger("pynotiondb")
+
+# A hook is any object with some of these methods, each called with a plain dict:
+#   on_request(event)          after every request_helper() call, retries included
+#   on_statement_start(event)  before a statement runs
+#   on_statement(event)        after it finished, with the same dict filled in
+HOOK_METHODS = ("on_request", "on_statement_start", "on_statement")
+
+
+class _ThreadLocalVar:
+    # Stand-in for contextvars.ContextVar on Python 3.6, the value does not follow work into worker threads
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self):
+        return getattr(self._local, "value", None)
+
+    def set(self, value):
+        token = self.get()
+        self._local.value = value
+        return token
+
+    def reset(self, token):
+        self._local.value = token
+
+
+# The statement event requests are counted against
+if contextvars is not None:
+    current_statement = contextvars.ContextVar("pynotiondb_statement", default=None)
+else:
+    current_statement = _ThreadLocalVar()
+
+
+_PAGE_ID = re.compile(
+    r"/[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}(?=/|$)"
+)
+
+
+def endpoint_template(url, base_url):
+    # /databases/{id}/query instead of one endpoint per database or page
+    if url.startswith(base_url):
+        url = url[len(base_url) :]
+
+    return _PAGE_ID.sub("/{id}", url)
+
+
+def rows_of(result):
+    # Rows a statement returned or wrote, going by the shape of its result
+    if result is None:
+        return 1
+
+    if isinstance(result, dict):
+        if "data" in result:
+            return len(result["data"])
+
+        return result.get("affected", 0)
+
+    if isinstance(result, list):
+        return sum(1 for item in result if item["success"])
+
+    return len(result)
+
+
+def one_row(item):
+    return 1
+
+
+def traced_statement(kind=None, count=rows_of):
+    # Reports a client method as one statement. For generators count() is applied to every item,
+    # otherwise to the result. Without hooks, or when called by another statement, nothing is added.
+
+    def decorator(method):
+        if inspect.isasyncgenfunction(method):
+
+            async def traced(self, sql, args, kwargs):
+                event = self._start_statement(kind, sql)
+                iterator = method(self, *args, **kwargs)
+                rows = 0
+                error = None
+
+                try:
+                    while True:
+                        token = current_statement.set(event)
+
+                        try:
+                            item = await iterator.__anext__()
+                        except StopAsyncIteration:
+                            return
+                        finally:
+                            current_statement.reset(token)
+
+                        rows += count(item)
+                        yield item
+
+                except Exception as exc:
+                    error = exc
+                    raise
+
+                finally:
+                    await iterator.aclose()
+                    self._finish_statement(event, rows, error)
+
+        elif inspect.isgeneratorfunction(method):
+
+            def traced(self, sql, args, kwargs):
+                event = self._start_statement(kind, sql)
+                iterator = method(self, *args, **kwargs)
+                rows = 0
+                error = None
+
+                try:
+                    while True:
+                        # Only set while the generator runs, the caller may run other statements in between
+                        token = current_statement.set(event)
+
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                        finally:
+                            current_statement.reset(token)
+
+                        rows += count(item)
+                        yield item
+
+                except Exception as exc:
+                    error = exc
+                    raise
+
+                finally:
+                    iterator.close()
+                    self._finish_statement(event, rows, error)
+
+        elif inspect.iscoroutinefunction(method):
+
+            async def traced(self, sql, args, kwargs):
+                event = self._start_statement(kind, sql)
+                token = current_statement.set(event)
+
+                try:
+                    result = await method(self, *args, **kwargs)
+                except Exception as error:
+                    current_statement.reset(token)
+                    self._finish_statement(event, 0, error)
+                    raise
+
+                current_statement.reset(token)
+                self._finish_statement(event, count(result), None)
+
+                return result
+
+        else:
+
+            def traced(self, sql, args, kwargs):
+                event = self._start_statement(kind, sql)
+                token = current_statement.set(event)
+
+                try:
+                    result = method(self, *args, **kwargs)
+                except Exception as error:
+                    current_statement.reset(token)
+                    self._finish_statement(event, 0, error)
+                    raise
+
+                current_statement.reset(token)
+                self._finish_statement(event, count(result), None)
+
+                return result
+
+        # The statement text is the first argument after self, by position or by name
+        sql_parameter = list(inspect.signature(method).parameters)[1]
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.hooks or current_statement.get() is not None:
+                return method(self, *args, **kwargs)
+
+            sql = args[0] if args else kwargs.get(sql_parameter)
+
+            return traced(self, sql, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class LoggingHook:
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger if logger is not None else log
+        self.level = level
+
+    def on_request(self, event):
+        if not self.logger.isEnabledFor(self.level):
+            return
+
+        self.logger.log(
+            self.level,
+            "%s %s -> %s in %.1fms (%d bytes sent, %d received, %d retries)%s",
+            event["method"],
+            event["endpoint"],
+            event["status"] if event["status"] is not None else "no response",
+            event["latency"] * 1000,
+            event["request_bytes"],
+            event["response_bytes"],
+            event["retries"],
+            ": {!r}".format(event["error"]) if event["error"] is not None else "",
+        )
+
+    def on_statement(self, event):
+        if not self.logger.isEnabledFor(self.level):
+            return
+
+        self.logger.log(
+            self.level,
+            "%s: %d requests (%d retries), %d rows in %.1fms, parsing took %.2fms%s",
+            (event["statement"] or "statement").upper(),
+            event["requests"],
+            event["retries"],
+            event["rows"],
+            event["duration"] * 1000,
+            event["parse_time"] * 1000,
+            (
+                ", failed: {!r}".format(event["error"])
+                if event["error"] is not None
+                else ""
+            ),
+        )
+
+
+def _label_text(label_names, labels):
+    if not label_names:
+        return ""
+
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+            for name, value in zip(label_names, labels)
+        )
+    )
+
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self.values.get(labels, 0)
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} counter".format(self.name),
+        ]
+
+        with self._lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(
+                    "{}{} {}".format(
+                        self.name, _label_text(self.label_names, labels), value
+                    )
+                )
+
+        return lines
+
+
+class Histogram:
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (the last one is +Inf), sum]
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            counts = self.values.get(labels)
+
+            if counts is None:
+                counts = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+
+            counts[0][index] += 1
+            counts[1] += value
+
+    def count(self, *labels):
+        counts = self.values.get(labels)
+        return sum(counts[0]) if counts else 0
+
+    def sum(self, *labels):
+        counts = self.values.get(labels)
+        return counts[1] if counts else 0.0
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        label_names = self.label_names + ("le",)
+
+        with self._lock:
+            for labels, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(
+                        "{}_bucket{} {}".format(
+                            self.name,
+                            _label_text(label_names, labels + (bound,)),
+                            cumulative,
+                        )
+                    )
+
+                suffix = _label_text(self.label_names, labels)
+                lines.append("{}_sum{} {}".format(self.name, suffix, total))
+                lines.append("{}_count{} {}".format(self.name, suffix, cumulative))
+
+        return lines
+
+
+class MetricsHook:
+    # Prometheus style counters and histograms, render() returns the text exposition format
+
+    def __init__(self, namespace="pynotiondb", buckets=Histogram.DEFAULT_BUCKETS):
+        self.requests = Counter(
+            namespace + "_requests_total",
+            "Requests sent to the Notion API",
+            ("method", "endpoint", "status"),
+        )
+        self.retries = Counter(
+            namespace + "_request_retries_total",
+            "Requests repeated after a failure or a 429",
+            ("method", "endpoint"),
+        )
+        self.response_bytes = Counter(
+            namespace + "_response_bytes_total",
+            "Bytes received from the Notion API",
+            ("method", "endpoint"),
+        )
+        self.request_duration = Histogram(
+            namespace + "_request_duration_seconds",
+            "Time spent on a request, retries included",
+            ("method", "endpoint"),
+            buckets,
+        )
+        self.statements = Counter(
+            namespace + "_statements_total",
+            "Statements executed",
+            ("statement", "outcome"),
+        )
+        self.statement_rows = Counter(
+            namespace + "_statement_rows_total",
+            "Rows returned or written by statements",
+            ("statement",),
+        )
+        self.statement_duration = Histogram(
+            namespace + "_statement_duration_seconds",
+            "Time spent on a statement",
+            ("statement",),
+            buckets,
+        )
+
+    def on_request(self, event):
+        labels = (event["method"], event["endpoint"])
+
+        # Labels stay strings so render() can sort successes and failures together
+        status = str(event["status"]) if event["status"] is not None else "error"
+
+        self.requests.inc(labels + (status,))
+        self.request_duration.observe(labels, event["latency"])
+
+        if event["retries"]:
+            self.retries.inc(labels, event["retries"])
+
+        if event["response_bytes"]:
+            self.response_bytes.inc(labels, event["response_bytes"])
+
+    def on_statement(self, event):
+        statement = event["statement"] or "unknown"
+
+        self.statements.inc(
+            (statement, "error" if event["error"] is not None else "success")
+        )
+        self.statement_duration.observe((statement,), event["duration"])
+
+        if event["rows"]:
+            self.statement_rows.inc((statement,), event["rows"])
+
+    def render(self):
+        lines = []
+
+        for metric in (
+            self.requests,
+            self.retries,
+            self.response_bytes,
+            self.request_duration,
+            self.statements,
+            self.statement_rows,
+            self.statement_duration,
+        ):
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+
+def _nanoseconds(seconds):
+    return int(seconds * 1e9)
+
+
+class OpenTelemetryHook:
+    # One span per statement with a child span per request
+
+    def __init__(self, tracer=None):
+        if otel_trace is None:
+            raise ImportError(
+                "OpenTelemetryHook requires opentelemetry-api. Install it with: pip install pynotiondb[otel]"
+            )
+
+        self.tracer = (
+            tracer if tracer is not None else otel_trace.get_tracer("pynotiondb")
+        )
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def on_statement_start(self, event):
+        span = self.tracer.start_span(
+            "notion " + (event["statement"] or "statement"),
+            kind=otel_trace.SpanKind.CLIENT,
+            start_time=_nanoseconds(event["started_at"]),
+            attributes={"db.system": "notion", "db.statement": event["sql"]},
+        )
+
+        with self._lock:
+            self._spans[id(event)] = span
+
+    def on_statement(self, event):
+        with self._lock:
+            span = self._spans.pop(id(event), None)
+
+        if span is None:
+            return
+
+        # execute() only knows what kind of statement it ran once it was parsed
+        span.update_name("notion " + (event["statement"] or "statement"))
+        span.set_attributes(
+            {
+                "db.operation": event["statement"] or "unknown",
+                "pynotiondb.requests": event["requests"],
+                "pynotiondb.retries": event["retries"],
+                "pynotiondb.rows": event["rows"],
+                "pynotiondb.parse_time": event["parse_time"],
+            }
+        )
+
+        if event["error"] is not None:
+            span.record_exception(event["error"])
+            span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR))
+
+        span.end(end_time=_nanoseconds(event["started_at"] + event["duration"]))
+
+    def on_request(self, event):
+        context = None
+
+        if event["statement"] is not None:
+            with self._lock:
+                parent = self._spans.get(id(event["statement"]))
+
+            if parent is not None:
+                context = otel_trace.set_span_in_context(parent)
+
+        attributes = {
+            "http.request.method": event["method"],
+            "url.template": event["endpoint"],
+            "pynotiondb.retries": event["retries"],
+            "pynotiondb.request_bytes": event["request_bytes"],
+            "pynotiondb.response_bytes": event["response_bytes"],
+        }
+
+        if event["status"] is not None:
+            attributes["http.response.status_code"] = event["status"]
+
+        span = self.tracer.start_span(
+            "{} {}".format(event["method"], event["endpoint"]),
+            context=context,
+            kind=otel_trace.SpanKind.CLIENT,
+            start_time=_nanoseconds(event["started_at"]),
+            attributes=attributes,
+        )
+
+        if event["error"] is not None:
+            span.record_exception(event["error"])
+
+        if event["error"] is not None or (event["status"] or 0) >= 400:
+            span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR))
+
+        span.end(end_time=_nanoseconds(event["started_at"] + event["latency"]))
@@ -1,209 +1,812 @@
+import copy
 import re
-import csv
+from collections import namedtuple
+from functools import lru_cache
+
+from .sql_ast import (
+    AGGREGATE_FUNCTIONS,
+    SCALAR_FUNCTIONS,
+    And,
+    Arithmetic,
+    Assignment,
+    Column,
+    Comparison,
+    Delete,
+    Function,
+    Insert,
+    Literal,
+    Not,
+    Or,
+    OrderBy,
+    Placeholder,
+    Select,
+    SelectItem,
+    Update,
+    is_conjunction,
+    iter_comparisons,
+    literal_value,
+    to_sql,
+)
+
+# A single pass over the statement, every alternative is anchored so tokenizing is linear
+TOKEN_REGEX = re.compile(
+    r"""
+    (?P<whitespace>\s+)
+    | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    | (?P<quoted>`(?:[^`]|``)*`)
+    | (?P<number>\d+\.\d*|\.\d+|\d+)
+    | (?P<placeholder>%\(\w+\)s|%s|\?)
+    | (?P<operator><=|>=|<>|!=|==|=|<|>)
+    | (?P<punctuation>[(),*;\-+/])
+    | (?P<word>[^\W\d]\w*)
+    | (?P<error>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+KEYWORDS = {
+    "SELECT",
+    "FROM",
+    "WHERE",
+    "INSERT",
+    "INTO",
+    "VALUES",
+    "UPDATE",
+    "SET",
+    "DELETE",
+    "AND",
+    "OR",
+    "NOT",
+    "LIKE",
+    "IN",
+    "IS",
+    "NULL",
+    "TRUE",
+    "FALSE",
+    "BETWEEN",
+    "ORDER",
+    "BY",
+    "ASC",
+    "DESC",
+    "LIMIT",
+    "DISTINCT",
+    "GROUP",
+    "HAVING",
+    "AS",
+}
+
+OPERATOR_ALIASES = {"==": "=", "<>": "!="}
+
+# A Notion database id, with or without dashes, used as a table name
+DATABASE_ID_REGEX = re.compile(
+    r"[0-9a-fA-F]{8}-?(?:[0-9a-fA-F]{4}-?){3}[0-9a-fA-F]{12}(?![\w-])"
+)
+
+STATEMENT_CACHE_SIZE = 512
+
+# What a WHERE clause is made of, as opposed to the values compared in it
+CONDITION_TYPES = (Comparison, And, Or, Not)
+
+Token = namedtuple("Token", "kind value start end")
+
+END = Token("end", "", -1, -1)
+
+
+def tokenize(statement):
+    tokens = []
+
+    for match in TOKEN_REGEX.finditer(statement):
+        kind = match.lastgroup
+
+        if kind == "whitespace":
+            continue
+
+        if kind == "error":
+            raise ValueError(
+                "Invalid SQL statement: unexpected character {!r} at position {}".format(
+                    match.group(), match.start()
+                )
+            )
 
+        tokens.append(Token(kind, match.group(), match.start(), match.end()))
 
-class MySQLQueryParser:
+    return tokens
+
+
+def _unquote(text):
+    quote = text[0]
+    body = text[1:-1].replace(quote * 2, quote)
+
+    if quote == "`":
+        return body
+
+    return re.sub(r"\\(.)", r"\1", body)
 
-    INSERT_PATTERN = r"INSERT INTO ([\w\s]+) \(([^)]+)\) VALUES \(([^)]+)\)"
-    SELECT_PATTERN = r"SELECT\s+(?P<columns>[a-zA-Z\*,\s]+)\s+FROM\s+(?P<table>\w+)(?:\s+WHERE\s+(?P<conditions>.+))?"
-    UPDATE_PATTERN = r"UPDATE\s+(\w+)\s+SET\s+(.*?)\s+WHERE\s+(.*)"
-    DELETE_PATTERN = r"DELETE\s+FROM\s+(\w+)\s+WHERE\s+(.*)"
 
+class _Parser:
     def __init__(self, statement):
         self.statement = statement
+        self.tokens = tokenize(statement)
+        self.position = 0
+        self.placeholders = 0
+        self.named_placeholders = False
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return END
+
+    def advance(self):
+        token = self.peek()
+        self.position += 1
+        return token
 
     @staticmethod
-    def _process_string(input_string):
-        # CSV reader with a single quote as the quote character
-        csv_reader = csv.reader([input_string], quotechar="'", skipinitialspace=True)
+    def keyword_of(token):
+        if token.kind == "word" and token.value.upper() in KEYWORDS:
+            return token.value.upper()
+        return None
+
+    def at_keyword(self, *keywords):
+        return self.keyword_of(self.peek()) in keywords
+
+    def accept_keyword(self, keyword):
+        if self.at_keyword(keyword):
+            return self.advance()
+        return None
+
+    def expect_keyword(self, keyword):
+        token = self.accept_keyword(keyword)
+        if token is None:
+            self.error("expected {}".format(keyword))
+        return token
+
+    def accept(self, kind, value=None):
+        token = self.peek()
+        if token.kind == kind and (value is None or token.value == value):
+            return self.advance()
+        return None
+
+    def expect(self, kind, value=None):
+        token = self.accept(kind, value)
+        if token is None:
+            self.error("expected {!r}".format(value or kind))
+        return token
+
+    def error(self, message):
+        token = self.peek()
+
+        if token is END:
+            raise ValueError("Invalid SQL statement: {} at end of statement".format(message))
+
+        raise ValueError(
+            "Invalid SQL statement: {} near {!r} at position {}".format(
+                message, token.value, token.start
+            )
+        )
 
-        processed_values = next(csv_reader)
+    def parse(self):
+        # Each nested group takes a few frames of the recursive descent
+        try:
+            return self.parse_statement()
+        except RecursionError:
+            raise ValueError("Invalid SQL statement: the statement is nested too deeply")
+
+    def parse_statement(self):
+        keyword = self.keyword_of(self.peek())
+
+        if keyword == "INSERT":
+            statement = self.parse_insert()
+        elif keyword == "SELECT":
+            statement = self.parse_select()
+        elif keyword == "UPDATE":
+            statement = self.parse_update()
+        elif keyword == "DELETE":
+            statement = self.parse_delete()
+        else:
+            self.error("expected INSERT, SELECT, UPDATE or DELETE")
 
-        processed_values = [
-            value.strip() for value in processed_values if value.strip()
-        ]
+        self.accept("punctuation", ";")
 
-        return processed_values
+        if self.peek() is not END:
+            self.error("unexpected token")
 
-    def extract_insert_statement_info(self):
-        match = re.match(self.INSERT_PATTERN, self.statement)
+        return statement
+
+    def bare_words(self):
+        # Unquoted names and values may contain spaces, e.g. First Name or Rachel Adams
+        first = self.peek()
+
+        if first.kind != "word" or self.keyword_of(first):
+            return None
+
+        last = self.advance()
+
+        while self.peek().kind in ("word", "number") and not self.keyword_of(self.peek()):
+            last = self.advance()
+
+        return self.statement[first.start : last.end]
+
+    def identifier(self):
+        token = self.accept("quoted")
+        if token is not None:
+            return _unquote(token.value)
+
+        name = self.bare_words()
+        if name is None:
+            self.error("expected a name")
+
+        return name
+
+    def table_name(self):
+        # Database ids are split into numbers, words and dashes by the tokenizer, so they are matched on the text
+        token = self.peek()
+
+        if token.kind in ("number", "word"):
+            match = DATABASE_ID_REGEX.match(self.statement, token.start)
 
-        if match:
-            table_name = match.group(1)
-            prop_string = match.group(2)
-            values_string = match.group(3)
+            if match is not None:
+                while self.peek() is not END and self.peek().start < match.end():
+                    self.advance()
 
-            properties = self._process_string(prop_string)
-            values = self._process_string(values_string)
+                return match.group()
 
-            data = []
+        return self.identifier()
 
-            for index in range(len(properties)):
-                data.append({"property": properties[index], "value": values[index]})
+    def value(self):
+        token = self.peek()
 
-            if len(properties) > len(values):
+        if token.kind == "string":
+            self.advance()
+            return Literal(_unquote(token.value))
+
+        if token.kind == "number" or (token.kind == "punctuation" and token.value == "-"):
+            sign = -1 if self.accept("punctuation", "-") else 1
+            number = self.expect("number").value
+            return Literal(sign * (float(number) if "." in number else int(number)))
+
+        if token.kind == "placeholder":
+            self.advance()
+            named = token.value.startswith("%(")
+
+            # A statement takes either a sequence or a dict of parameters, not both
+            if (self.placeholders or self.named_placeholders) and (
+                named != self.named_placeholders
+            ):
+                raise ValueError(
+                    "Invalid SQL statement: %s and %(name)s placeholders cannot be mixed"
+                )
+
+            if named:
+                self.named_placeholders = True
+                return Placeholder(token.value[2:-2])
+
+            self.placeholders += 1
+            return Placeholder(self.placeholders - 1)
+
+        keyword = self.keyword_of(token)
+
+        if keyword in ("NULL", "TRUE", "FALSE"):
+            self.advance()
+            return Literal({"NULL": None, "TRUE": True, "FALSE": False}[keyword])
+
+        words = self.bare_words()
+        if words is None:
+            self.error("expected a value")
+
+        return Literal(words)
+
+    def comma_separated(self, parse_item):
+        items = [parse_item()]
+
+        while self.accept("punctuation", ","):
+            items.append(parse_item())
+
+        return items
+
+    def parse_insert(self):
+        self.expect_keyword("INSERT")
+        self.expect_keyword("INTO")
+        table = self.table_name()
+
+        self.expect("punctuation", "(")
+        columns = self.comma_separated(self.identifier)
+        self.expect("punctuation", ")")
+
+        self.expect_keyword("VALUES")
+
+        def row():
+            self.expect("punctuation", "(")
+            values = self.comma_separated(self.value)
+            self.expect("punctuation", ")")
+
+            if len(columns) > len(values):
                 raise Exception(
                     "The number of properties specified in the INSERT statement is larger than the number of values. Please ensure that the number of properties matches the number of values to correctly assign each property a corresponding value."
                 )
 
-            elif len(values) > len(properties):
+            elif len(values) > len(columns):
                 raise Exception(
                     "The number of values provided in the INSERT statement is larger than the number of properties. Please ensure that the number of values matches the number of properties in order to correctly map each value to its corresponding property."
                 )
 
-            return {"table_name": table_name, "data": data}
-        else:
-            return None
+            return tuple(values)
 
-    def extract_select_statement_info(self):
-        select_pattern = re.compile(self.SELECT_PATTERN, re.IGNORECASE)
-        match = select_pattern.match(self.statement)
-
-        if match:
-
-            table_name = match.group("table")
-
-            columns = match.group("columns").split(",")
-            columns = [col.strip() for col in columns if col.strip() != "*"]
-
-            conditions_str = match.group("conditions")
-
-            conditions = []
-            if conditions_str:
-
-                conditions_list = re.split(r"\s+(AND|OR)\s+", conditions_str)
-
-                i = 0
-
-                while i < len(conditions_list):
-                    if conditions_list[i] == "AND":
-                        conditions.append(conditions_list[i])
-                        i += 1
-                    else:
-                        try:
-                            for condition in conditions_list:
-                                operator_pattern = re.compile(r'==|<=|>=|LIKE|>|<|=')
-                                operator_match = operator_pattern.search(condition)
-                                if operator_match:
-                                    operator = operator_match.group(0)
-                                    key, value = condition.split(operator, 1)
-
-                                else:
-                                    raise Exception("Enable to parse")
-                        except Exception:
-                            raise Exception("The operator you are trying to use has not been implemented yet")
-                            
-                        key = key.strip()
-                        operator = operator.strip()
-                        value = value.strip().strip("'")
-                        condition = {
-                            "parameter": key,
-                            "operator": operator,
-                            "value": int(value) if value.isdigit() else value,
-                        }
-                        conditions.append(condition)
-                        i += 2
-
-            outut = {
-                "table": table_name,
-                "columns": columns if len(columns) != 0 else None,
-                "conditions": conditions if len(conditions) != 0 else None,
+        rows = self.comma_separated(row)
+
+        return Insert(table, tuple(columns), tuple(rows))
+
+    def parse_select(self):
+        self.expect_keyword("SELECT")
+
+        distinct = self.accept_keyword("DISTINCT") is not None
+
+        items = self.comma_separated(self.parse_select_item)
+
+        columns = [
+            item.expr
+            for item in items
+            if isinstance(item.expr, Column) and item.alias is None
+        ]
+
+        self.expect_keyword("FROM")
+        table = self.table_name()
+
+        where = self.parse_expression() if self.accept_keyword("WHERE") else None
+
+        group_by = None
+
+        if self.accept_keyword("GROUP"):
+            self.expect_keyword("BY")
+            group_by = tuple(self.comma_separated(self.parse_operand))
+
+        having = self.parse_expression() if self.accept_keyword("HAVING") else None
+
+        order_by = None
+
+        if self.accept_keyword("ORDER"):
+            self.expect_keyword("BY")
+            order_by = tuple(self.comma_separated(self.parse_order_by))
+
+        limit = None
+
+        if self.accept_keyword("LIMIT"):
+            limit = int(self.expect("number").value)
+
+        return Select(
+            table,
+            tuple(columns) if columns else None,
+            where,
+            order_by,
+            limit,
+            distinct,
+            tuple(items),
+            group_by,
+            having,
+        )
+
+    def parse_select_item(self):
+        if self.accept("punctuation", "*"):
+            return SelectItem(None, None)
+
+        expr = self.parse_operand()
+        alias = self.identifier() if self.accept_keyword("AS") else None
+
+        return SelectItem(expr, alias)
+
+    def parse_order_by(self):
+        expr = self.parse_operand()
+
+        # Computed values are ordered by the name they have in the results, e.g. COUNT(*)
+        column = expr.name if isinstance(expr, Column) else to_sql(expr)
+
+        if self.accept_keyword("DESC"):
+            return OrderBy(column, True)
+
+        self.accept_keyword("ASC")
+        return OrderBy(column, False)
+
+    def parse_operand(self, left=None):
+        # left is a term that was already parsed, e.g. a parenthesized value
+        left = self.parse_term(left)
+
+        while self.peek().kind == "punctuation" and self.peek().value in "+-":
+            operator = self.advance().value
+            left = Arithmetic(operator, left, self.parse_term())
+
+        return left
+
+    def parse_term(self, left=None):
+        if left is None:
+            left = self.parse_primary()
+
+        while self.peek().kind == "punctuation" and self.peek().value in "*/":
+            operator = self.advance().value
+            left = Arithmetic(operator, left, self.parse_primary())
+
+        return left
+
+    def parse_primary(self):
+        if self.accept("punctuation", "("):
+            expr = self.parse_operand()
+            self.expect("punctuation", ")")
+            return expr
+
+        token = self.peek()
+
+        if token.kind in ("string", "number", "placeholder") or (
+            token.kind == "punctuation" and token.value == "-"
+        ):
+            return self.value()
+
+        if self.keyword_of(token) in ("NULL", "TRUE", "FALSE"):
+            return self.value()
+
+        name = self.identifier()
+
+        if token.kind == "word" and self.accept("punctuation", "("):
+            return self.parse_function(name.upper())
+
+        return Column(name)
+
+    def parse_function(self, name):
+        if name not in AGGREGATE_FUNCTIONS + SCALAR_FUNCTIONS:
+            self.error("unknown function {}".format(name))
+
+        if name == "COUNT" and self.accept("punctuation", "*"):
+            self.expect("punctuation", ")")
+            return Function(name, (), False)
+
+        distinct = name in AGGREGATE_FUNCTIONS and self.accept_keyword("DISTINCT") is not None
+
+        args = (self.parse_operand(),)
+        self.expect("punctuation", ")")
+
+        return Function(name, args, distinct)
+
+    def parse_update(self):
+        self.expect_keyword("UPDATE")
+        table = self.table_name()
+        self.expect_keyword("SET")
+
+        assignments = [self.parse_assignment()]
+
+        # Assignments have always been accepted separated by AND as well as by commas
+        while self.accept("punctuation", ",") or self.accept_keyword("AND"):
+            assignments.append(self.parse_assignment())
+
+        self.expect_keyword("WHERE")
+
+        return Update(table, tuple(assignments), self.parse_expression())
+
+    def parse_assignment(self):
+        column = self.identifier()
+        self.expect("operator", "=")
+        return Assignment(column, self.value())
+
+    def parse_delete(self):
+        self.expect_keyword("DELETE")
+        self.expect_keyword("FROM")
+        table = self.table_name()
+        self.expect_keyword("WHERE")
+
+        return Delete(table, self.parse_expression())
+
+    def parse_expression(self, allow_operand=False):
+        # With allow_operand, a lone value is returned as it is, which is how groups are parsed
+        operands = [self.parse_and(allow_operand)]
+
+        while self.at_keyword("OR"):
+            self.expect_condition(operands[0])
+            self.advance()
+            operands.append(self.parse_and())
+
+        return self.combine(Or, operands)
+
+    def parse_and(self, allow_operand=False):
+        operands = [self.parse_not(allow_operand)]
+
+        while self.at_keyword("AND"):
+            self.expect_condition(operands[0])
+            self.advance()
+            operands.append(self.parse_not())
+
+        return self.combine(And, operands)
+
+    def expect_condition(self, expr):
+        if not isinstance(expr, CONDITION_TYPES):
+            self.error("expected a comparison")
+
+    @staticmethod
+    def combine(node_type, operands):
+        if len(operands) == 1:
+            return operands[0]
+
+        flattened = []
+
+        for operand in operands:
+            if isinstance(operand, node_type):
+                flattened.extend(operand.operands)
+            else:
+                flattened.append(operand)
+
+        return node_type(tuple(flattened))
+
+    def parse_not(self, allow_operand=False):
+        if self.accept_keyword("NOT"):
+            return Not(self.parse_not())
+
+        if not self.accept("punctuation", "("):
+            return self.parse_comparison(self.parse_operand(), allow_operand)
+
+        # A group is parsed once and holds either conditions or a value, e.g. (salary + bonus) > 10
+        expr = self.parse_expression(allow_operand=True)
+        self.expect("punctuation", ")")
+
+        if isinstance(expr, CONDITION_TYPES):
+            return expr
+
+        return self.parse_comparison(self.parse_operand(expr), allow_operand)
+
+    def parse_comparison(self, left, allow_operand=False):
+        negated = self.accept_keyword("NOT") is not None
+
+        if self.accept_keyword("LIKE"):
+            return Comparison(left, "NOT LIKE" if negated else "LIKE", self.value())
+
+        if self.accept_keyword("IN"):
+            self.expect("punctuation", "(")
+            values = self.comma_separated(self.value)
+            self.expect("punctuation", ")")
+            return Comparison(left, "NOT IN" if negated else "IN", tuple(values))
+
+        if self.accept_keyword("BETWEEN"):
+            low = self.value()
+            self.expect_keyword("AND")
+            high = self.value()
+            between = And((Comparison(left, ">=", low), Comparison(left, "<=", high)))
+            return Not(between) if negated else between
+
+        if negated:
+            self.error("expected LIKE, IN or BETWEEN after NOT")
+
+        if self.accept_keyword("IS"):
+            negated = self.accept_keyword("NOT") is not None
+            self.expect_keyword("NULL")
+            return Comparison(left, "IS NOT NULL" if negated else "IS NULL", None)
+
+        if allow_operand and self.peek().kind != "operator":
+            return left
+
+        operator = self.expect("operator").value
+
+        return Comparison(left, OPERATOR_ALIASES.get(operator, operator), self.value())
+
+
+def _condition(comparison):
+    return {
+        "parameter": comparison.left.name,
+        "operator": comparison.operator,
+        "value": literal_value(comparison.right),
+    }
+
+
+def _conditions(where):
+    # The flat list of conditions only describes WHERE clauses made of ANDs on columns
+    if where is None or not is_conjunction(where):
+        return None
+
+    if any(
+        not isinstance(comparison.left, Column) for comparison in iter_comparisons(where)
+    ):
+        return None
+
+    return [_condition(comparison) for comparison in iter_comparisons(where)]
+
+
+def _row_data(columns, values):
+    return [
+        {"property": column, "value": literal_value(value)}
+        for column, value in zip(columns, values)
+    ]
+
+
+def _set_values(assignments):
+    return [
+        {"key": assignment.column, "value": literal_value(assignment.value)}
+        for assignment in assignments
+    ]
+
+
+def _insert_info(statement):
+    rows = [_row_data(statement.columns, values) for values in statement.rows]
+
+    return {"table_name": statement.table, "data": rows[0], "rows": rows}
+
+
+def _select_info(statement):
+    columns = [column.name for column in statement.columns or ()]
+    conditions = _conditions(statement.where)
+
+    return {
+        "table": statement.table,
+        "columns": columns if len(columns) != 0 else None,
+        "conditions": conditions if conditions else None,
+        "where": statement.where,
+        "order_by": [
+            {
+                "column": order.column,
+                "direction": "descending" if order.descending else "ascending",
             }
+            for order in statement.order_by
+        ]
+        if statement.order_by
+        else None,
+        "limit": statement.limit,
+        "distinct": statement.distinct,
+        "items": statement.items,
+        "group_by": statement.group_by,
+        "having": statement.having,
+    }
 
-            return outut
 
-        raise ValueError("Invalid SQL statement")
+def _update_info(statement):
+    return {
+        "table_name": statement.table,
+        "set_values": _set_values(statement.assignments),
+        "where_clause": to_sql(statement.where),
+        "where": statement.where,
+    }
+
+
+def _delete_info(statement):
+    return {
+        "table_name": statement.table,
+        "where_clause": to_sql(statement.where),
+        "where": statement.where,
+    }
+
+
+def statement_info(statement):
+    # The dict parse() returns, for a statement tree, e.g. one with its placeholders bound
+    if isinstance(statement, Insert):
+        return _insert_info(statement)
+
+    if isinstance(statement, Select):
+        return _select_info(statement)
+
+    if isinstance(statement, Update):
+        return _update_info(statement)
+
+    return _delete_info(statement)
+
+
+def count_placeholders(node):
+    # Number of %s placeholders, named ones are listed by placeholder_names()
+    if isinstance(node, Placeholder):
+        return node.index + 1 if isinstance(node.index, int) else 0
+
+    if isinstance(node, tuple):
+        return max([count_placeholders(item) for item in node] or [0])
+
+    return 0
 
-    def extract_update_statement_info(self):
-        match = re.search(self.UPDATE_PATTERN, self.statement)
 
-        if not match:
+def placeholder_names(node):
+    if isinstance(node, Placeholder):
+        return (node.index,) if isinstance(node.index, str) else ()
+
+    if isinstance(node, tuple):
+        return tuple(
+            dict.fromkeys(name for item in node for name in placeholder_names(item))
+        )
+
+    return ()
+
+
+def bind_placeholders(node, params):
+    # Replaces every Placeholder of a statement or expression with a Literal of its parameter
+    if isinstance(node, Placeholder):
+        return Literal(params[node.index])
+
+    if isinstance(node, tuple):
+        items = [bind_placeholders(item, params) for item in node]
+
+        # Namedtuples take their fields as arguments, IN lists are plain tuples
+        return type(node)(*items) if hasattr(node, "_fields") else tuple(items)
+
+    return node
+
+
+class MySQLQueryParser:
+    def __init__(self, statement):
+        self.statement = statement
+
+    def parse_ast(self):
+        return _parse_ast(self.statement)
+
+    def _statement(self, statement_type):
+        try:
+            statement = self.parse_ast()
+        except ValueError:
             return None
 
-        table_name = match.group(1)
-        set_values_str = match.group(2)
-        where_clause = match.group(3)
+        return statement if isinstance(statement, statement_type) else None
 
-        set_values = self.extract_set_values(set_values_str)
+    def extract_insert_statement_info(self):
+        statement = self._statement(Insert)
 
-        output = {
-            "table_name": table_name,
-            "set_values": set_values,
-            "where_clause": where_clause,
-        }
-        return output
+        if statement is None:
+            return None
 
-    def extract_delete_statement_info(self):
-        match = re.search(self.DELETE_PATTERN, self.statement)
+        return _insert_info(statement)
+
+    def extract_select_statement_info(self):
+        statement = self.parse_ast()
+
+        if not isinstance(statement, Select):
+            raise ValueError("Invalid SQL statement")
+
+        return _select_info(statement)
+
+    def extract_update_statement_info(self):
+        statement = self._statement(Update)
 
-        if not match:
+        if statement is None:
             return None
 
-        table_name = match.group(1)
-        where_clause = match.group(2)
+        return _update_info(statement)
+
+    def extract_delete_statement_info(self):
+        statement = self._statement(Delete)
+
+        if statement is None:
+            return None
 
-        return {"table_name": table_name, "where_clause": where_clause}
+        return _delete_info(statement)
 
     def extract_set_values(self, set_values_str):
-        set_values = []
-        # Split by 'AND', but not within quotes
-        pairs = re.findall(r'(?:[^\'AND]+|\'[^\']*\')+', set_values_str)
-        for pair in pairs:
-            pair = pair.strip()
-            if not pair:
-                continue
-            # Find the position of the first '=' outside quotes
-            eq_pos = -1
-            in_quote = False
-            for i, char in enumerate(pair):
-                if char == "'":
-                    in_quote = not in_quote
-                elif char == '=' and not in_quote:
-                    eq_pos = i
-                    break
-            
-            if eq_pos == -1:
-                continue
-
-            key = pair[:eq_pos].strip()
-            value = pair[eq_pos+1:].strip().strip("'")
-            
-            # Handle numeric values
-            if value.isdigit():
-                value = int(value)
-            elif value.replace('.', '', 1).isdigit():
-                value = float(value)
-            
-            set_values.append({"key": key, "value": value})
-        return set_values
+        parser = _Parser(set_values_str)
 
-    def parse(self):
-        if re.match(self.INSERT_PATTERN, self.statement):
-            return self.extract_insert_statement_info()
+        assignments = [parser.parse_assignment()]
 
-        if re.compile(self.SELECT_PATTERN, re.IGNORECASE).match(self.statement):
-            return self.extract_select_statement_info()
+        while parser.accept("punctuation", ",") or parser.accept_keyword("AND"):
+            assignments.append(parser.parse_assignment())
 
-        if re.search(self.UPDATE_PATTERN, self.statement):
-            return self.extract_update_statement_info()
+        return _set_values(assignments)
 
-        if re.search(self.DELETE_PATTERN, self.statement):
-            return self.extract_delete_statement_info()
+    def parse(self):
+        # The cached result is shared between callers, so hand out a copy
+        return copy.deepcopy(_parse_statement(self.statement))
+
+    def parse_cached(self):
+        # Same as parse() without the copy, the result must be treated as read-only
+        return _parse_statement(self.statement)
 
-        raise ValueError("Invalid SQL statement")
+    def _parse_uncached(self):
+        return statement_info(self.parse_ast())
 
     def check_statement(self):
 
-        if re.match(self.INSERT_PATTERN, self.statement):
-            return True, "insert"
+        try:
+            statement = self.parse_ast()
+        except ValueError:
+            return False, "unknown"
+
+        return True, type(statement).__name__.lower()
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _parse_ast(statement):
+    return _Parser(statement).parse()
 
-        if re.compile(self.SELECT_PATTERN, re.IGNORECASE).match(self.statement):
-            return True, "select"
 
-        if re.search(self.UPDATE_PATTERN, self.statement):
-            return True, "update"
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _parse_statement(statement):
+    return MySQLQueryParser(statement)._parse_uncached()
 
-        if re.search(self.DELETE_PATTERN, self.statement):
-            return True, "delete"
 
-        return False, "unknown"
+def clear_parse_cache():
+    # Forgets every cached parse, e.g. to measure parsing from a cold start
+    _parse_ast.cache_clear()
+    _parse_statement.cache_clear()
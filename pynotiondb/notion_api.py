@@ -1,118 +1,178 @@
+import itertools
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from .base import BaseNotionAPI
+from .buffered_writer import BufferedWriter
+from .catalog import DatabaseCatalog
+from .columnar import ColumnarResult
+from .concurrency import map_concurrently
+from .concurrency import prefetch as prefetch_pages
+from .encoders import comparable_value
+from .evaluator import evaluate, sort_rows
 from .exceptions import NotionAPIError
-from .mysql_query_parser import MySQLQueryParser
-
-
-class NOTION_API:
-
-    SEARCH = "https://api.notion.com/v1/search"
-    PAGES = "https://api.notion.com/v1/pages"
-    UPDATE_PAGE = "https://api.notion.com/v1/pages/{}"
-    DELETE_PAGE = "https://api.notion.com/v1/pages/{}"
-    DATABASES = "https://api.notion.com/v1/databases/{}"
-    QUERY_DATABASE = "https://api.notion.com/v1/databases/{}/query"
-    DEFAULT_PAGE_SIZE_FOR_SELECT_STATEMENTS = 20
-
-    CONDITION_MAPPING = {
-        "=": "equals",
-        ">": "greater_than",
-        "<": "less_than",
-        "<=": "less_than_or_equal_to",
-        ">=": "greater_than_or_equal_to",
-        "==": "equals",
-    }
-
-    def __init__(self, token, databaseId):
-        self.token = token
-        self.databaseId = databaseId
-        self.DEFAULT_NOTION_VERSION = "2022-06-28"
-        self.AUTHORIZATION = "Bearer " + self.token
-        self.headers = {
-            "Authorization": self.AUTHORIZATION,
-            "Content-Type": "application/json",
-            "Notion-Version": self.DEFAULT_NOTION_VERSION,
-        }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+from .filters import LIST_TYPES, compile_filter, split_page_size
+from .instrumentation import one_row, traced_statement
+from .mysql_query_parser import STATEMENT_CACHE_SIZE
+from .prepared import PreparedStatement, bind_parameters
+from .row_cache import RowCache
+from .sql_ast import Column, Comparison, Literal, iter_columns
+
+
+class NOTION_API(BaseNotionAPI):
+
+    def __init__(
+        self,
+        token,
+        databaseId,
+        schema_ttl=BaseNotionAPI.DEFAULT_SCHEMA_TTL,
+        max_workers=BaseNotionAPI.DEFAULT_MAX_WORKERS,
+        rate_limit=BaseNotionAPI.DEFAULT_RATE_LIMIT,
+        retry_policy=None,
+        codec=None,
+        base_url=None,
+        hooks=None,
+        session=None,
+        catalog=None,
+        timeout=BaseNotionAPI.DEFAULT_TIMEOUT,
+    ):
+        super().__init__(
+            token,
+            databaseId,
+            schema_ttl=schema_ttl,
+            max_workers=max_workers,
+            rate_limit=rate_limit,
+            retry_policy=retry_policy,
+            codec=codec,
+            base_url=base_url,
+            hooks=hooks,
+        )
 
-    def request_helper(self, url, method="GET", payload=None):
-        response = self.session.request(method, url, json=payload)
-        # response.raise_for_status()
-        response = self.get_json(response)
-        return response
+        # A session passed in, e.g. by NotionClient, is shared with other databases and left as it is
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
 
-    def get_json(self, response):
-        if response.status_code >= 400:
-            try:
-                error_info = response.json()
-                error_message = error_info.get("message", "Unknown Notion API Error")
-                error_code = error_info.get("code", "Unknown Code")
+            adapter = HTTPAdapter(pool_maxsize=max(10, max_workers or 1))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
 
-            except Exception:
-                error_message = "Unable to parse"
-                error_code = "Unknown Code"
+        self.session = session
+        # Passed to every request, requests itself would wait forever; None disables it
+        self.timeout = timeout
 
-            raise NotionAPIError(
-                f"Notion API Error ({response.status_code}): {error_message} ({error_code})"
-            )
+        self.row_cache = None
+        self._prepared = {}
 
-        else:
-            return response
+        # Shared databases listed by get_all_database(), searched again once its TTL expired
+        self.catalog = catalog if catalog is not None else DatabaseCatalog(self)
+
+    def request_helper(
+        self, url, method="GET", payload=None, idempotent=None, params=None
+    ):
+
+        if idempotent is None:
+            idempotent = self.is_idempotent(url, method)
+
+        # Encoded once, retries send the same bytes
+        body = self._encode(payload)
 
-    def construct_payload_for_pages_creation(self, properties_data):
+        event = self._start_request(url, method, body) if self.hooks else None
 
-        json_data = {"parent": {"database_id": self.databaseId}, "properties": {}}
+        attempt = 0
 
-        for data in properties_data["data"]:
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
 
-            if data.get("name") == "number":
+            try:
+                response = self.session.request(
+                    method, url, data=body, params=params, timeout=self.timeout
+                )
+
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if not self.retry_policy.should_retry(attempt, idempotent):
+                    if event is not None:
+                        self._finish_request(event, attempt, error=error)
+                    raise
 
-                json_data["properties"][data.get("property")] = {
-                    "number": int(data.get("value"))
-                }
+                delay = self.retry_policy.get_delay(attempt)
+
+            else:
+                if response.status_code < 400 or not self.retry_policy.should_retry(
+                    attempt, idempotent, response.status_code
+                ):
+                    if event is not None:
+                        self._finish_request(event, attempt, response=response)
+                    return self.get_json(response)
+
+                delay = self.retry_policy.get_delay(
+                    attempt,
+                    retry_after=self.retry_policy.parse_retry_after(
+                        response.headers.get("Retry-After")
+                    ),
+                )
 
-            elif data.get("name") in ["title", "rich_text"]:
+            self.retry_policy.sleep(delay)
+            attempt += 1
 
-                json_data["properties"][data.get("property")] = {
-                    data.get("name"): [
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": str(data.get("value")),
-                            },
-                            "plain_text": str(data.get("value")),
-                        }
-                    ]
-                }
+    def get_table_header_info(self, refresh=False):
 
-        return json_data
+        data = None if refresh else self._get_cached_schema()
 
-    def get_table_header_info(self):
+        if data is not None:
+            return data
 
         response = self.request_helper(
             url=self.DATABASES.format(self.databaseId), method="GET"
         )
 
-        database_info = response.json()
-        properties = database_info.get("properties", {})
+        return self._cache_schema(self._json(response))
 
-        data = {}
+    def _get_table_header_for(self, properties):
+        table_header = self.get_table_header_info()
 
-        for property_name, property_info in properties.items():
+        if self._is_schema_stale(table_header, properties):
+            table_header = self.get_table_header_info(refresh=True)
 
-            data[property_name] = {
-                "id": property_info.get("id", ""),
-                "name": property_info.get("type", ""),
-                "type": property_info.get("name", ""),
-            }
+        return table_header
 
-        return data
+    def _request_with_schema_refresh(
+        self, url, method, build_payload, properties=(), build_params=None
+    ):
+        table_header = self._get_table_header_for(properties)
+
+        try:
+            return self.request_helper(
+                url,
+                method=method,
+                payload=build_payload(table_header),
+                params=build_params(table_header) if build_params else None,
+            )
+
+        except NotionAPIError as error:
+            if not self._is_unknown_property_error(error):
+                raise
+
+            # The database changed under us, rebuild the payload against a fresh schema once
+            self.invalidate_schema(self.databaseId)
+            table_header = self.get_table_header_info()
+
+            return self.request_helper(
+                url,
+                method=method,
+                payload=build_payload(table_header),
+                params=build_params(table_header) if build_params else None,
+            )
 
     def get_table_header(self):
         table_data = self.get_table_header_info()
         return tuple(table_data.keys())
 
-    def get_all_database_info(self, cursor=None, page_size=20):
+    def search_databases(self, cursor=None, page_size=20):
+        # One page of /v1/search results as Notion returns it, properties included
         payload = {
             "filter": {
                 "value": "database",
@@ -126,27 +186,17 @@ class NOTION_API:
 
         response = self.request_helper(url=self.SEARCH, method="POST", payload=payload)
 
-        data = {"results": []}
-
-        dbs_info = response.json()
-        results = dbs_info.get("results", {})
-
-        for result in results:
-            data["results"].append(
-                {
-                    "id": result.get("id"),
-                    "created_by": result.get("created_by"),
-                    "last_edited_by": result.get("last_edited_by"),
-                    "last_edited_time": result.get("last_edited_time"),
-                    "title": result.get("title")[0].get("plain_text")
-                    if len(result.get("title")) >= 1
-                    else None,
-                    "description": result.get("description")[0].get("plain_text")
-                    if len(result.get("description")) >= 1
-                    else None,
-                    "properties": list(result.get("properties").keys()),
-                }
-            )
+        return self._json(response)
+
+    def get_all_database_info(self, cursor=None, page_size=20):
+        dbs_info = self.search_databases(cursor=cursor, page_size=page_size)
+
+        data = {
+            "results": [
+                self._database_summary(result)
+                for result in dbs_info.get("results", [])
+            ]
+        }
 
         data["has_more"] = dbs_info.get("has_more")
         data["next_cursor"] = dbs_info.get("next_cursor")
@@ -154,312 +204,652 @@ class NOTION_API:
 
         return data
 
-    def get_all_database(self):
-        dbs = self.get_all_database_info()
-        databases = [db.get("title") for db in dbs.get("results")]
+    def get_all_database(self, refresh=False):
+        # Every page of search results, not only the first one
+        databases = self.catalog.refresh() if refresh else self.catalog.databases()
 
-        return tuple(databases)
+        return tuple(database["title"] for database in databases.values())
 
-    @staticmethod
-    def __add_name_and_id_to_parsed_data_for_insert_statements(
-        parsed_data, table_header
-    ):
+    def prepare(self, sql):
+        # Parsed once; execute() and executemany() only fill typed values into a prebuilt payload
+        statement = self._prepared.get(sql)
 
-        for item in parsed_data["data"]:
+        if statement is None:
+            if len(self._prepared) >= STATEMENT_CACHE_SIZE:
+                self._prepared.clear()
 
-            if item.get("property") in table_header:
-                item["name"] = table_header[item.get("property")]["name"]
-                item["id"] = table_header[item.get("property")]["id"]
+            statement = self._prepared[sql] = PreparedStatement(self, sql)
 
-        return parsed_data
+        return statement
 
-    @staticmethod
-    def __add_name_and_id_to_parsed_data_for_select_statements(
-        parsed_data, table_header
-    ):
-        for condition in parsed_data.get("conditions", []):
-            parameter = condition.get("parameter")
-            if parameter in table_header:
-                condition["name"] = table_header[parameter]["name"]
-                condition["id"] = table_header[parameter]["id"]
-        return parsed_data
-
-    @staticmethod
-    def __add_name_and_id_to_parsed_data_for_update_statements(
-        parsed_data, table_header
-    ):
-        set_values = parsed_data.get("set_values", [])
-        updated_set_values = []
-
-        for set_value in set_values:
-            key = set_value.pop("key", None)
-
-            if key and key in table_header:
-                set_value.update(
-                    {
-                        "property": key,  # Changing 'key' to 'property'
-                        "name": table_header[key]["name"],
-                        "id": table_header[key]["id"],
-                    }
-                )
+    @traced_statement("insert")
+    def insert(self, query):
+        return self._insert(self._parse_query(query))
 
-            updated_set_values.append(set_value)
+    def _insert(self, parsed_data):
 
-        # Doing this so that using this we can later call construct payload function
-        return {
-            "table_name": parsed_data.get("table_name"),
-            "data": updated_set_values,
-            "where_clause": parsed_data.get("where_clause"),
-        }
+        if len(parsed_data["rows"]) > 1:
+            return map_concurrently(
+                lambda row: self._json(self.__create_page(row)).get("id"),
+                self._rows_of(parsed_data),
+                max_workers=self.max_workers,
+            )
 
-    @staticmethod
-    def __generate_query(sql, val=None):
+        self.__create_page(parsed_data)
 
-        if val is not None:
-            query = sql.replace("%s", "'%s'")
-            query = sql % val
+    @traced_statement("insert")
+    def insert_many(self, sql, val):
+        # One result per row in the order of val, a failed row does not stop the others
+        return self.prepare(sql).executemany(val)
 
-        else:
-            query = sql
+    @traced_statement("upsert")
+    def upsert_many(self, sql, val, key):
+        # Inserts the rows of an INSERT template whose key column matches no page and updates
+        # the others. Existing pages are found with one query per MAX_KEYS_PER_LOOKUP keys, and
+        # only properties that differ from the page are sent; unchanged rows send nothing.
+        statement = self.prepare(sql)
 
-        return query
+        if statement.kind != "insert" or len(statement.statement.rows) != 1:
+            raise ValueError("upsert_many needs a single-row INSERT statement")
 
-    def insert(self, query):
+        if key not in statement.columns:
+            raise ValueError(
+                "The key column {} is not set by the statement".format(key)
+            )
 
         table_header = self.get_table_header_info()
 
-        parsed_data = MySQLQueryParser(query).parse()
+        # Keys are looked up with equality filters, which list properties do not have
+        if table_header.get(key, {}).get("name") in LIST_TYPES:
+            raise ValueError(
+                "The key column {} is a {} property, upsert_many needs a key with a single value".format(
+                    key, table_header[key]["name"]
+                )
+            )
+
+        rows = []
+
+        # A row that cannot be bound only fails itself
+        for params in val:
+            try:
+                params = bind_parameters(
+                    params, statement.placeholders, statement.names
+                )
+                properties = statement._properties(table_header, 0, params)
+            except ValueError as error:
+                rows.append((error, None, None))
+                continue
+
+            if key not in properties:
+                raise ValueError(
+                    "The key column {} cannot be written".format(key)
+                )
+
+            row_key = comparable_value(properties[key])
 
-        parsed_data = self.__add_name_and_id_to_parsed_data_for_insert_statements(
-            parsed_data, table_header
+            if row_key in (None, "", ()):
+                error = ValueError("The row has no value for the key column")
+                rows.append((error, None, None))
+            else:
+                rows.append((None, params, row_key))
+
+        keys = list(
+            dict.fromkeys(row_key for error, params, row_key in rows if error is None)
         )
 
-        payload = self.construct_payload_for_pages_creation(parsed_data)
+        existing = self.__pages_by_key(key, keys, statement.columns)
 
-        response = self.request_helper(self.PAGES, method="POST", payload=payload)
+        actions = []
+        seen = set()
 
-    def insert_many(self, sql, val):
+        for error, params, row_key in rows:
+            pages = existing.get(row_key, [])
 
-        table_header = self.get_table_header_info()
+            if error is None and row_key in seen:
+                error = ValueError(
+                    "The key {!r} appears more than once in the rows".format(row_key)
+                )
+            elif error is None and len(pages) > 1:
+                error = ValueError(
+                    "{} pages have the key {!r}".format(len(pages), row_key)
+                )
 
-        for row in val:
-            query = self.__generate_query(sql, row)
+            if error is None:
+                seen.add(row_key)
 
-            parsed_data = MySQLQueryParser(query).parse()
-            parsed_data = self.__add_name_and_id_to_parsed_data_for_insert_statements(
-                parsed_data, table_header
+            actions.append((len(actions), error, params, pages[0] if pages else None))
+
+        outcomes = [None] * len(actions)
+
+        def run(action):
+            index, error, params, entry = action
+
+            if error is not None:
+                raise error
+
+            if entry is None:
+                page_id = statement._create_page(0, params)
+                outcomes[index] = "inserted"
+                return page_id
+
+            build_payload = self._changed_payload_builder(
+                lambda table_header: {
+                    "properties": statement._properties(table_header, 0, params)
+                },
+                entry,
             )
-            payload = self.construct_payload_for_pages_creation(parsed_data)
-            response = self.request_helper(self.PAGES, method="POST", payload=payload)
 
-    def select(self, query):
+            changed = build_payload(table_header)["properties"]
 
-        table_header = self.get_table_header_info()
-        parsed_data = MySQLQueryParser(query).parse()
+            if changed:
+                self._patch_page(entry["id"], build_payload, list(changed))
 
-        # We will need to add title, rich_text or number acc to the type of the property in the parsed_data which is parsed from the SELECT statement
-        # We only need to add name and id if there are condition in the statement
+            outcomes[index] = "updated" if changed else "unchanged"
+            return entry["id"]
 
-        if parsed_data.get("conditions") is not None:
+        # Creates and updates share the worker pool, one result per row in the order of val
+        results = map_concurrently(run, actions, max_workers=self.max_workers)
 
-            parsed_data = self.__add_name_and_id_to_parsed_data_for_select_statements(
+        summary = {
+            outcome: outcomes.count(outcome)
+            for outcome in ("inserted", "updated", "unchanged")
+        }
+        summary["affected"] = summary["inserted"] + summary["updated"]
+        summary["results"] = results
+
+        return summary
+
+    def __pages_by_key(self, key, keys, properties):
+        # Key -> pages holding it, read with an IN filter per chunk of keys, or from the row cache
+        chunks = [
+            keys[start : start + self.MAX_KEYS_PER_LOOKUP]
+            for start in range(0, len(keys), self.MAX_KEYS_PER_LOOKUP)
+        ]
+
+        def lookup(chunk):
+            parsed_data = {
+                "where": Comparison(
+                    Column(key), "IN", tuple(Literal(value) for value in chunk)
+                ),
+                "properties": properties,
+            }
+
+            return [
+                entry
+                for entries in self.__entry_batches(
+                    parsed_data, self.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS
+                )
+                for entry in entries
+            ]
+
+        pages = {}
+
+        for result in map_concurrently(lookup, chunks, max_workers=self.max_workers):
+            if not result["success"]:
+                raise result["error"]
+
+            for entry in result["result"]:
+                pages.setdefault(
+                    comparable_value(entry["properties"].get(key)), []
+                ).append(entry)
+
+        return pages
+
+    def buffered_writer(
+        self,
+        sql,
+        max_batch_size=BufferedWriter.DEFAULT_MAX_BATCH_SIZE,
+        flush_interval=BufferedWriter.DEFAULT_FLUSH_INTERVAL,
+        max_queue_size=BufferedWriter.DEFAULT_MAX_QUEUE_SIZE,
+        on_result=None,
+    ):
+        # Rows written from many threads are sent together through insert_many()
+        return BufferedWriter(
+            self,
+            sql,
+            max_batch_size=max_batch_size,
+            flush_interval=flush_interval,
+            max_queue_size=max_queue_size,
+            on_result=on_result,
+        )
+
+    def __create_page(self, parsed_data):
+        return self._create_page(
+            lambda table_header: self.construct_payload_for_insert(
                 parsed_data, table_header
+            ),
+            properties=[item.get("property") for item in parsed_data["data"]],
+        )
+
+    def _create_page(self, build_payload, properties):
+
+        response = self._request_with_schema_refresh(
+            self.PAGES,
+            method="POST",
+            build_payload=build_payload,
+            properties=properties,
+        )
+
+        self.__remember_page(response)
+
+        return response
+
+    def __remember_page(self, response):
+        # Notion answers writes with the full page, so our own writes are visible without a sync
+        if self.row_cache is not None:
+            self.row_cache.store.upsert(self.databaseId, [self._json(response)])
+
+    def __query_pages(self, parsed_data, page_size=None):
+
+        query = self._paged_query(parsed_data, page_size)
+
+        if query.empty:
+            return
+
+        response = self._json(
+            self._request_with_schema_refresh(
+                query.url,
+                method="POST",
+                build_payload=query.build_payload,
+                properties=query.properties,
+                build_params=query.build_params,
+            )
+        )
+
+        while True:
+            # Reuse the payload that was accepted and only move the cursor forward
+            payload = query.next_payload(response)
+
+            yield response
+
+            if payload is None:
+                return
+
+            response = self._json(
+                self.request_helper(
+                    query.url, method="POST", payload=payload, params=query.params
+                )
             )
 
-        # If * is in the query that means it needs to have all the table headers so we need to use get_table_header()
-        property_names = (
-            parsed_data.get("columns", None)
-            if parsed_data.get("columns")
-            else self.get_table_header()
+    def enable_row_cache(
+        self,
+        store=None,
+        max_staleness=RowCache.DEFAULT_MAX_STALENESS,
+        full_sync_interval=RowCache.DEFAULT_FULL_SYNC_INTERVAL,
+    ):
+        # SELECTs are answered from a local copy that only asks Notion for pages edited since the last sync
+        self.row_cache = RowCache(
+            store=store,
+            max_staleness=max_staleness,
+            full_sync_interval=full_sync_interval,
         )
 
-        results = {
-            "data": [],
-            "next_cursor": "",
-            "previous_cursor": None,
-            "has_more": "",
-        }
+        return self.row_cache
 
-        page_size_dict = []
+    def disable_row_cache(self):
+        self.row_cache = None
 
-        if parsed_data.get("conditions") is not None:
-            page_size_dict = [
-                condition
-                for condition in parsed_data.get("conditions", [])
-                if condition.get("parameter") == "page_size" and condition is not None
-            ]
+    def sync_row_cache(self, full=False):
 
-        payload = {
-            "page_size": page_size_dict[0].get("value")
-            if len(page_size_dict) > 0
-            else self.DEFAULT_PAGE_SIZE_FOR_SELECT_STATEMENTS,
-            "filter": {"and": []},
-        }
+        row_cache = self.row_cache
+
+        if row_cache is None:
+            raise ValueError("The row cache is not enabled, call enable_row_cache() first")
+
+        with row_cache.lock:
+            kind = "full" if full else row_cache.sync_kind(self.databaseId)
 
-        all_conditions_except_page_size = parsed_data.get("conditions")
+            if kind is None:
+                return
 
-        if len(page_size_dict) > 0:
+            started_at = time.time()
+            parsed_data = {}
 
-            all_conditions_except_page_size = [
-                condition
-                for condition in parsed_data.get("conditions", [])
-                if condition.get("parameter") != "page_size"
+            if kind == "delta":
+                # Notion timestamps are rounded to the minute, so pages edited at the watermark are read again
+                watermark = row_cache.store.get_state(self.databaseId)["watermark"]
+                parsed_data["where"] = Comparison(
+                    Column("last_edited_time"), ">=", Literal(watermark)
+                )
+
+            pages = [
+                entry
+                for response in self.__query_pages(
+                    parsed_data, page_size=self.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS
+                )
+                for entry in response["results"]
             ]
 
-        if all_conditions_except_page_size is not None:
+            row_cache.record_sync(
+                self.databaseId, pages, full=kind == "full", started_at=started_at
+            )
 
-            for condition in all_conditions_except_page_size:
+    def __cached_pages(self, parsed_data):
 
-                # LIKE is used to select the records which contains the word. So, other notion filter will be used
+        self.sync_row_cache()
 
-                if condition.get("operator") == "LIKE":
-                    filter = {
-                        "property": condition.get("parameter"),
-                        "title": {"contains": condition.get("value")},
-                    }
+        page_size, where = split_page_size(parsed_data.get("where"))
 
-                else:
-                    filter = {
-                        "property": condition.get("parameter"),
-                        condition.get("name"): {
-                            self.CONDITION_MAPPING.get(
-                                condition.get("operator")
-                            ): condition.get("value")
-                        },
-                    }
+        if where is not None:
+            # Compiled only to report unknown columns and unsupported operators like Notion would
+            compile_filter(where, self.get_table_header_info())
 
-                payload["filter"]["and"].append(filter)
+        names = [column.name for column in iter_columns(where)]
+        names.extend(order["column"] for order in parsed_data.get("order_by") or ())
 
-        response = self.request_helper(
-            self.QUERY_DATABASE.format(self.databaseId), method="POST", payload=payload
-        ).json()
+        entries = [
+            (entry, self._page_values(entry, names))
+            for entry in self.row_cache.store.pages(self.databaseId)
+        ]
+
+        if where is not None:
+            entries = [item for item in entries if evaluate(where, item[1])]
 
-        for entry in response["results"]:
+        # Without ORDER BY, Notion returns the most recently created pages first
+        order_by = parsed_data.get("order_by") or [
+            {"column": "created_time", "direction": "descending"}
+        ]
+        entries = sort_rows(entries, order_by, key=lambda item: item[1])
 
-            properties = entry["properties"]
+        if parsed_data.get("limit") is not None:
+            entries = entries[: parsed_data["limit"]]
 
-            single_dict = {}
+        return page_size, [entry for entry, values in entries]
 
-            for prop_name in property_names:
-                prop_data = properties.get(prop_name, {})
-                prop_type = prop_data.get("type", None)
+    def __local_query(self, parsed_data):
+        table_header = self._get_table_header_for(self._referenced_properties(parsed_data))
 
-                prop_value = None
+        return self._local_query(parsed_data, table_header)
 
-                if prop_type and prop_type in prop_data:
+    def __run_local_query(self, local_query, page_size=None, prefetch=0):
 
-                    try:
-                        if prop_type in ["title", "rich_text"]:
-                            prop_value = prop_data[prop_type][0].get("plain_text", "")
+        # Every matching page is read, only what the query keeps is held in memory
+        batches = self.__entry_batches(
+            local_query.remote,
+            page_size or self.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS,
+            prefetch,
+        )
+
+        for entries in batches:
+            for row in local_query.feed(entries):
+                yield row
 
-                        elif prop_type == "number":
-                            prop_value = prop_data.get("number", None)
+            if local_query.done:
+                break
 
-                        else:
-                            prop_value = None
+        for row in local_query.finish():
+            yield row
 
-                    except:
-                        prop_value = None
+    def __property_names(self, parsed_data):
+        return self._property_names(parsed_data, self.get_table_header_info())
 
-                single_dict[prop_name.lower()] = prop_value
-                single_dict["id"] = entry["id"]
-                single_dict["created_time"] = entry["created_time"]
-                single_dict["last_edited_time"] = entry["last_edited_time"]
+    def __decode_rows(self, results, parsed_data):
+        return self._decode_rows(results, parsed_data, self.get_table_header_info())
 
-            # Check if any of the properties in the single_dict is empty
-            if any(value for value in single_dict.values()):
-                results["data"].append(single_dict)
+    @traced_statement("select")
+    def select(self, query):
+        return self._select(self._parse_query(query))
 
-        results["next_cursor"] = response.get("next_cursor", None)
-        results["has_more"] = response.get("has_more", False)
+    def _select(self, parsed_data):
+
+        local_query = self.__local_query(parsed_data)
+
+        # Aggregates, GROUP BY and the like need every matching row, so all of them are returned at once
+        if local_query is not None:
+            return self._select_results(
+                self.EMPTY_QUERY_RESPONSE, list(self.__run_local_query(local_query))
+            )
+
+        if self.row_cache is not None:
+            return self.__select_cached(parsed_data)
+
+        pages = self.__query_pages(parsed_data)
+
+        # Without a LIMIT one page is returned, with one we keep paging until it is reached
+        if parsed_data.get("limit") is None:
+            pages = itertools.islice(pages, 1)
+
+        rows = []
+        response = self.EMPTY_QUERY_RESPONSE
+
+        for response in pages:
+            rows.extend(
+                self.__decode_rows(response["results"], parsed_data)
+            )
+
+        return self._select_results(response, rows)
+
+    def __select_cached(self, parsed_data):
+
+        page_size, entries = self.__cached_pages(parsed_data)
+
+        has_more = False
+
+        if parsed_data.get("limit") is None:
+            page_size = page_size or self.DEFAULT_PAGE_SIZE_FOR_SELECT_STATEMENTS
+            has_more = len(entries) > page_size
+            entries = entries[:page_size]
+
+        rows = self.__decode_rows(entries, parsed_data)
+
+        # A cursor from the local copy would mean nothing to Notion, select_iter() reads every match
+        return self._select_results({"has_more": has_more}, rows)
+
+    def __entry_batches(self, parsed_data, page_size, prefetch=0):
+
+        if self.row_cache is not None:
+            yield self.__cached_pages(parsed_data)[1]
+            return
+
+        # Pages are requested lazily, so only one page of results is held at a time
+        pages = self.__query_pages(parsed_data, page_size=page_size)
+
+        # With prefetch, a background thread requests the next pages while we decode this one
+        if prefetch:
+            pages = prefetch_pages(pages, depth=prefetch)
+
+        for response in pages:
+            yield response["results"]
+
+    @traced_statement("select", count=one_row)
+    def select_iter(
+        self,
+        query,
+        page_size=BaseNotionAPI.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS,
+        prefetch=0,
+    ):
 
-        return results
+        parsed_data = self._parse_query(query)
 
+        local_query = self.__local_query(parsed_data)
+
+        if local_query is not None:
+            for row in self.__run_local_query(local_query, page_size, prefetch):
+                yield row
+
+            return
+
+        for entries in self.__entry_batches(parsed_data, page_size, prefetch):
+            for row in self.__decode_rows(entries, parsed_data):
+                yield row
+
+    @traced_statement("select", count=len)
+    def select_batches(
+        self,
+        query,
+        page_size=BaseNotionAPI.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS,
+        prefetch=0,
+    ):
+
+        parsed_data = self._parse_query(query)
+
+        local_query = self.__local_query(parsed_data)
+
+        if local_query is not None:
+            yield ColumnarResult.from_rows(
+                list(self.__run_local_query(local_query, page_size, prefetch))
+            )
+            return
+
+        # One ColumnarResult per page of results, ready for to_record_batch()
+        for entries in self.__entry_batches(parsed_data, page_size, prefetch):
+            yield self._decode_columns(
+                entries, parsed_data, self.get_table_header_info()
+            )
+
+    @traced_statement("select")
+    def select_columns(
+        self,
+        query,
+        page_size=BaseNotionAPI.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS,
+        prefetch=0,
+    ):
+
+        result = None
+
+        for batch in self.select_batches(query, page_size=page_size, prefetch=prefetch):
+            if result is None:
+                result = batch
+            else:
+                result.append(batch)
+
+        if result is None:
+            parsed_data = self._parse_query(query)
+            result = ColumnarResult.for_schema(
+                self.__property_names(parsed_data), self.get_table_header_info()
+            )
+
+        return result
+
+    def __matching_pages(self, where, properties=()):
+
+        return [
+            entry
+            for response in self.__query_pages(
+                self._matching_query(where, properties),
+                page_size=self.MAX_PAGE_SIZE_FOR_SELECT_STATEMENTS,
+            )
+            for entry in response["results"]
+        ]
+
+    def __matching_page_ids(self, where):
+        return [entry["id"] for entry in self.__matching_pages(where)]
+
+    @traced_statement("update")
     def update(self, query):
-        table_header = self.get_table_header_info()
 
-        parsed_data = MySQLQueryParser(query).parse()
+        parsed_data = self._parse_query(query)
 
-        parsed_data = self.__add_name_and_id_to_parsed_data_for_update_statements(
-            parsed_data, table_header
+        return self._update_pages(
+            parsed_data["where"],
+            self._update_payload_builder(parsed_data),
+            [set_value.get("key") for set_value in parsed_data["set_values"]],
         )
 
-        select_statement_response = self.select(
-            "SELECT * from TEMP WHERE {}".format(parsed_data.get("where_clause"))
-        )
+    def _update_pages(self, where, build_payload, properties):
 
-        if not len(select_statement_response["data"]) >= 0:
-            raise ValueError("No Data Found")
+        # Pages are read with the SET columns, so only what actually changes is written
+        entries = self.__matching_pages(where, properties)
 
-        for entry in select_statement_response["data"]:
+        changes = self._page_changes(
+            entries, build_payload(self._get_table_header_for(properties))
+        )
 
-            payload = self.construct_payload_for_pages_creation(parsed_data)
+        def update_page(change):
+            entry, changed = change
 
-            # We don't want "parent" key in the payload
-            payload.pop("parent")
+            if changed:
+                self._patch_page(
+                    entry["id"],
+                    self._changed_payload_builder(build_payload, entry),
+                    list(changed),
+                )
 
-            response = self.request_helper(
-                url=self.UPDATE_PAGE.format(entry["id"]),
-                method="PATCH",
-                payload=payload,
-            )
+            return entry["id"]
 
-    def delete(self, query):
-        parsed_data = MySQLQueryParser(query).parse()
+        return self._update_summary(
+            map_concurrently(update_page, changes, max_workers=self.max_workers),
+            changes,
+        )
 
-        select_statement_response = self.select(
-            "SELECT * from TEMP WHERE {}".format(parsed_data.get("where_clause"))
+    def _patch_page(self, page_id, build_payload, properties):
+
+        response = self._request_with_schema_refresh(
+            self.UPDATE_PAGE.format(page_id),
+            method="PATCH",
+            build_payload=build_payload,
+            properties=properties,
         )
 
-        if not len(select_statement_response["data"]) >= 0:
-            raise ValueError("No Data Found")
+        self.__remember_page(response)
 
-        for entry in select_statement_response["data"]:
+        return response
 
-            payload = {
-                "in_trash": True,
-            }
+    @traced_statement("delete")
+    def delete(self, query):
+        return self._delete_pages(self._parse_query(query)["where"])
+
+    def _delete_pages(self, where):
+
+        page_ids = self.__matching_page_ids(where)
 
-            response = self.request_helper(
-                url=self.DELETE_PAGE.format(entry["id"]),
+        def delete_page(page_id):
+            self.request_helper(
+                url=self.DELETE_PAGE.format(page_id),
                 method="PATCH",
-                payload=payload,
+                payload=self.TRASH_PAGE_PAYLOAD,
+            )
+            return page_id
+
+        results = map_concurrently(delete_page, page_ids, max_workers=self.max_workers)
+
+        if self.row_cache is not None:
+            self.row_cache.store.remove(
+                self.databaseId,
+                [result["result"] for result in results if result["success"]],
             )
 
+        return self._write_summary(results)
+
+    @traced_statement()
     def execute(self, sql, val=None):
 
-        if val is not None and type(val) == list:
-            query = sql
-            to_execute_many = True
+        # Values are bound to the parsed statement as typed values, they never become SQL text
+        if val is not None:
+            can_continue, to_do = self._check_statement(sql)
 
-        else:
-            query = self.__generate_query(sql, val)
-            to_execute_many = False
+            if not can_continue:
+                raise ValueError(
+                    "Invalid SQL statement or type of statement not implemented"
+                )
+
+            if type(val) == list:
+                return self.prepare(sql).executemany(val)
 
-        parser = MySQLQueryParser(query)
+            return self.prepare(sql).execute(val)
 
-        can_continue, to_do = parser.check_statement()
+        can_continue, to_do = self._check_statement(sql)
 
         if can_continue:
 
             if to_do == "insert":
 
-                self.insert_many(sql, val) if to_execute_many else self.insert(query)
+                return self.insert(sql)
 
             elif to_do == "select":
 
-                return self.select(query)
+                return self.select(sql)
 
             elif to_do == "update":
 
-                self.update(query)
+                return self.update(sql)
 
             elif to_do == "delete":
 
-                self.delete(query)
+                return self.delete(sql)
 
             else:
-                raise ValueError(f"Unsupported operation")
+                raise ValueError("Unsupported operation: {}".format(to_do))
 
         else:
             raise ValueError(
@@ -0,0 +1,243 @@
+import datetime
+import decimal
+
+from .concurrency import map_concurrently
+from .encoders import ENCODERS, encode_value, iso_value
+from .instrumentation import traced_statement
+from .mysql_query_parser import (
+    MySQLQueryParser,
+    bind_placeholders,
+    count_placeholders,
+    placeholder_names,
+    statement_info,
+)
+from .sql_ast import Placeholder, literal_value
+
+# Python values a parameter can hold, besides None and lists of them
+PARAMETER_TYPES = (str, int, float, decimal.Decimal, datetime.date)
+
+
+def _parameter_value(param):
+    if isinstance(param, (list, tuple, set)):
+        for item in param:
+            _parameter_value(item)
+
+        return iso_value(param)
+
+    if param is not None and not isinstance(param, PARAMETER_TYPES):
+        raise ValueError(
+            "Parameters of type {} are not supported".format(type(param).__name__)
+        )
+
+    return iso_value(param)
+
+
+def bind_parameters(params, expected, names=()):
+    # %(name)s placeholders take a dict of values, keys they do not use are ignored
+    if names:
+        if not isinstance(params, dict):
+            raise ValueError(
+                "The SQL statement uses %(name)s placeholders, pass the parameters as a dict"
+            )
+
+        missing = [name for name in names if name not in params]
+
+        if missing:
+            raise ValueError(
+                "Missing parameters for the SQL statement: {}".format(
+                    ", ".join(missing)
+                )
+            )
+
+        return {name: _parameter_value(params[name]) for name in names}
+
+    if isinstance(params, dict):
+        if expected:
+            raise ValueError(
+                "The SQL statement uses %s placeholders, pass the parameters as a tuple or list"
+            )
+
+        params = ()
+
+    # One value per %s, in order; a single value may be passed on its own
+    if params is None:
+        params = ()
+    elif not isinstance(params, (tuple, list)):
+        params = (params,)
+
+    if len(params) < expected:
+        raise ValueError("Not enough parameters for the SQL statement")
+
+    if len(params) > expected:
+        raise ValueError("Not all parameters were used in the SQL statement")
+
+    return tuple(_parameter_value(param) for param in params)
+
+
+class PreparedStatement:
+    # A statement parsed once and run with different parameters, given as a sequence for %s
+    # placeholders or a dict for %(name)s ones. Parameters are bound to the parsed tree as
+    # values, so quotes or SQL inside them never reach the parser.
+
+    def __init__(self, api, sql):
+        self.api = api
+        self.sql = sql
+
+        self.statement = api._timed_parse(MySQLQueryParser(sql).parse_ast)
+        self.kind = type(self.statement).__name__.lower()
+        self.placeholders = count_placeholders(self.statement)
+        self.names = placeholder_names(self.statement)
+
+        if self.kind == "insert":
+            self.columns = list(self.statement.columns)
+        elif self.kind == "update":
+            self.columns = [
+                assignment.column for assignment in self.statement.assignments
+            ]
+        else:
+            self.columns = []
+
+        # (table_header, skeleton) of the schema the payloads were last built for
+        self._skeleton = None
+
+    @property
+    def hooks(self):
+        return self.api.hooks
+
+    def _start_statement(self, kind, sql):
+        return self.api._start_statement(kind or self.kind, sql)
+
+    def _finish_statement(self, event, rows, error):
+        self.api._finish_statement(event, rows, error)
+
+    def _cells(self):
+        if self.kind == "insert":
+            return [
+                list(zip(self.statement.columns, row)) for row in self.statement.rows
+            ]
+
+        # SET is handled like a single VALUES row
+        return [
+            [
+                (assignment.column, assignment.value)
+                for assignment in self.statement.assignments
+            ]
+        ]
+
+    def _build_skeleton(self, table_header):
+        # Per row: the properties encoded from literals, and the (column, index, type) slots
+        # that are filled from the parameters of each call
+        skeleton = []
+
+        for cells in self._cells():
+            fixed = {}
+            slots = []
+
+            for column, value in cells:
+                property_type = table_header.get(column, {}).get("name")
+
+                # Properties of a type that cannot be written, or missing from the schema, are left out
+                if property_type not in ENCODERS:
+                    continue
+
+                if isinstance(value, Placeholder):
+                    slots.append((column, value.index, property_type))
+                else:
+                    fixed[column] = encode_value(
+                        property_type, literal_value(value), column
+                    )
+
+            skeleton.append((fixed, slots))
+
+        return skeleton
+
+    def _properties(self, table_header, row, params):
+        built = self._skeleton
+
+        # Rebuilt only when the schema was refreshed
+        if built is None or built[0] is not table_header:
+            built = self._skeleton = (table_header, self._build_skeleton(table_header))
+
+        fixed, slots = built[1][row]
+        properties = dict(fixed)
+
+        for column, index, property_type in slots:
+            properties[column] = encode_value(property_type, params[index], column)
+
+        return properties
+
+    def _create_page(self, row, params):
+        api = self.api
+
+        response = api._create_page(
+            lambda table_header: {
+                "parent": {"database_id": api.databaseId},
+                "properties": self._properties(table_header, row, params),
+            },
+            properties=self.columns,
+        )
+
+        return api._json(response).get("id")
+
+    def execute(self, params=()):
+        return self._execute(self.sql, params)
+
+    def executemany(self, rows):
+        return self._executemany(self.sql, rows)
+
+    @traced_statement()
+    def _execute(self, sql, params):
+        params = bind_parameters(params, self.placeholders, self.names)
+        api = self.api
+
+        if self.kind == "insert":
+            if len(self.statement.rows) > 1:
+                return map_concurrently(
+                    lambda row: self._create_page(row, params),
+                    range(len(self.statement.rows)),
+                    max_workers=api.max_workers,
+                )
+
+            return self._create_page(0, params)
+
+        if self.kind == "select":
+            return api._select(
+                statement_info(bind_placeholders(self.statement, params))
+            )
+
+        where = bind_placeholders(self.statement.where, params)
+
+        if self.kind == "update":
+            built = []
+
+            def build_payload(table_header):
+                # Shared by every PATCH of this call, rebuilt only when the schema is refreshed
+                if not built or built[0][0] is not table_header:
+                    built[:] = [
+                        (
+                            table_header,
+                            {"properties": self._properties(table_header, 0, params)},
+                        )
+                    ]
+                return built[0][1]
+
+            return api._update_pages(where, build_payload, self.columns)
+
+        return api._delete_pages(where)
+
+    @traced_statement()
+    def _executemany(self, sql, rows):
+        if self.kind != "insert":
+            return [self._execute(sql, params) for params in rows]
+
+        if len(self.statement.rows) > 1:
+            raise ValueError(
+                "Only single-row VALUES templates can be bound to parameters"
+            )
+
+        # One result per row in the order of rows, a failed row does not stop the others
+        return map_concurrently(
+            lambda params: self._execute(sql, params),
+            rows,
+            max_workers=self.api.max_workers,
+        )
@@ -0,0 +1,398 @@
+from .evaluator import evaluate, sort_rows, value_of
+from .filters import PAGE_COLUMNS, compile_filter, split_page_size, split_pushdown
+from .sql_ast import (
+    Column,
+    SelectItem,
+    iter_aggregates,
+    iter_columns,
+    iter_comparisons,
+    to_sql,
+)
+
+
+def needs_local_stage(parsed_data, table_header):
+    # True when Notion cannot answer the SELECT on its own
+    if (
+        parsed_data.get("distinct")
+        or parsed_data.get("group_by")
+        or parsed_data.get("having") is not None
+    ):
+        return True
+
+    if any(
+        item.expr is not None
+        and (item.alias is not None or not isinstance(item.expr, Column))
+        for item in parsed_data.get("items") or ()
+    ):
+        return True
+
+    where = split_page_size(parsed_data.get("where"))[1]
+
+    if where is None:
+        return False
+
+    if any(
+        not isinstance(comparison.left, Column)
+        for comparison in iter_comparisons(where)
+    ):
+        return True
+
+    _check_columns(iter_columns(where), table_header, "WHERE")
+
+    # e.g. a WHERE clause nested too deeply for Notion, what does not fit is evaluated locally
+    try:
+        compile_filter(where, table_header)
+    except ValueError:
+        return True
+
+    return False
+
+
+def _check_columns(columns, table_header, clause):
+    for column in columns:
+        if column.name not in table_header and column.name not in PAGE_COLUMNS:
+            raise ValueError(
+                "Unknown column in {} clause: {}".format(clause, column.name)
+            )
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class _Accumulator:
+    def __init__(self, function):
+        self.name = function.name
+        self.seen = set() if function.distinct else None
+        self.count = 0
+        self.total = 0
+        self.best = None
+
+    def add(self, value):
+        # Empty values are skipped by every aggregate, COUNT(*) is fed a 1 per row
+        if value is None or value == "" or value == []:
+            return
+
+        if self.seen is not None:
+            key = _hashable(value)
+
+            if key in self.seen:
+                return
+
+            self.seen.add(key)
+
+        self.count += 1
+
+        if self.name in ("SUM", "AVG"):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(
+                        "{} needs numbers, got {!r}".format(self.name, value)
+                    )
+
+            self.total += value
+
+        elif self.name == "MIN":
+            if self.best is None or value < self.best:
+                self.best = value
+
+        elif self.name == "MAX":
+            if self.best is None or value > self.best:
+                self.best = value
+
+    def result(self):
+        if self.name == "COUNT":
+            return self.count
+
+        if self.count == 0:
+            return None
+
+        if self.name == "SUM":
+            return self.total
+
+        if self.name == "AVG":
+            return self.total / self.count
+
+        return self.best
+
+
+class LocalQuery:
+    # Runs the part of a SELECT that Notion cannot: feed() takes the pages returned for
+    # `remote` one batch at a time and finish() emits whatever had to wait for the last row.
+    # Only one entry per group (or per DISTINCT row) is kept, never every row.
+
+    def __init__(self, parsed_data, table_header, page_values):
+        self.table_header = table_header
+        self.page_values = page_values
+
+        self.items = parsed_data.get("items") or (SelectItem(None, None),)
+        self.distinct = bool(parsed_data.get("distinct"))
+        self.group_by = tuple(parsed_data.get("group_by") or ())
+        self.having = parsed_data.get("having")
+        self.order_by = parsed_data.get("order_by") or []
+        self.limit = parsed_data.get("limit")
+
+        where = split_page_size(parsed_data.get("where"))[1]
+
+        _check_columns(iter_columns(where), table_header, "WHERE")
+        _check_columns(
+            [column for item in self.items for column in iter_columns(item.expr)],
+            table_header,
+            "SELECT",
+        )
+        _check_columns(
+            [column for expr in self.group_by for column in iter_columns(expr)],
+            table_header,
+            "GROUP BY",
+        )
+
+        pushed, self.residual = split_pushdown(where, table_header)
+
+        self.aggregates = []
+
+        for expr in [item.expr for item in self.items] + [self.having]:
+            for aggregate in iter_aggregates(expr):
+                if aggregate not in self.aggregates:
+                    self.aggregates.append(aggregate)
+
+        self.grouped = bool(self.group_by or self.aggregates)
+
+        self.keys = [self._key(item) for item in self.items]
+
+        if self.grouped:
+            self._check_grouping()
+        elif self.having is not None:
+            raise ValueError("HAVING needs GROUP BY or an aggregate function")
+
+        # Ordering by a table column is left to Notion unless rows are grouped or computed first
+        sortable = set(table_header) | set(PAGE_COLUMNS)
+        self.local_sort = self.grouped or any(
+            order["column"] not in sortable for order in self.order_by
+        )
+        self._check_order_by()
+
+        streaming = not (
+            self.residual is not None
+            or self.grouped
+            or self.distinct
+            or self.local_sort
+        )
+
+        self.remote = {
+            "columns": None,
+            "properties": self._needed_properties(),
+            "where": pushed,
+            "order_by": None if self.local_sort else parsed_data.get("order_by"),
+            "limit": self.limit if streaming else None,
+        }
+
+        self.groups = {}
+        self.seen = set()
+        self.buffered = []
+        self.emitted = 0
+
+    def _needed_properties(self):
+        # The properties read locally, or None when SELECT * needs all of them
+        if any(item.expr is None for item in self.items):
+            return None
+
+        exprs = [item.expr for item in self.items] + list(self.group_by)
+        exprs.append(self.residual)
+
+        names = [column.name for expr in exprs for column in iter_columns(expr)]
+
+        if self.local_sort:
+            names.extend(order["column"] for order in self.order_by)
+
+        return [name for name in names if name in self.table_header]
+
+    def _key(self, item):
+        # Results use the alias, the lowercased column name like plain SELECTs, or the SQL text
+        if item.alias is not None:
+            return item.alias
+
+        if item.expr is None:
+            return "*"
+
+        if isinstance(item.expr, Column):
+            return item.expr.name.lower()
+
+        return to_sql(item.expr)
+
+    def _check_grouping(self):
+        grouped_columns = {
+            expr.name for expr in self.group_by if isinstance(expr, Column)
+        }
+
+        for item in self.items:
+            if item.expr is None:
+                raise ValueError(
+                    "SELECT * cannot be combined with GROUP BY or aggregates"
+                )
+
+            if item.expr in self.group_by:
+                continue
+
+            for column in self._columns_outside_aggregates(item.expr):
+                if column.name not in grouped_columns:
+                    raise ValueError(
+                        "The column {} must be in GROUP BY or used in an aggregate".format(
+                            column.name
+                        )
+                    )
+
+    def _columns_outside_aggregates(self, expr):
+        aggregated = {
+            column
+            for aggregate in iter_aggregates(expr)
+            for column in iter_columns(aggregate)
+        }
+
+        return [column for column in iter_columns(expr) if column not in aggregated]
+
+    def _check_order_by(self):
+        known = set(self.keys) | {item.alias for item in self.items if item.alias}
+
+        if self.grouped:
+            known |= {expr.name for expr in self.group_by if isinstance(expr, Column)}
+        else:
+            known |= set(self.table_header) | set(PAGE_COLUMNS)
+
+        for order in self.order_by:
+            if order["column"] not in known:
+                raise ValueError(
+                    "Unknown column in ORDER BY clause: {}".format(order["column"])
+                )
+
+    @property
+    def done(self):
+        return (
+            self.limit is not None
+            and self.emitted >= self.limit
+            and not self.local_sort
+        )
+
+    def _project(self, values, resolved=None):
+        row = {}
+
+        for item, key in zip(self.items, self.keys):
+            if item.expr is None:
+                for name in self.table_header:
+                    row[name.lower()] = values.get(name)
+            else:
+                row[key] = value_of(item.expr, values, resolved)
+
+        # Aggregated and DISTINCT rows describe several pages, so they carry no page columns
+        if not (self.grouped or self.distinct):
+            for column in PAGE_COLUMNS:
+                row[column] = values[column]
+
+        return row
+
+    def _is_new(self, row):
+        if not self.distinct:
+            return True
+
+        key = tuple(_hashable(value) for value in row.values())
+
+        if key in self.seen:
+            return False
+
+        self.seen.add(key)
+        return True
+
+    def feed(self, entries):
+        for entry in entries:
+            if self.done:
+                return
+
+            values = self.page_values(entry, self.remote["properties"])
+
+            if self.residual is not None and not evaluate(self.residual, values):
+                continue
+
+            if self.grouped:
+                self._accumulate(values)
+                continue
+
+            row = self._project(values)
+
+            if not self._is_new(row):
+                continue
+
+            if self.local_sort:
+                # Sorted by the output names first, then by the page's own properties
+                self.buffered.append((dict(values, **row), row))
+                continue
+
+            self.emitted += 1
+            yield row
+
+    def _accumulate(self, values):
+        group_values = tuple(value_of(expr, values) for expr in self.group_by)
+        key = tuple(_hashable(value) for value in group_values)
+
+        group = self.groups.get(key)
+
+        if group is None:
+            group = self.groups[key] = (
+                group_values,
+                [_Accumulator(aggregate) for aggregate in self.aggregates],
+            )
+
+        for aggregate, accumulator in zip(self.aggregates, group[1]):
+            accumulator.add(
+                value_of(aggregate.args[0], values) if aggregate.args else 1
+            )
+
+    def finish(self):
+        if self.grouped:
+            self._finish_groups()
+
+        rows = self.buffered
+
+        if self.local_sort:
+            rows = sort_rows(rows, self.order_by, key=lambda pair: pair[0])
+
+        for _, row in rows:
+            if self.limit is not None and self.emitted >= self.limit:
+                return
+
+            self.emitted += 1
+            yield row
+
+    def _finish_groups(self):
+        # Aggregates over no rows at all still give one row, e.g. COUNT(*) = 0
+        if not self.groups and not self.group_by:
+            self.groups[()] = (
+                (),
+                [_Accumulator(aggregate) for aggregate in self.aggregates],
+            )
+
+        for group_values, accumulators in self.groups.values():
+            resolved = dict(zip(self.group_by, group_values))
+            resolved.update(
+                zip(
+                    self.aggregates,
+                    [accumulator.result() for accumulator in accumulators],
+                )
+            )
+
+            context = {
+                expr.name: value
+                for expr, value in zip(self.group_by, group_values)
+                if isinstance(expr, Column)
+            }
+
+            row = self._project(context, resolved)
+            context.update(row)
+
+            if self.having is not None and not evaluate(self.having, context, resolved):
+                continue
+
+            if self._is_new(row):
+                self.buffered.append((context, row))
+
+        self.groups = {}
@@ -0,0 +1,105 @@
+import datetime
+import math
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+class RetryPolicy:
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        max_retries=5,
+        backoff_factor=0.5,
+        max_backoff=30,
+        jitter=True,
+        retry_statuses=RETRY_STATUSES,
+        retry_non_idempotent=False,
+        max_delay=60,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = tuple(retry_statuses)
+        # POST/PATCH requests that create or change pages are only retried when this is set
+        self.retry_non_idempotent = retry_non_idempotent
+        # Longest wait a Retry-After header is obeyed up to
+        self.max_delay = max_delay
+
+        self.retries = 0
+        self.sleep_time = 0.0
+        self._lock = threading.Lock()
+
+    def should_retry(self, attempt, idempotent, status_code=None):
+        if attempt >= self.max_retries:
+            return False
+
+        # A rate limited request was rejected before Notion did anything with it
+        if status_code == 429:
+            return 429 in self.retry_statuses
+
+        if not idempotent and not self.retry_non_idempotent:
+            return False
+
+        # No status code means the connection failed before we got a response
+        return status_code is None or status_code in self.retry_statuses
+
+    def get_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(self.max_delay, max(0.0, retry_after))
+
+        delay = min(self.max_backoff, self.backoff_factor * (2**attempt))
+
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value):
+        # Seconds or an HTTP date; None when the header cannot be read, which falls back to backoff
+        try:
+            delay = float(value)
+        except (TypeError, ValueError):
+            delay = None
+
+        if delay is None:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError, IndexError):
+                return None
+
+            if retry_at is None:
+                return None
+
+            # Dates sent with -0000 come back without a time zone, they are UTC too
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+
+            delay = retry_at.timestamp() - time.time()
+
+        return delay if math.isfinite(delay) else None
+
+    def record(self, delay):
+        with self._lock:
+            self.retries += 1
+            self.sleep_time += delay
+
+    def sleep(self, delay):
+        self.record(delay)
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def get_stats(self):
+        with self._lock:
+            return {"retries": self.retries, "sleep_time": self.sleep_time}
+
+    def reset_stats(self):
+        with self._lock:
+            self.retries = 0
+            self.sleep_time = 0.0
@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class MemoryRowStore:
+    def __init__(self):
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def _database(self, database_id):
+        return self._databases.setdefault(database_id, {"pages": {}, "state": {}})
+
+    def pages(self, database_id):
+        with self._lock:
+            return list(self._database(database_id)["pages"].values())
+
+    def upsert(self, database_id, pages):
+        with self._lock:
+            stored = self._database(database_id)["pages"]
+            for page in pages:
+                stored[page["id"]] = page
+
+    def remove(self, database_id, page_ids):
+        with self._lock:
+            stored = self._database(database_id)["pages"]
+            for page_id in page_ids:
+                stored.pop(page_id, None)
+
+    def clear(self, database_id):
+        with self._lock:
+            self._database(database_id)["pages"].clear()
+
+    def get_state(self, database_id):
+        with self._lock:
+            return dict(self._database(database_id)["state"])
+
+    def set_state(self, database_id, **state):
+        with self._lock:
+            self._database(database_id)["state"].update(state)
+
+
+class SQLiteRowStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "database_id TEXT, id TEXT, last_edited_time TEXT, data TEXT, "
+                "PRIMARY KEY (database_id, id))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                "database_id TEXT PRIMARY KEY, data TEXT)"
+            )
+
+    def pages(self, database_id):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT data FROM pages WHERE database_id = ?", (database_id,)
+            ).fetchall()
+
+        return [json.loads(data) for (data,) in rows]
+
+    def upsert(self, database_id, pages):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                [
+                    (database_id, page["id"], page.get("last_edited_time"), json.dumps(page))
+                    for page in pages
+                ],
+            )
+
+    def remove(self, database_id, page_ids):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM pages WHERE database_id = ? AND id = ?",
+                [(database_id, page_id) for page_id in page_ids],
+            )
+
+    def clear(self, database_id):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM pages WHERE database_id = ?", (database_id,)
+            )
+
+    def get_state(self, database_id):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM sync_state WHERE database_id = ?", (database_id,)
+            ).fetchone()
+
+        return json.loads(row[0]) if row else {}
+
+    def set_state(self, database_id, **state):
+        current = self.get_state(database_id)
+        current.update(state)
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+                (database_id, json.dumps(current)),
+            )
+
+    def close(self):
+        self._connection.close()
+
+
+class RowCache:
+
+    DEFAULT_MAX_STALENESS = 60
+    DEFAULT_FULL_SYNC_INTERVAL = 3600
+
+    def __init__(
+        self,
+        store=None,
+        max_staleness=DEFAULT_MAX_STALENESS,
+        full_sync_interval=DEFAULT_FULL_SYNC_INTERVAL,
+    ):
+        self.store = store if store is not None else MemoryRowStore()
+        # Seconds a synced copy may be used before asking Notion for changes again
+        self.max_staleness = max_staleness
+        # Pages moved to the trash in Notion never show up in a delta sync, a periodic full sync drops them
+        self.full_sync_interval = full_sync_interval
+        self.lock = threading.Lock()
+
+    def sync_kind(self, database_id):
+        # Returns None when the local copy is fresh enough, otherwise "full" or "delta"
+        state = self.store.get_state(database_id)
+        now = time.time()
+
+        if state.get("watermark") is None or state.get("last_full_sync") is None:
+            return "full"
+
+        if (
+            self.full_sync_interval is not None
+            and now - state["last_full_sync"] >= self.full_sync_interval
+        ):
+            return "full"
+
+        if state.get("last_sync") is not None and now - state["last_sync"] < self.max_staleness:
+            return None
+
+        return "delta"
+
+    def record_sync(self, database_id, pages, full, started_at=None):
+        # started_at is when the sync query was sent, the watermark when no page came back
+        state = self.store.get_state(database_id)
+        watermark = state.get("watermark") if not full else None
+
+        live = []
+        trashed = []
+
+        for page in pages:
+            if page.get("in_trash") or page.get("archived"):
+                trashed.append(page["id"])
+            else:
+                live.append(page)
+
+            # ISO 8601 timestamps in the same format compare correctly as strings
+            if watermark is None or page["last_edited_time"] > watermark:
+                watermark = page["last_edited_time"]
+
+        if full:
+            self.store.clear(database_id)
+
+        self.store.upsert(database_id, live)
+        self.store.remove(database_id, trashed)
+
+        now = time.time()
+
+        if watermark is None:
+            # Rounded down to the minute like Notion's own timestamps, so nothing edited since is missed
+            watermark = time.strftime(
+                "%Y-%m-%dT%H:%M:00.000Z",
+                time.gmtime(started_at if started_at is not None else now),
+            )
+
+        state = {"last_sync": now, "watermark": watermark}
+
+        if full:
+            state["last_full_sync"] = now
+
+        self.store.set_state(database_id, **state)
+
+    def mark_stale(self, database_id):
+        # The next read asks Notion for changes instead of waiting for max_staleness
+        self.store.set_state(database_id, last_sync=None)
@@ -0,0 +1,225 @@
+from collections import namedtuple
+
+# How a placeholder shows up in the values of parse() results
+PLACEHOLDER = "%s"
+NAMED_PLACEHOLDER = "%({})s"
+
+
+# Statements
+
+Insert = namedtuple("Insert", "table columns rows")
+Select = namedtuple(
+    "Select", "table columns where order_by limit distinct items group_by having"
+)
+Update = namedtuple("Update", "table assignments where")
+Delete = namedtuple("Delete", "table where")
+
+# Expressions
+
+Column = namedtuple("Column", "name")
+Literal = namedtuple("Literal", "value")
+# index is the position of a %s placeholder, or the name of a %(name)s one
+Placeholder = namedtuple("Placeholder", "index")
+
+# Computed values, which Notion cannot filter on and are evaluated locally
+Function = namedtuple("Function", "name args distinct")
+Arithmetic = namedtuple("Arithmetic", "operator left right")
+
+AGGREGATE_FUNCTIONS = ("COUNT", "SUM", "AVG", "MIN", "MAX")
+SCALAR_FUNCTIONS = ("LOWER", "UPPER", "LENGTH", "ABS")
+
+# An expr of None stands for *
+SelectItem = namedtuple("SelectItem", "expr alias")
+
+# left is a Column or a computed value, right is a Literal, a Placeholder, a tuple of them for IN or None for IS NULL
+Comparison = namedtuple("Comparison", "left operator right")
+
+And = namedtuple("And", "operands")
+Or = namedtuple("Or", "operands")
+Not = namedtuple("Not", "operand")
+
+Assignment = namedtuple("Assignment", "column value")
+
+# descending is a bool, ORDER BY defaults to ascending
+OrderBy = namedtuple("OrderBy", "column descending")
+
+
+def iter_comparisons(expr):
+    if expr is None:
+        return
+
+    if isinstance(expr, (And, Or)):
+        for operand in expr.operands:
+            for comparison in iter_comparisons(operand):
+                yield comparison
+
+    elif isinstance(expr, Not):
+        for comparison in iter_comparisons(expr.operand):
+            yield comparison
+
+    else:
+        yield expr
+
+
+def iter_columns(expr):
+    # Every Column referenced by an expression, including inside functions and arithmetic
+    if isinstance(expr, Column):
+        yield expr
+
+    elif isinstance(expr, (And, Or)):
+        for operand in expr.operands:
+            for column in iter_columns(operand):
+                yield column
+
+    elif isinstance(expr, Not):
+        for column in iter_columns(expr.operand):
+            yield column
+
+    elif isinstance(expr, Comparison):
+        for column in iter_columns(expr.left):
+            yield column
+
+    elif isinstance(expr, Function):
+        for arg in expr.args:
+            for column in iter_columns(arg):
+                yield column
+
+    elif isinstance(expr, Arithmetic):
+        for column in iter_columns(expr.left):
+            yield column
+        for column in iter_columns(expr.right):
+            yield column
+
+
+def iter_aggregates(expr):
+    if isinstance(expr, Function) and expr.name in AGGREGATE_FUNCTIONS:
+        yield expr
+
+    elif isinstance(expr, (And, Or)):
+        for operand in expr.operands:
+            for aggregate in iter_aggregates(operand):
+                yield aggregate
+
+    elif isinstance(expr, Not):
+        for aggregate in iter_aggregates(expr.operand):
+            yield aggregate
+
+    elif isinstance(expr, Comparison):
+        for aggregate in iter_aggregates(expr.left):
+            yield aggregate
+
+    elif isinstance(expr, Function):
+        for arg in expr.args:
+            for aggregate in iter_aggregates(arg):
+                yield aggregate
+
+    elif isinstance(expr, Arithmetic):
+        for aggregate in iter_aggregates(expr.left):
+            yield aggregate
+        for aggregate in iter_aggregates(expr.right):
+            yield aggregate
+
+
+def is_conjunction(expr):
+    # True when the expression is a plain list of comparisons joined by AND
+    if isinstance(expr, And):
+        return all(isinstance(operand, Comparison) for operand in expr.operands)
+
+    return isinstance(expr, Comparison)
+
+
+def placeholder_text(placeholder):
+    if isinstance(placeholder.index, str):
+        return NAMED_PLACEHOLDER.format(placeholder.index)
+
+    return PLACEHOLDER
+
+
+def literal_value(value):
+    if isinstance(value, Literal):
+        return value.value
+
+    if isinstance(value, Placeholder):
+        return placeholder_text(value)
+
+    # IN lists are plain tuples of literals
+    if isinstance(value, tuple):
+        return [literal_value(item) for item in value]
+
+    return value
+
+
+def quote_identifier(name):
+    if name.replace("_", "a").isalnum() and not name[0].isdigit():
+        return name
+
+    return "`{}`".format(name.replace("`", "``"))
+
+
+def to_sql(expr):
+    # Renders an expression back to SQL that MySQLQueryParser parses to the same tree
+    if isinstance(expr, And):
+        return " AND ".join("({})".format(to_sql(operand)) for operand in expr.operands)
+
+    if isinstance(expr, Or):
+        return " OR ".join("({})".format(to_sql(operand)) for operand in expr.operands)
+
+    if isinstance(expr, Not):
+        return "NOT ({})".format(to_sql(expr.operand))
+
+    if isinstance(expr, Comparison):
+        left = to_sql(expr.left)
+
+        if expr.right is None:
+            return "{} {}".format(left, expr.operator)
+
+        if expr.operator in ("IN", "NOT IN"):
+            return "{} {} ({})".format(
+                left, expr.operator, ", ".join(to_sql(item) for item in expr.right)
+            )
+
+        return "{} {} {}".format(left, expr.operator, to_sql(expr.right))
+
+    if isinstance(expr, Column):
+        return quote_identifier(expr.name)
+
+    if isinstance(expr, Function):
+        if not expr.args:
+            return "{}(*)".format(expr.name)
+
+        return "{}({}{})".format(
+            expr.name,
+            "DISTINCT " if expr.distinct else "",
+            ", ".join(to_sql(arg) for arg in expr.args),
+        )
+
+    if isinstance(expr, Arithmetic):
+        return "{} {} {}".format(
+            _operand_sql(expr.left), expr.operator, _operand_sql(expr.right)
+        )
+
+    if isinstance(expr, Placeholder):
+        return placeholder_text(expr)
+
+    if isinstance(expr, Literal):
+        value = expr.value
+
+        if value is None:
+            return "NULL"
+
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+
+        if isinstance(value, (int, float)):
+            return repr(value)
+
+        return "'{}'".format(str(value).replace("\\", "\\\\").replace("'", "''"))
+
+    raise ValueError("Cannot render {!r} as SQL".format(expr))
+
+
+def _operand_sql(expr):
+    if isinstance(expr, Arithmetic):
+        return "({})".format(to_sql(expr))
+
+    return to_sql(expr)
@@ -23,6 +23,13 @@ setuptools.setup(
     install_requires=[
         "requests>=2.0.0",
     ],
-    packages=setuptools.find_packages(),
+    extras_require={
+        "async": ["httpx>=0.23.0"],
+        "arrow": ["pyarrow>=6.0.0"],
+        "pandas": ["pandas>=1.0.0"],
+        "fast": ["orjson>=3.0.0"],
+        "otel": ["opentelemetry-api>=1.0.0"],
+    },
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
     python_requires=">=3.6",
 )
\ No newline at end of file
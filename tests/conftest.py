@@ -0,0 +1,24 @@
+import threading
+
+import pytest
+
+from benchmarks.mock_server import MockNotion, _handler_for, _ThreadingHTTPServer
+
+
+@pytest.fixture
+def mock_notion():
+    # The mock Notion API of the benchmarks, served from a thread for one test
+    notion = MockNotion(rows=10)
+    server = _ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(notion))
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+
+    notion.base_url = "http://127.0.0.1:{}/v1".format(server.server_address[1])
+
+    try:
+        yield notion
+    finally:
+        server.shutdown()
+        server.server_close()
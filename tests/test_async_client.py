@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from benchmarks.mock_server import DATABASE_ID
+from pynotiondb import AsyncNotionAPI
+
+
+def run(mock_notion, statement):
+    async def main():
+        db = AsyncNotionAPI(
+            "token", DATABASE_ID, base_url=mock_notion.base_url, rate_limit=None
+        )
+
+        try:
+            return await statement(db)
+        finally:
+            await db.aclose()
+
+    return asyncio.run(main())
+
+
+def test_limit_zero_sends_no_query(mock_notion):
+    result = run(mock_notion, lambda db: db.execute("SELECT * FROM employees LIMIT 0"))
+
+    assert result["data"] == []
+    assert "POST /v1/databases/{id}/query" not in mock_notion.stats()["requests"]
+
+
+def test_limit_pages_until_reached(mock_notion):
+    result = run(
+        mock_notion,
+        lambda db: db.execute(
+            "SELECT Name FROM employees WHERE page_size = 3 ORDER BY Salary LIMIT 7"
+        ),
+    )
+
+    assert len(result["data"]) == 7
+    assert mock_notion.stats()["requests"]["POST /v1/databases/{id}/query"] == 3
+
+
+def test_insert_select_update_delete(mock_notion):
+    async def statements(db):
+        await db.execute(
+            "INSERT INTO employees (Name, Salary, Department) VALUES (%s, %s, %s)",
+            ("Jane 'JJ' Doe", 4200, "Sales"),
+        )
+
+        inserted = await db.execute(
+            "SELECT Name, Salary FROM employees WHERE Salary = 4200"
+        )
+        updated = await db.execute(
+            "UPDATE employees SET Department = 'Sales' WHERE Salary = 4200"
+        )
+        moved = await db.execute(
+            "UPDATE employees SET Department = 'Finance' WHERE Salary = 4200"
+        )
+        deleted = await db.execute("DELETE FROM employees WHERE Salary = 4200")
+        remaining = await db.execute("SELECT * FROM employees WHERE Salary = 4200")
+
+        return inserted, updated, moved, deleted, remaining
+
+    inserted, updated, moved, deleted, remaining = run(mock_notion, statements)
+
+    assert [(row["name"], row["salary"]) for row in inserted["data"]] == [
+        ("Jane 'JJ' Doe", 4200)
+    ]
+    assert (updated["matched"], updated["changed"], updated["affected"]) == (1, 0, 0)
+    assert (moved["matched"], moved["changed"], moved["affected"]) == (1, 1, 1)
+    assert (deleted["matched"], deleted["affected"]) == (1, 1)
+    assert remaining["data"] == []
+    assert mock_notion.stats()["rows"] == 10
@@ -0,0 +1,86 @@
+from pynotiondb import NOTION_API, NotionClient
+from pynotiondb.catalog import DatabaseCatalog
+
+
+def database_id(number):
+    return "{:08d}-0000-0000-0000-{:012d}".format(number, number)
+
+
+def search_databases(cursor=None, page_size=100):
+    return {
+        "results": [
+            {
+                "id": database_id(number),
+                "title": [{"plain_text": "DB {}".format(number)}],
+                "description": [],
+                "properties": {"Name": {"id": "title", "type": "title"}},
+            }
+            for number in range(3)
+        ],
+        "has_more": False,
+        "next_cursor": None,
+    }
+
+
+def no_requests(*args, **kwargs):
+    raise AssertionError("no request expected")
+
+
+def test_listing_databases_leaves_the_schema_cache_alone():
+    db = NOTION_API("token", database_id(0))
+    db.search_databases = search_databases
+
+    assert db.get_all_database() == ("DB 0", "DB 1", "DB 2")
+    assert db._schema_cache == {}
+
+
+def test_only_the_queried_schema_is_cached():
+    db = NOTION_API("token", None)
+    db.search_databases = search_databases
+    db.request_helper = no_requests
+    catalog = DatabaseCatalog(db)
+
+    assert catalog.schema("DB 1") == {
+        "Name": {"id": "title", "name": "title", "type": ""}
+    }
+    assert list(db._schema_cache) == [database_id(1)]
+
+
+def test_client_handles_get_their_schema_from_the_catalog():
+    client = NotionClient("token")
+    client._search.search_databases = search_databases
+
+    handle = client.database("DB 2")
+    handle.request_helper = no_requests
+
+    assert list(handle.get_table_header_info()) == ["Name"]
+    assert list(client._schema_cache) == [database_id(2)]
+
+
+def test_database_listing_is_cached():
+    searches = []
+
+    def counting_search(cursor=None, page_size=100):
+        searches.append(cursor)
+        return search_databases(cursor, page_size)
+
+    db = NOTION_API("token", database_id(0))
+    db.search_databases = counting_search
+
+    assert db.get_all_database() == ("DB 0", "DB 1", "DB 2")
+    assert db.get_all_database() == ("DB 0", "DB 1", "DB 2")
+    assert len(searches) == 1
+
+    db.get_all_database(refresh=True)
+    assert len(searches) == 2
+
+
+def test_client_handles_list_databases_from_the_client_catalog():
+    client = NotionClient("token")
+    client._search.search_databases = search_databases
+
+    handle = client.database("DB 2")
+    handle.search_databases = no_requests
+
+    assert handle.catalog is client.catalog
+    assert handle.get_all_database() == ("DB 0", "DB 1", "DB 2")
@@ -0,0 +1,35 @@
+from pynotiondb.decoders import compile_decoder, decode_rows, decode_value
+from pynotiondb.encoders import encode_value, same_value
+
+
+def text_property(property_type, parts):
+    return {"id": "x", "type": property_type, property_type: parts}
+
+
+def test_empty_text_is_none():
+    assert decode_value(text_property("title", [])) is None
+    assert decode_value(text_property("rich_text", [])) is None
+
+
+def test_text_fragments_are_joined():
+    parts = [{"plain_text": "Rachel "}, {"plain_text": "Adams"}]
+
+    assert decode_value(text_property("rich_text", parts)) == "Rachel Adams"
+
+
+def test_empty_text_in_rows_is_none():
+    table_header = {"Notes": {"id": "x", "name": "rich_text"}}
+    entry = {
+        "id": "page",
+        "created_time": "2024-01-01T00:00:00.000Z",
+        "last_edited_time": "2024-01-01T00:00:00.000Z",
+        "properties": {"Notes": text_property("rich_text", [])},
+    }
+
+    rows = decode_rows([entry], compile_decoder(["Notes"], table_header))
+
+    assert rows[0]["notes"] is None
+
+
+def test_writing_an_empty_string_to_an_empty_cell_changes_nothing():
+    assert same_value(encode_value("rich_text", ""), text_property("rich_text", []))
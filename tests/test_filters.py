@@ -0,0 +1,66 @@
+import pytest
+
+from pynotiondb.filters import MAX_FILTER_DEPTH, compile_filter
+from pynotiondb.mysql_query_parser import MySQLQueryParser
+from pynotiondb.sql_ast import Column, Comparison
+
+TABLE_HEADER = {
+    "a": {"id": "a", "name": "number"},
+    "b": {"id": "b", "name": "number"},
+    "c": {"id": "c", "name": "number"},
+}
+
+
+def depth(compiled):
+    for key in ("and", "or"):
+        if key in compiled:
+            return 1 + max(depth(item) for item in compiled[key])
+
+    return 0
+
+
+def compile_where(where):
+    statement = MySQLQueryParser("SELECT * FROM t WHERE " + where).parse_ast()
+
+    return compile_filter(statement.where, TABLE_HEADER)
+
+
+@pytest.mark.parametrize(
+    "where",
+    [
+        "(a = 1 AND c IN (1, 2)) OR b = 2",
+        "(a = 1 OR b = 2) AND NOT (c IN (1, 2) OR a = 3)",
+    ],
+)
+def test_in_lists_count_towards_the_nesting_depth(where):
+    assert depth(compile_where(where)) <= MAX_FILTER_DEPTH
+
+
+def test_in_list_becomes_an_or_group():
+    assert compile_where("c IN (1, 2)") == {
+        "or": [
+            {"property": "c", "number": {"equals": 1}},
+            {"property": "c", "number": {"equals": 2}},
+        ]
+    }
+
+
+def test_not_in_list_becomes_an_and_group():
+    assert compile_where("c NOT IN (1, 2)") == {
+        "and": [
+            {"property": "c", "number": {"does_not_equal": 1}},
+            {"property": "c", "number": {"does_not_equal": 2}},
+        ]
+    }
+
+
+def test_single_value_in_list_is_a_comparison():
+    assert compile_where("c IN (1)") == {"property": "c", "number": {"equals": 1}}
+
+
+@pytest.mark.parametrize("operator", ["IN", "NOT IN"])
+def test_empty_lists_are_rejected(operator):
+    where = Comparison(Column("a"), operator, ())
+
+    with pytest.raises(ValueError, match="needs at least one value"):
+        compile_filter(where, TABLE_HEADER)
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from pynotiondb import NOTION_API
+from pynotiondb.instrumentation import MetricsHook
+
+
+class RecordingHook:
+    def __init__(self):
+        self.statements = []
+
+    def on_statement(self, event):
+        self.statements.append(event)
+
+
+def test_statement_text_can_be_passed_by_keyword():
+    hook = RecordingHook()
+    db = NOTION_API("token", "database", hooks=[hook])
+    db._select = lambda parsed_data: {"data": [{"name": "John"}]}
+
+    result = db.select(query="SELECT * FROM employees")
+
+    assert result == {"data": [{"name": "John"}]}
+    assert hook.statements[0]["statement"] == "select"
+    assert hook.statements[0]["sql"] == "SELECT * FROM employees"
+    assert hook.statements[0]["rows"] == 1
+
+
+def test_statement_text_can_be_passed_by_keyword_without_hooks():
+    db = NOTION_API("token", "database")
+    db._select = lambda parsed_data: {"data": []}
+
+    assert db.select(query="SELECT * FROM employees") == {"data": []}
+
+
+def test_async_statement_text_can_be_passed_by_keyword():
+    pytest.importorskip("httpx")
+    from pynotiondb import AsyncNotionAPI
+
+    hook = RecordingHook()
+
+    async def run():
+        db = AsyncNotionAPI("token", "database", hooks=[hook])
+
+        async def select(parsed_data):
+            return {"data": []}
+
+        db._select = select
+
+        try:
+            return await db.select(query="SELECT * FROM employees")
+        finally:
+            await db.aclose()
+
+    assert asyncio.run(run()) == {"data": []}
+    assert hook.statements[0]["sql"] == "SELECT * FROM employees"
+
+
+def request_event(status):
+    return {
+        "method": "POST",
+        "endpoint": "/databases/{id}/query",
+        "status": status,
+        "latency": 0.01,
+        "retries": 0,
+        "response_bytes": 0,
+    }
+
+
+def test_metrics_render_successes_and_failures_together():
+    metrics = MetricsHook()
+
+    metrics.on_request(request_event(200))
+    metrics.on_request(request_event(None))
+    metrics.on_request(request_event(429))
+
+    text = metrics.render()
+
+    assert metrics.requests.value("POST", "/databases/{id}/query", "200") == 1
+    assert (
+        'pynotiondb_requests_total{method="POST",endpoint="/databases/{id}/query",'
+        'status="error"} 1' in text
+    )
+    assert 'status="429"} 1' in text
@@ -0,0 +1,104 @@
+import re
+
+import pytest
+
+from pynotiondb.mysql_query_parser import MySQLQueryParser
+from pynotiondb.sql_ast import And, Arithmetic, Column, Comparison, Literal, Not, Or
+
+
+def parse(sql):
+    return MySQLQueryParser(sql).parse_ast()
+
+
+@pytest.mark.parametrize(
+    "database_id",
+    [
+        "00000000000000000000000000000001",
+        "f30ed4836a234308a63f7b76f71b098c",
+        "f30ed483-6a23-4308-a63f-7b76f71b098c",
+        "`f30ed483-6a23-4308-a63f-7b76f71b098c`",
+    ],
+)
+def test_database_ids_as_table_names(database_id):
+    expected = database_id.strip("`")
+
+    assert parse("SELECT * FROM {} WHERE a = 1".format(database_id)).table == expected
+    assert parse("INSERT INTO {} (a) VALUES (1)".format(database_id)).table == expected
+    assert (
+        parse("UPDATE {} SET a = 1 WHERE b = 2".format(database_id)).table == expected
+    )
+    assert parse("DELETE FROM {} WHERE a = 1".format(database_id)).table == expected
+
+
+def test_table_names_with_spaces():
+    assert parse("SELECT * FROM Employee Records").table == "Employee Records"
+
+
+def where(condition):
+    return parse("SELECT * FROM t WHERE " + condition).where
+
+
+def a_equals(value, column="a"):
+    return Comparison(Column(column), "=", Literal(value))
+
+
+def test_and_binds_tighter_than_or():
+    assert where("a = 1 AND b = 2 OR c = 3") == Or(
+        (And((a_equals(1), a_equals(2, "b"))), a_equals(3, "c"))
+    )
+
+
+def test_parentheses_override_precedence():
+    assert where("a = 1 AND (b = 2 OR c = 3)") == And(
+        (a_equals(1), Or((a_equals(2, "b"), a_equals(3, "c"))))
+    )
+
+
+def test_not_applies_to_the_next_condition():
+    assert where("NOT a = 1 AND b = 2") == And((Not(a_equals(1)), a_equals(2, "b")))
+    assert where("NOT (a = 1 AND b = 2)") == Not(And((a_equals(1), a_equals(2, "b"))))
+
+
+def test_in_and_not_in():
+    assert where("a IN (1, 'x')") == Comparison(
+        Column("a"), "IN", (Literal(1), Literal("x"))
+    )
+    assert where("a NOT IN (1)") == Comparison(Column("a"), "NOT IN", (Literal(1),))
+
+
+def test_nested_parentheses():
+    assert where("((a = 1))") == a_equals(1)
+    assert where("((a = 1) OR (b = 2)) AND c = 3") == And(
+        (Or((a_equals(1), a_equals(2, "b"))), a_equals(3, "c"))
+    )
+
+
+def test_parenthesized_values():
+    assert where("(salary + bonus) * 2 > 10") == Comparison(
+        Arithmetic("*", Arithmetic("+", Column("salary"), Column("bonus")), Literal(2)),
+        ">",
+        Literal(10),
+    )
+    assert where("((a)) = 1") == a_equals(1)
+
+
+@pytest.mark.parametrize(
+    "condition, message",
+    [
+        ("(a AND b = 1)", "expected a comparison near 'AND'"),
+        ("(a = 1", "expected ')' at end of statement"),
+        ("a = 1 b", "unexpected token near 'b'"),
+        ("a NOT = 1", "expected LIKE, IN or BETWEEN after NOT"),
+        ("a", "expected 'operator' at end of statement"),
+    ],
+)
+def test_error_messages(condition, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        where(condition)
+
+
+def test_deep_nesting_is_a_value_error():
+    condition = "(" * 2000 + "a = 1" + ")" * 2000
+
+    with pytest.raises(ValueError, match="nested too deeply"):
+        where(condition)
@@ -0,0 +1,99 @@
+import datetime
+
+import pytest
+
+from benchmarks.mock_server import DATABASE_ID
+from pynotiondb import NOTION_API
+from pynotiondb.mysql_query_parser import MySQLQueryParser
+from pynotiondb.prepared import bind_parameters
+
+
+@pytest.fixture
+def db(mock_notion):
+    return NOTION_API(
+        "token", DATABASE_ID, base_url=mock_notion.base_url, rate_limit=None
+    )
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "O'Brien",
+        "back\\slash",
+        'say "hi"',
+        "x'); DELETE FROM employees; --",
+        "%s and %(name)s",
+    ],
+)
+def test_parameters_are_bound_as_values(db, name):
+    db.execute("INSERT INTO employees (Name, Salary) VALUES (%s, %s)", (name, 4200))
+
+    result = db.execute("SELECT Name FROM employees WHERE Name = %s", name)
+
+    assert [row["name"] for row in result["data"]] == [name]
+
+
+def test_named_parameters(db):
+    db.execute(
+        "INSERT INTO employees (Name, Salary) VALUES (%(name)s, %(salary)s)",
+        {"name": "Jane", "salary": 4200, "unused": True},
+    )
+
+    result = db.execute(
+        "SELECT Name, Salary FROM employees WHERE Salary = %(salary)s AND Name = %(name)s",
+        {"name": "Jane", "salary": 4200},
+    )
+
+    assert [(row["name"], row["salary"]) for row in result["data"]] == [("Jane", 4200)]
+
+
+def test_executemany_parses_once(db, monkeypatch):
+    parses = []
+    parse_ast = MySQLQueryParser.parse_ast
+
+    def counting_parse_ast(self):
+        parses.append(self.statement)
+        return parse_ast(self)
+
+    monkeypatch.setattr(MySQLQueryParser, "parse_ast", counting_parse_ast)
+
+    statement = db.prepare("INSERT INTO employees (Name, Salary) VALUES (%s, %s)")
+    results = statement.executemany([("A", 1), ("B", 2), ("C", 3)])
+
+    assert len(parses) == 1
+    assert [result["success"] for result in results] == [True, True, True]
+
+
+@pytest.mark.parametrize(
+    "params, expected, names, message",
+    [
+        (("a",), 2, (), "Not enough parameters"),
+        (("a", "b", "c"), 2, (), "Not all parameters were used"),
+        (None, 1, (), "Not enough parameters"),
+        ({"name": "a"}, 1, (), "pass the parameters as a tuple or list"),
+        (("a",), 0, ("name",), "pass the parameters as a dict"),
+        ({"other": "a"}, 0, ("name", "salary"), "Missing parameters .*name, salary"),
+    ],
+)
+def test_wrong_parameters(params, expected, names, message):
+    with pytest.raises(ValueError, match=message):
+        bind_parameters(params, expected, names)
+
+
+@pytest.mark.parametrize("param", [object(), {"a": 1}, b"bytes", ["ok", object()]])
+def test_unsupported_parameter_types(param):
+    with pytest.raises(ValueError, match="are not supported"):
+        bind_parameters((param,), 1)
+
+
+def test_supported_parameter_types():
+    assert bind_parameters(
+        ("a", 1, 2.5, True, None, datetime.date(2024, 1, 15), ["x", "y"]), 7
+    ) == ("a", 1, 2.5, True, None, "2024-01-15", ["x", "y"])
+
+
+def test_mixed_placeholders_are_rejected():
+    with pytest.raises(ValueError, match="cannot be mixed"):
+        MySQLQueryParser(
+            "SELECT * FROM employees WHERE Name = %s AND Salary = %(salary)s"
+        ).parse_ast()
@@ -0,0 +1,178 @@
+import pytest
+
+from benchmarks.mock_server import DATABASE_ID
+from pynotiondb import NOTION_API
+
+EMPLOYEES = [
+    ("Ann", 100, "Sales"),
+    ("Bob", 200, "Sales"),
+    ("Cid", None, "Sales"),
+    ("Dee", 300, "Support"),
+    ("Eve", 300, "Support"),
+    ("Fay", None, None),
+]
+
+
+@pytest.fixture
+def db(mock_notion):
+    mock_notion.reset(0)
+
+    for name, salary, department in EMPLOYEES:
+        mock_notion._create({"Name": name, "Salary": salary, "Department": department})
+
+    return NOTION_API(
+        "token", DATABASE_ID, base_url=mock_notion.base_url, rate_limit=None
+    )
+
+
+def rows(db, sql):
+    return [
+        {
+            name: value
+            for name, value in row.items()
+            if name not in ("id", "created_time", "last_edited_time")
+        }
+        for row in db.execute(sql)["data"]
+    ]
+
+
+def by_department(result):
+    return {row["department"]: row for row in result}
+
+
+def test_group_by_with_aggregates(db):
+    result = rows(
+        db,
+        "SELECT Department, COUNT(*) AS people, COUNT(Salary) AS paid, SUM(Salary) AS total, "
+        "AVG(Salary) AS average, MIN(Salary) AS low, MAX(Salary) AS high "
+        "FROM employees GROUP BY Department",
+    )
+
+    assert by_department(result) == {
+        "Sales": {
+            "department": "Sales",
+            "people": 3,
+            "paid": 2,
+            "total": 300,
+            "average": 150.0,
+            "low": 100,
+            "high": 200,
+        },
+        "Support": {
+            "department": "Support",
+            "people": 2,
+            "paid": 2,
+            "total": 600,
+            "average": 300.0,
+            "low": 300,
+            "high": 300,
+        },
+        # NULLs form a group of their own, aggregates over no values are NULL
+        None: {
+            "department": None,
+            "people": 1,
+            "paid": 0,
+            "total": None,
+            "average": None,
+            "low": None,
+            "high": None,
+        },
+    }
+
+
+def test_aggregates_skip_nulls(db):
+    assert rows(
+        db, "SELECT COUNT(*), COUNT(Salary), SUM(Salary), AVG(Salary) FROM employees"
+    ) == [{"COUNT(*)": 6, "COUNT(Salary)": 4, "SUM(Salary)": 900, "AVG(Salary)": 225.0}]
+
+
+def test_aggregates_without_matching_rows(db):
+    assert rows(
+        db,
+        "SELECT COUNT(*), SUM(Salary), MIN(Salary) FROM employees WHERE Salary > 1000",
+    ) == [{"COUNT(*)": 0, "SUM(Salary)": None, "MIN(Salary)": None}]
+
+
+def test_having(db):
+    assert rows(
+        db,
+        "SELECT Department, COUNT(*) AS people FROM employees GROUP BY Department "
+        "HAVING people > 1 ORDER BY people DESC",
+    ) == [{"department": "Sales", "people": 3}, {"department": "Support", "people": 2}]
+
+    assert rows(
+        db,
+        "SELECT Department, SUM(Salary) AS total FROM employees GROUP BY Department "
+        "HAVING SUM(Salary) > 300",
+    ) == [{"department": "Support", "total": 600}]
+
+
+def test_distinct(db):
+    result = rows(db, "SELECT DISTINCT Department FROM employees")
+
+    assert sorted(result, key=lambda row: row["department"] or "") == [
+        {"department": None},
+        {"department": "Sales"},
+        {"department": "Support"},
+    ]
+
+
+def test_limit_applies_after_the_local_sort(db):
+    assert rows(
+        db,
+        "SELECT Name, Salary * 2 AS double FROM employees "
+        "WHERE Salary IS NOT NULL ORDER BY double DESC, Name LIMIT 3",
+    ) == [
+        {"name": "Dee", "double": 600},
+        {"name": "Eve", "double": 600},
+        {"name": "Bob", "double": 400},
+    ]
+
+
+def record_queries(db):
+    payloads = []
+    request_helper = db.request_helper
+
+    def recording_request_helper(url, method="GET", payload=None, **kwargs):
+        if url.endswith("/query"):
+            payloads.append(payload)
+
+        return request_helper(url, method=method, payload=payload, **kwargs)
+
+    db.request_helper = recording_request_helper
+
+    return payloads
+
+
+def test_lower_is_narrowed_by_notion_and_checked_locally(db):
+    payloads = record_queries(db)
+
+    result = rows(
+        db,
+        "SELECT Name FROM employees WHERE Department = 'Sales' AND LOWER(Name) = 'bob'",
+    )
+
+    assert result == [{"name": "Bob"}]
+
+    # Notion's contains is case-insensitive, the exact match is checked on the pages it returns
+    assert payloads[0]["filter"] == {
+        "and": [
+            {"property": "Department", "select": {"equals": "Sales"}},
+            {"property": "Name", "title": {"contains": "bob"}},
+        ]
+    }
+
+
+def test_computed_conditions_are_evaluated_locally(db):
+    payloads = record_queries(db)
+
+    result = rows(
+        db,
+        "SELECT Name FROM employees WHERE Department = 'Sales' AND Salary * 2 > 300",
+    )
+
+    assert result == [{"name": "Bob"}]
+    assert payloads[0]["filter"] == {
+        "property": "Department",
+        "select": {"equals": "Sales"},
+    }
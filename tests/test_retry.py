@@ -0,0 +1,63 @@
+import socket
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from pynotiondb import NOTION_API, RetryPolicy
+
+
+def test_retry_after_in_seconds():
+    assert RetryPolicy.parse_retry_after("2") == 2.0
+
+
+def test_retry_after_as_http_date():
+    delay = RetryPolicy.parse_retry_after(formatdate(time.time() + 30, usegmt=True))
+
+    assert 25 < delay <= 30
+
+
+def test_unreadable_retry_after_falls_back_to_backoff():
+    policy = RetryPolicy(backoff_factor=1, jitter=False)
+
+    for value in ("soon", "", "nan", None):
+        retry_after = RetryPolicy.parse_retry_after(value)
+
+        assert retry_after is None
+        assert policy.get_delay(2, retry_after=retry_after) == 4
+
+
+def test_retry_after_is_clamped_to_max_delay():
+    policy = RetryPolicy(max_delay=10)
+
+    assert policy.get_delay(0, retry_after=3600) == 10
+    assert policy.get_delay(0, retry_after=-5) == 0
+
+
+def test_requests_that_hang_time_out_and_are_retried():
+    # Accepts connections but never answers
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+
+    policy = RetryPolicy(max_retries=2, backoff_factor=0, jitter=False)
+    db = NOTION_API(
+        "token",
+        "database",
+        base_url="http://127.0.0.1:{}/v1".format(server.getsockname()[1]),
+        rate_limit=None,
+        retry_policy=policy,
+        timeout=0.1,
+    )
+
+    try:
+        start = time.monotonic()
+
+        with pytest.raises(requests.Timeout):
+            db.get_table_header_info()
+
+        assert time.monotonic() - start < 5
+        assert policy.get_stats()["retries"] == 2
+    finally:
+        server.close()
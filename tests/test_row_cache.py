@@ -0,0 +1,31 @@
+from pynotiondb.row_cache import RowCache
+
+
+def test_empty_full_sync_allows_delta_syncs():
+    cache = RowCache(max_staleness=0)
+
+    cache.record_sync("database", [], full=True, started_at=0)
+
+    assert cache.store.get_state("database")["watermark"] == "1970-01-01T00:00:00.000Z"
+    assert cache.sync_kind("database") == "delta"
+
+
+def test_empty_full_sync_is_fresh_within_max_staleness():
+    cache = RowCache(max_staleness=60)
+
+    cache.record_sync("database", [], full=True)
+
+    assert cache.sync_kind("database") is None
+
+
+def test_watermark_is_the_latest_edit():
+    cache = RowCache(max_staleness=0)
+    pages = [
+        {"id": "a", "last_edited_time": "2024-01-02T10:00:00.000Z"},
+        {"id": "b", "last_edited_time": "2024-01-03T10:00:00.000Z"},
+    ]
+
+    cache.record_sync("database", pages, full=True, started_at=0)
+    cache.record_sync("database", [], full=False, started_at=0)
+
+    assert cache.store.get_state("database")["watermark"] == "2024-01-03T10:00:00.000Z"
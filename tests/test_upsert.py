@@ -0,0 +1,28 @@
+import pytest
+
+from pynotiondb import NOTION_API
+
+TABLE_HEADER = {
+    "Name": {"id": "title", "name": "title"},
+    "Tags": {"id": "tags", "name": "multi_select"},
+    "Owners": {"id": "owners", "name": "people"},
+    "Projects": {"id": "projects", "name": "relation"},
+}
+
+
+@pytest.mark.parametrize("key", ["Tags", "Owners", "Projects"])
+def test_list_properties_cannot_be_keys(key):
+    db = NOTION_API("token", "database")
+    db.get_table_header_info = lambda refresh=False: TABLE_HEADER
+
+    def no_requests(*args, **kwargs):
+        raise AssertionError("no request expected")
+
+    db.request_helper = no_requests
+
+    with pytest.raises(ValueError, match="needs a key with a single value"):
+        db.upsert_many(
+            "INSERT INTO t (Name, {}) VALUES (%s, %s)".format(key),
+            [("a", "b")],
+            key=key,
+        )